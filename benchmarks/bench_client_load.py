@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный бенчмарк API-клиентов против локального симулятора HH API.
+
+Измеряет страниц в секунду и хвостовые задержки клиента при заданной
+квоте, распределении задержек и доле ошибок 5xx. Сеть не нужна.
+
+Запуск: python benchmarks/bench_client_load.py --rps 20 --latency lognormal --latency-ms 40
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+import requests
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.api.company_api import HHCompanyAPI  # noqa: E402
+from src.api.hh_api import HeadHunterAPI  # noqa: E402
+from src.api.simulator import HHSimulator, SimulatorConfig  # noqa: E402
+
+KEYWORDS = ["python", "java", "golang", "data engineer", "devops", "qa", "frontend", "analyst"]
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк API-клиентов")
+    parser.add_argument("--latency", default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--latency-spread", type=float, default=0.6)
+    parser.add_argument("--rps", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--keywords", type=int, default=len(KEYWORDS))
+    parser.add_argument("--companies", type=int, default=0, help="Дополнительно обойти N работодателей")
+    parser.add_argument("--json", help="Файл для сохранения результатов")
+    args = parser.parse_args()
+
+    config = SimulatorConfig(latency=args.latency, latency_ms=args.latency_ms,
+                             latency_spread=args.latency_spread, rate_limit_rps=args.rps,
+                             error_rate=args.error_rate)
+    latencies, statuses = [], {}
+    real_get = requests.get
+
+    def timed_get(*a, **kw):
+        start = time.perf_counter()
+        response = real_get(*a, **kw)
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return response
+
+    items = 0
+    with HHSimulator(config) as simulator, patch("requests.get", new=timed_get), \
+            patch("builtins.print", new=lambda *a, **k: None):
+        start = time.perf_counter()
+        api = HeadHunterAPI(base_url=simulator.url)
+        for keyword in (KEYWORDS * (args.keywords // len(KEYWORDS) + 1))[:args.keywords]:
+            items += len(api.get_vacancies(keyword))
+
+        if args.companies:
+            company_api = HHCompanyAPI(base_url=simulator.url)
+            company_api.companies = [{"id": 1000 + i, "name": f"Employer {i}"} for i in range(args.companies)]
+            items += sum(len(c["vacancies"]) for c in company_api.iter_companies_data())
+        elapsed = time.perf_counter() - start
+        server_stats = simulator.stats
+
+    ok_pages = statuses.get(200, 0)
+    result = {
+        "elapsed_s": elapsed,
+        "requests": len(latencies),
+        "pages_ok": ok_pages,
+        "pages_per_s": ok_pages / elapsed if elapsed else 0.0,
+        "items": items,
+        "statuses": statuses,
+        "throttled": server_stats.throttled,
+        "server_errors": server_stats.errors,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+        },
+    }
+
+    print(f"Запросов: {result['requests']}, успешных страниц: {ok_pages}, вакансий: {items}")
+    print(f"Пропускная способность: {result['pages_per_s']:.1f} стр/с за {elapsed:.2f} с")
+    print(f"Ответы: {statuses}, 429: {result['throttled']}, 5xx: {result['server_errors']}")
+    lat = result["latency_ms"]
+    print(f"Задержка, мс: p50={lat['p50']:.1f} p95={lat['p95']:.1f} p99={lat['p99']:.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"benchmark": "client_load", **result}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пиковой памяти полного обхода работодателей.
+
+Запросы к API подменяются синтетическими страницами, поэтому сеть не нужна.
+Пик памяти должен оставаться примерно постоянным при росте числа компаний.
+
+Запуск: python benchmarks/bench_crawl_memory.py [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from unittest.mock import patch
+from urllib.parse import urlparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+sys.path.insert(0, current_dir)
+
+from payloads import make_page  # noqa: E402
+from src.api.company_api import HHCompanyAPI  # noqa: E402
+
+VACANCIES_PER_COMPANY = 500
+
+
+class FakeResponse:
+    """Минимальный ответ: страница строится только при вызове json()"""
+
+    status_code = 200
+
+    def __init__(self, url, params):
+        self.url = url
+        self.params = params
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        path = urlparse(self.url).path
+        if path.startswith("/employers/"):
+            company_id = int(path.rsplit("/", 1)[-1])
+            return {
+                "id": str(company_id),
+                "name": f"Employer {company_id}",
+                "alternate_url": f"https://hh.ru/employer/{company_id}",
+                "description": "<p>Описание компании</p>" * 50,
+                "vacancies_url": f"https://api.hh.ru/vacancies?employer_id={company_id}",
+            }
+        params = self.params
+        return make_page(params["page"], params["per_page"], VACANCIES_PER_COMPANY, params["employer_id"])
+
+
+def fake_get(url, headers=None, params=None, **kwargs):
+    """Подмена requests.get, отдающая синтетические ответы"""
+    return FakeResponse(url, params)
+
+
+def measure(companies: int) -> dict:
+    """Пиковая память потокового обхода заданного числа компаний"""
+    api = HHCompanyAPI()
+    api.companies = [{"id": 1000 + i, "name": f"Employer {i}"} for i in range(companies)]
+
+    with patch("requests.get", new=fake_get), patch("time.sleep", new=lambda _: None), \
+            patch("builtins.print", new=lambda *a, **k: None):
+        tracemalloc.start()
+        total = 0
+        for company in api.iter_companies_data():
+            total += len(company["vacancies"])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"companies": companies, "vacancies": total, "peak_bytes": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--companies", type=int, nargs="+", default=[5, 20, 80])
+    parser.add_argument("--json", help="Файл для сохранения результатов")
+    args = parser.parse_args()
+
+    results = [measure(n) for n in args.companies]
+    for row in results:
+        print(f"{row['companies']:4d} компаний | {row['vacancies']:6d} вакансий | "
+              f"пик {row['peak_bytes'] / 1024 / 1024:7.2f} МБ")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"benchmark": "crawl_memory", "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
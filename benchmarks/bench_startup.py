@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк времени запуска: время до первой строки вывода для подкоманд
+пакетного CLI в сравнении с импортом интерактивного run.py.
+
+Запуск: python benchmarks/bench_startup.py [--repeat 7] [--json startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "cli --help": [sys.executable, "-m", "src.cli", "--help"],
+    "cli search --help": [sys.executable, "-m", "src.cli", "search", "--help"],
+    "cli stats --help": [sys.executable, "-m", "src.cli", "stats", "--help"],
+    "cli import (модули)": [
+        sys.executable, "-c",
+        "import sys, src.cli; print(sorted(m for m in ('psycopg2', 'requests', 'dotenv') if m in sys.modules))",
+    ],
+    "run.py import": [sys.executable, "-c", "import run; print('ok')"],
+}
+
+
+def time_to_first_output(command) -> tuple:
+    """Время (с) до первой строки stdout и сама строка"""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    process.stdout.close()
+    process.wait()
+    return elapsed, line.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк времени запуска")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--json", help="Файл для сохранения результатов")
+    args = parser.parse_args()
+
+    results = []
+    for name, command in COMMANDS.items():
+        samples, first_line = [], ""
+        for _ in range(args.repeat):
+            elapsed, first_line = time_to_first_output(command)
+            samples.append(elapsed)
+        median = statistics.median(samples)
+        results.append({"command": name, "median_s": median, "min_s": min(samples), "first_line": first_line})
+        print(f"{name:<22} медиана {median * 1000:7.1f} мс   min {min(samples) * 1000:7.1f} мс   | {first_line[:50]}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"benchmark": "startup", "results": results}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
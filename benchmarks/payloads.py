@@ -0,0 +1,91 @@
+"""
+Генераторы синтетических ответов HH API для бенчмарков
+"""
+import random
+from typing import Any, Dict, Iterator, List
+
+_TITLES = ["Python разработчик", "Java Developer", "Data Engineer", "DevOps инженер", "QA Automation", "Аналитик"]
+_SKILLS = ["Django", "Flask", "PostgreSQL", "Kafka", "Docker", "Kubernetes", "FastAPI", "Spark", "Airflow"]
+_EXPERIENCE = [("noExperience", "Нет опыта"), ("between1And3", "От 1 года до 3 лет"), ("between3And6", "От 3 до 6 лет")]
+_EMPLOYMENT = [("full", "Полная занятость"), ("part", "Частичная занятость"), ("project", "Проектная работа")]
+
+
+def make_item(index: int, employer_id: int = 1740, rng: random.Random = None) -> Dict[str, Any]:
+    """Один элемент списка вакансий в формате HH API"""
+    rng = rng or random.Random(index)
+    salary_from = rng.choice([None, rng.randrange(50_000, 300_000, 5_000)])
+    salary_to = rng.choice([None, (salary_from or 60_000) + rng.randrange(0, 150_000, 5_000)])
+    experience = rng.choice(_EXPERIENCE)
+    employment = rng.choice(_EMPLOYMENT)
+    skills = rng.sample(_SKILLS, 3)
+    vacancy_id = employer_id * 10_000_000 + index
+    return {
+        "id": str(vacancy_id),
+        "premium": False,
+        "name": f"{rng.choice(_TITLES)} #{index}",
+        "department": None,
+        "has_test": rng.random() < 0.2,
+        "response_letter_required": False,
+        "area": {"id": "1", "name": "Москва", "url": "https://api.hh.ru/areas/1"},
+        "salary": {"from": salary_from, "to": salary_to, "currency": "RUR", "gross": True},
+        "type": {"id": "open", "name": "Открытая"},
+        "address": None,
+        "response_url": None,
+        "published_at": "2025-08-01T12:00:00+0300",
+        "created_at": "2025-08-01T12:00:00+0300",
+        "archived": False,
+        "apply_alternate_url": f"https://hh.ru/applicant/vacancy_response?vacancyId={vacancy_id}",
+        "url": f"https://api.hh.ru/vacancies/{vacancy_id}?host=hh.ru",
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "relations": [],
+        "employer": {
+            "id": str(employer_id),
+            "name": f"Employer {employer_id}",
+            "url": f"https://api.hh.ru/employers/{employer_id}",
+            "alternate_url": f"https://hh.ru/employer/{employer_id}",
+            "logo_urls": {"90": "https://img.hhcdn.ru/90.png", "240": "https://img.hhcdn.ru/240.png"},
+            "vacancies_url": f"https://api.hh.ru/vacancies?employer_id={employer_id}",
+            "trusted": True,
+        },
+        "snippet": {
+            "requirement": f"Опыт работы с <highlighttext>{skills[0]}</highlighttext>, {skills[1]} и {skills[2]}. "
+                           "Понимание принципов <b>ООП</b>, умение писать тесты.",
+            "responsibility": "Разработка и поддержка сервисов, участие в код-ревью, <em>оптимизация</em> запросов.",
+        },
+        "schedule": {"id": "remote", "name": "Удаленная работа"},
+        "working_days": [],
+        "working_time_intervals": [],
+        "working_time_modes": [],
+        "accept_temporary": False,
+        "professional_roles": [{"id": "96", "name": "Программист, разработчик"}],
+        "accept_incomplete_resumes": False,
+        "experience": {"id": experience[0], "name": experience[1]},
+        "employment": {"id": employment[0], "name": employment[1]},
+    }
+
+
+def make_items(count: int, seed: int = 0, employer_id: int = 1740) -> List[Dict[str, Any]]:
+    """Список из count элементов, детерминированный по seed"""
+    rng = random.Random(seed)
+    return [make_item(i, employer_id, rng) for i in range(count)]
+
+
+def iter_items(count: int, seed: int = 0, employer_id: int = 1740) -> Iterator[Dict[str, Any]]:
+    """Ленивый генератор элементов для больших объемов"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield make_item(i, employer_id, rng)
+
+
+def make_page(page: int, per_page: int, found: int, employer_id: int = 1740) -> Dict[str, Any]:
+    """Страница ответа /vacancies с учетом пагинации"""
+    start = page * per_page
+    count = max(0, min(per_page, found - start))
+    rng = random.Random(employer_id * 1_000_003 + page)
+    return {
+        "items": [make_item(start + i, employer_id, rng) for i in range(count)],
+        "found": found,
+        "pages": (found + per_page - 1) // per_page if per_page else 0,
+        "page": page,
+        "per_page": per_page,
+    }
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Офлайн микро-бенчмарки горячих путей: парсинг, хранилище, фильтрация, сортировка.
+
+Запуск:
+    python benchmarks/run_benchmarks.py                       # размеры 1k и 100k
+    python benchmarks/run_benchmarks.py --sizes 1k 100k 1m    # полный прогон
+    python benchmarks/run_benchmarks.py --json out.json --compare benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+
+При сравнении с базовой линией скрипт завершается с кодом 1, если хотя бы
+один бенчмарк стал медленнее больше чем на --threshold (по умолчанию 25%).
+Базовая линия зависит от машины, перед сравнением ее стоит записать локально.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+sys.path.insert(0, current_dir)
+
+from payloads import iter_items  # noqa: E402
+from src.models.vacancy import Vacancy  # noqa: E402
+from src.storage.json_saver import JSONSaver  # noqa: E402
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BATCH = 50_000  # Элементы генерируются пачками, чтобы 1M не занимал гигабайты
+
+
+def timed(func: Callable[[], None], repeat: int) -> float:
+    """Минимальное время из repeat запусков"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def batches(size: int):
+    """Пачки синтетических элементов общего размера size"""
+    items = iter_items(size)
+    while True:
+        batch = list(itertools.islice(items, BATCH))
+        if not batch:
+            return
+        yield batch
+
+
+def bench_cast(size: int, repeat: int) -> float:
+    total = 0.0
+    for batch in batches(size):
+        total += timed(lambda: Vacancy.cast_to_object_list(batch), repeat)
+    return total
+
+
+def bench_clean_html(size: int, repeat: int) -> float:
+    total = 0.0
+    for batch in batches(size):
+        snippets = [item["snippet"]["requirement"] for item in batch]
+        total += timed(lambda: [Vacancy.clean_html(text) for text in snippets], repeat)
+    return total
+
+
+def bench_sort(size: int, repeat: int) -> float:
+    vacancies = []
+    for batch in batches(size):
+        vacancies.extend(Vacancy.cast_to_object_list(batch))
+    return timed(lambda: sorted(vacancies, reverse=True), repeat)
+
+
+def prepare_store(directory: str, size: int) -> JSONSaver:
+    """Хранилище, заранее заполненное size вакансиями"""
+    path = Path(directory) / f"bench_{size}.json"
+    rows = []
+    for batch in batches(size):
+        rows.extend(
+            {"title": v.title, "url": v.url, "salary": v.salary, "description": v.description}
+            for v in Vacancy.cast_to_object_list(batch)
+        )
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(rows, file, ensure_ascii=False, indent=2)
+    return JSONSaver(path)
+
+
+def bench_storage(size: int, repeat: int) -> Dict[str, float]:
+    """Стоимость одной операции над хранилищем размера size"""
+    extra = Vacancy("Benchmark", "https://hh.ru/vacancy/1", 100_000, "Django")
+    criteria = {"description": "django", "salary": {"min": 100_000, "max": 200_000}}
+    with tempfile.TemporaryDirectory() as directory:
+        saver = prepare_store(directory, size)
+        add_times, delete_times = [], []
+        for _ in range(repeat):
+            add_times.append(timed(lambda: saver.add_vacancy(extra), 1))
+            delete_times.append(timed(lambda: saver.delete_vacancy(extra), 1))
+        add, delete = min(add_times), min(delete_times)
+        get = timed(lambda: saver.get_vacancies(criteria), repeat)
+    return {"json_saver.add_vacancy": add, "json_saver.get_vacancies": get, "json_saver.delete_vacancy": delete}
+
+
+def run(sizes: List[str], repeat: int) -> List[dict]:
+    results = []
+    for label in sizes:
+        size = SIZES[label]
+        timings = {
+            "vacancy.cast_to_object_list": bench_cast(size, repeat),
+            "vacancy.clean_html": bench_clean_html(size, repeat),
+            "vacancy.sort": bench_sort(size, repeat),
+        }
+        timings.update(bench_storage(size, repeat))
+        for name, seconds in timings.items():
+            results.append({"name": name, "size": label, "seconds": seconds})
+            print(f"{name:<30} {label:>5} {seconds * 1000:12.3f} мс")
+    return results
+
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> List[str]:
+    """Список регрессий относительно базовой линии"""
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = {(row["name"], row["size"]): row["seconds"] for row in json.load(file)["results"]}
+
+    regressions = []
+    for row in results:
+        base = baseline.get((row["name"], row["size"]))
+        if base and row["seconds"] > base * (1 + threshold):
+            regressions.append(
+                f"{row['name']} [{row['size']}]: {base * 1000:.3f} мс -> {row['seconds'] * 1000:.3f} мс "
+                f"(+{(row['seconds'] / base - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн микро-бенчмарки HH API Integration")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["1k", "100k"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Файл для машиночитаемых результатов")
+    parser.add_argument("--compare", help="Файл базовой линии для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Допустимое замедление (доля)")
+    parser.add_argument("--save-baseline", help="Сохранить результаты как базовую линию")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    report = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print("\n❌ Обнаружены регрессии:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ Регрессий относительно базовой линии нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import math
+import random
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+class KLLSketch:
+    """
+    Потоковый скетч квантилей KLL (Karnin, Lang, Liberty, 2016).
+
+    Хранит O(k) элементов при любом объеме потока; ошибка ранга порядка 1.7/k
+    (около 1% при k=200). Скетчи объединяются через merge(), поэтому их можно
+    вести независимо по секциям и процессам, а затем сложить.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: Optional[int] = None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.levels: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value: float) -> None:
+        """Добавление значения"""
+        self.levels[0].append(value)
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.update(value)
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    # Половина отсортированного уровня поднимается выше с удвоенным весом
+                    items.sort()
+                    offset = self._rng.randint(0, 1)
+                    keep = [items.pop()] if len(items) % 2 else []
+                    self.levels[level + 1].extend(items[offset::2])
+                    self.levels[level] = keep
+                    break
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Добавление другого скетча к этому"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Значение квантили q (0..1); None для пустого скетча"""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        if not weighted:
+            return [None] * len(qs)
+        total = sum(weight for _, weight in weighted)
+        result = []
+        for q in qs:
+            target, cumulative = q * total, 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            result.append(value)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "n": self.n, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data.get("k", 200))
+        sketch.n = data.get("n", 0)
+        sketch.levels = [list(items) for items in data.get("levels", [[]])] or [[]]
+        return sketch
@@ -0,0 +1,104 @@
+import gzip
+import heapq
+import json
+import threading
+import time
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from api.transport import endpoint_label
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.api.transport import endpoint_label
+    from src.monitoring.metrics import metrics
+
+
+class PayloadArchive:
+    """
+    Архив сырых ответов API: JSONL в gzip, только дозапись.
+
+    Файлы разбиты по дате и эндпоинту: <directory>/YYYY-MM-DD/<endpoint>.jsonl.gz.
+    Каждая запись дописывается отдельным gzip-членом, поэтому обрыв процесса
+    портит не более одной последней записи, а прочитанные ранее остаются целыми.
+    """
+
+    def __init__(self, directory: str = "data/archive"):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def path_for(self, endpoint: str, day: date) -> Path:
+        name = endpoint.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        return self.directory / day.isoformat() / f"{name}.jsonl.gz"
+
+    def append(self, url: str, params: Optional[Dict[str, Any]], status: int, body: str) -> None:
+        """Дозапись ответа в архив"""
+        endpoint = endpoint_label(url)
+        line = json.dumps({
+            "ts": time.time(),
+            "url": url,
+            "endpoint": endpoint,
+            "params": {str(k): v for k, v in (params or {}).items()},
+            "status": status,
+            "body": json.loads(body),
+        }, ensure_ascii=False) + "\n"
+        path = self.path_for(endpoint, date.today())
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(path, "at", encoding="utf-8") as file:
+                file.write(line)
+        metrics.inc("hh_archive_records_total", endpoint=endpoint)
+
+    def iter_records(self, endpoint: Optional[str] = None, since: Optional[date] = None) -> Iterator[Dict[str, Any]]:
+        """Записи архива в хронологическом порядке (по дням, внутри файла — по времени записи)"""
+        if not self.directory.exists():
+            return
+        for day_dir in sorted(p for p in self.directory.iterdir() if p.is_dir()):
+            try:
+                day = date.fromisoformat(day_dir.name)
+            except ValueError:
+                continue
+            if since and day < since:
+                continue
+            paths = [self.path_for(endpoint, day)] if endpoint else sorted(day_dir.glob("*.jsonl.gz"))
+            # Файлы дня сливаются по времени записи потоково, без загрузки в память
+            files = [self._read_file(path) for path in paths if path.exists()]
+            yield from heapq.merge(*files, key=lambda record: record["ts"])
+
+    @staticmethod
+    def _read_file(path: Path) -> Iterator[Dict[str, Any]]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    if line.endswith("\n"):
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            # Недописанная последняя запись после аварийного завершения
+            print(f"⚠️ Архив {path} обрезан, прочитаны записи до точки обрыва")
+
+
+class ArchivingTransport:
+    """Обертка над транспортом: успешные ответы дописываются в PayloadArchive"""
+
+    def __init__(self, inner, archive: PayloadArchive):
+        self.inner = inner
+        self.archive = archive
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.inner.headers
+
+    @property
+    def concurrency(self) -> int:
+        return self.inner.concurrency
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, retry: bool = True):
+        response = self.inner.get(url, params, retry=retry)
+        if response.status_code == 200:
+            try:
+                self.archive.append(url, params, response.status_code, response.text)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Не удалось сохранить ответ в архив: {e}")
+        return response
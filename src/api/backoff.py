@@ -0,0 +1,196 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+try:
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.monitoring.metrics import metrics
+
+
+@dataclass
+class RetryPolicy:
+    """Политика повторов: экспоненциальная задержка с джиттером и учетом Retry-After"""
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    @classmethod
+    def from_env(cls):
+        """Создание политики из переменных окружения"""
+        return cls(
+            max_retries=int(os.getenv("HH_MAX_RETRIES", "5")),
+            base_delay=float(os.getenv("HH_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("HH_RETRY_MAX_DELAY", "30")),
+        )
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Пауза перед повтором номер attempt (с нуля)"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Значение заголовка Retry-After в секундах (поддерживается только числовая форма)"""
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class AIMDController:
+    """
+    Регулятор числа одновременных запросов по схеме AIMD.
+
+    Пока задержки ниже целевой и ошибок нет, лимит растет на единицу за
+    «окно» запросов; на 429/5xx и медленных ответах — умножается на decrease.
+    Retry-After приостанавливает выдачу новых слотов для всех потоков.
+    """
+
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 16,
+                 latency_target: float = 2.0, decrease: float = 0.5, cooldown: float = 1.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._throttled = 0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        """Создание регулятора из переменных окружения"""
+        return cls(
+            initial=int(os.getenv("HH_INITIAL_CONCURRENCY", "2")),
+            max_limit=int(os.getenv("HH_MAX_CONCURRENCY", "16")),
+            latency_target=float(os.getenv("HH_LATENCY_TARGET", "2.0")),
+        )
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self._in_flight >= self.limit:
+                    self._cond.wait()
+                else:
+                    break
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Контекстный менеджер для одного запроса"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self, latency: float) -> None:
+        """Аддитивное увеличение лимита при здоровых ответах"""
+        if latency > self.latency_target:
+            self.on_congestion()
+            return
+        with self._cond:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def on_congestion(self, retry_after: Optional[float] = None) -> None:
+        """Мультипликативное снижение лимита, не чаще раза в cooldown секунд"""
+        with self._cond:
+            now = time.monotonic()
+            self._throttled += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if now - self._last_decrease >= self.cooldown:
+                self._limit = max(self.min_limit, self._limit * self.decrease)
+                self._last_decrease = now
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущее состояние регулятора"""
+        with self._cond:
+            return {"limit": self.limit, "in_flight": self._in_flight, "throttled": self._throttled}
+
+
+class RetryingTransport:
+    """
+    Обертка над транспортом: повторы временных ошибок и регулирование конкурентности.
+    Если задан limiter (api.rate_limit.HostRateLimiter), каждая попытка сначала
+    получает у него токен с приоритетом priority.
+    """
+
+    def __init__(self, inner, policy: Optional[RetryPolicy] = None, controller: Optional[AIMDController] = None,
+                 limiter=None, priority: str = "default"):
+        self.inner = inner
+        self.policy = policy or RetryPolicy()
+        self.controller = controller or AIMDController()
+        self.limiter = limiter
+        self.priority = priority
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.inner.headers
+
+    @property
+    def concurrency(self) -> int:
+        return self.controller.max_limit
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, retry: bool = True):
+        """GET-запрос с повторами при 429/5xx и сетевых ошибках"""
+        attempts = self.policy.max_retries + 1 if retry else 1
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            if self.limiter is not None:
+                self.limiter.acquire(self.priority)
+            with self.controller.slot():
+                start = time.monotonic()
+                try:
+                    response = self.inner.get(url, params)
+                except (requests.ConnectionError, requests.Timeout):
+                    self.controller.on_congestion()
+                    if last_attempt:
+                        raise
+                    response = None
+                latency = time.monotonic() - start
+
+            if response is None:
+                metrics.inc("hh_http_retries_total", reason="connection")
+                time.sleep(self.policy.delay(attempt))
+                continue
+
+            if response.status_code in self.policy.retry_statuses:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.controller.on_congestion(retry_after)
+                if self.limiter is not None and response.status_code == 429:
+                    # Остальные процессы хоста тоже ждут, а не добирают квоту
+                    self.limiter.pause(retry_after or self.policy.base_delay)
+                if not last_attempt:
+                    metrics.inc("hh_http_retries_total", reason=response.status_code)
+                    time.sleep(self.policy.delay(attempt, retry_after))
+                    continue
+            else:
+                self.controller.on_success(latency)
+            return response
@@ -1,8 +1,54 @@
-import requests
-from typing import List, Dict, Any
-import time
-from dataclasses import dataclass
+import math
 import os
+import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from dataclasses import asdict, dataclass
+
+try:
+    from api.details import VacancyDetailsFetcher
+    from api.hh_api import get_base_url
+    from api.transport import HTTPTransport, build_transport
+    from models.vacancy_record import VacancyRecord
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.api.details import VacancyDetailsFetcher
+    from src.api.hh_api import get_base_url
+    from src.api.transport import HTTPTransport, build_transport
+    from src.models.vacancy_record import VacancyRecord
+    from src.monitoring.metrics import metrics
+
+
+MAX_SEARCH_DEPTH = 2000  # HH отдает не больше 2000 элементов одной выдачи
+
+# Работодатели по умолчанию; для обхода большего числа используется реестр employers
+PREDEFINED_COMPANIES = [
+    {"id": 1740, "name": "Яндекс"},  # Яндекс
+    {"id": 1122462, "name": "Сбер"},  # Сбер
+    {"id": 15478, "name": "VK"},  # VK
+    {"id": 2180, "name": "Ozon"},  # Ozon
+    {"id": 2748, "name": "Ростелеком"},  # Ростелеком
+    {"id": 3529, "name": "Тинькофф"},  # Тинькофф
+    {"id": 4181, "name": "Билайн"},  # Билайн
+    {"id": 907345, "name": "Альфа-Банк"},  # Альфа-Банк
+    {"id": 4934, "name": "МТС"},  # МТС
+    {"id": 1057, "name": "Kaspersky"},  # Kaspersky
+    {"id": 1373, "name": "Лаборатория Касперского"},  # Лаборатория Касперского
+    {"id": 87021, "name": "Wildberries"},  # Wildberries
+    {"id": 157944, "name": "2GIS"},  # 2GIS
+    {"id": 6093775, "name": "Yandex Praktikum"},  # Яндекс Практикум
+    {"id": 2324020, "name": "Skyeng"}  # Skyeng
+]
+
+
+@dataclass
+class CrawlPlan:
+    """План обхода компании по результату пробного запроса"""
+    employer_id: int
+    name: str
+    found: int  # Число вакансий с зарплатой
+    pages: int  # Сколько страниц загружать
 
 
 @dataclass
@@ -18,46 +64,25 @@ class Company:
 class HHCompanyAPI:
     """Класс для работы с API компаний HeadHunter"""
 
-    def __init__(self):
-        self.base_url = "https://api.hh.ru"
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[HTTPTransport] = None,
+                 details: Optional[VacancyDetailsFetcher] = None):
+        self.base_url = get_base_url(base_url)
         self.headers = {"User-Agent": "HH-Company-API/1.0"}
+        self.transport = transport or build_transport(self.headers, priority="crawl")
         self.companies = self._get_predefined_companies()
+        # Полные карточки вакансий (описание, навыки): явно или через HH_ENRICH_DETAILS=1
+        if details is None and os.getenv("HH_ENRICH_DETAILS", "0") == "1":
+            details = VacancyDetailsFetcher(self.base_url, self.transport)
+        self.details = details
 
     def _get_predefined_companies(self) -> List[Dict[str, Any]]:
         """Список предопределенных компаний для сбора данных"""
-        return [
-            {"id": 1740, "name": "Яндекс"},  # Яндекс
-            {"id": 1122462, "name": "Сбер"},  # Сбер
-            {"id": 15478, "name": "VK"},  # VK
-            {"id": 2180, "name": "Ozon"},  # Ozon
-            {"id": 2748, "name": "Ростелеком"},  # Ростелеком
-            {"id": 3529, "name": "Тинькофф"},  # Тинькофф
-            {"id": 4181, "name": "Билайн"},  # Билайн
-            {"id": 907345, "name": "Альфа-Банк"},  # Альфа-Банк
-            {"id": 4934, "name": "МТС"},  # МТС
-            {"id": 1057, "name": "Kaspersky"},  # Kaspersky
-            {"id": 1373, "name": "Лаборатория Касперского"},  # Лаборатория Касперского
-            {"id": 87021, "name": "Wildberries"},  # Wildberries
-            {"id": 157944, "name": "2GIS"},  # 2GIS
-            {"id": 6093775, "name": "Yandex Praktikum"},  # Яндекс Практикум
-            {"id": 2324020, "name": "Skyeng"}  # Skyeng
-        ]
+        return [dict(company) for company in PREDEFINED_COMPANIES]
 
     def get_company_info(self, company_id: int) -> Dict[str, Any]:
         """Получение информации о компании по ID"""
         try:
-            url = f"{self.base_url}/employers/{company_id}"
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-
-            data = response.json()
-            return {
-                "id": data.get("id"),
-                "name": data.get("name"),
-                "alternate_url": data.get("alternate_url"),
-                "description": self._clean_html(data.get("description", "")),
-                "vacancies_url": data.get("vacancies_url")
-            }
+            return self.fetch_company_info(company_id)
 
         except requests.RequestException as e:
             print(f"Ошибка при получении данных компании {company_id}: {e}")
@@ -66,46 +91,145 @@ class HHCompanyAPI:
             print(f"Неожиданная ошибка для компании {company_id}: {e}")
             return {}
 
-    def get_company_vacancies(self, company_id: int, per_page: int = 100) -> List[Dict[str, Any]]:
-        """Получение вакансий компании"""
-        vacancies = []
-        page = 0
-
-        try:
-            while True:
-                url = f"{self.base_url}/vacancies"
-                params = {
-                    "employer_id": company_id,
-                    "per_page": per_page,
-                    "page": page,
-                    "only_with_salary": True  # Только вакансии с зарплатой
-                }
-
-                response = requests.get(url, headers=self.headers, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-                vacancies.extend(data.get("items", []))
+    def fetch_company_info(self, company_id: int) -> Dict[str, Any]:
+        """Вариант get_company_info, в котором ошибки запроса пробрасываются вызывающему"""
+        response = self.transport.get(f"{self.base_url}/employers/{company_id}")
+        response.raise_for_status()
+        return self.company_info_from_api(response.json())
 
-                # Проверяем есть ли следующая страница
-                pages = data.get("pages", 0)
-                if page >= pages - 1 or page >= 4:  # Ограничиваем 5 страницами
-                    break
+    @classmethod
+    def company_info_from_api(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Проекция ответа /employers/{id} в данные компании"""
+        return {
+            "id": data.get("id"),
+            "name": data.get("name"),
+            "alternate_url": data.get("alternate_url"),
+            "description": cls._clean_html(data.get("description", "")),
+            "vacancies_url": data.get("vacancies_url")
+        }
 
-                page += 1
-                time.sleep(0.1)  # Задержка чтобы не превысить лимиты API
+    def get_company_vacancies(self, company_id: int, per_page: int = 100,
+                              max_pages: int = 5, pages: Optional[int] = None) -> List[VacancyRecord]:
+        """
+        Получение вакансий компании в виде компактных записей
+        :param pages: число страниц, если известно заранее (см. plan_crawl) — тогда все грузятся параллельно
+        """
+        vacancies = []
 
+        try:
+            self._load_vacancies(vacancies, company_id, per_page, max_pages, pages)
         except requests.RequestException as e:
             print(f"Ошибка при получении вакансий компании {company_id}: {e}")
         except Exception as e:
             print(f"Неожиданная ошибка при получении вакансий: {e}")
 
+        if self.details and vacancies:
+            self.details.enrich(vacancies)
+        return vacancies
+
+    def fetch_company_vacancies(self, company_id: int, per_page: int = 100,
+                                max_pages: int = 5, pages: Optional[int] = None) -> List[VacancyRecord]:
+        """
+        Вариант get_company_vacancies, в котором ошибка любой страницы пробрасывается:
+        неполный список не выдается за результат обхода
+        """
+        vacancies = []
+        self._load_vacancies(vacancies, company_id, per_page, max_pages, pages)
+        if self.details and vacancies:
+            self.details.enrich(vacancies)
         return vacancies
 
+    def _load_vacancies(self, vacancies: List[VacancyRecord], company_id: int, per_page: int,
+                        max_pages: int, pages: Optional[int]) -> None:
+        """Загрузка страниц вакансий компании в список vacancies"""
+        first = 0
+        if pages is None:
+            records, pages = self._fetch_vacancies_page(company_id, per_page, 0)
+            vacancies.extend(records)
+            first = 1
+
+        # Ограничиваем max_pages страницами, остальные грузим параллельно
+        pages = min(pages, max_pages)
+        if pages > first:
+            workers = max(1, min(getattr(self.transport, "concurrency", 1), pages - first))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for records, _ in executor.map(
+                    lambda page: self._fetch_vacancies_page(company_id, per_page, page), range(first, pages)
+                ):
+                    vacancies.extend(records)
+
+    def probe_vacancies(self, company_id: int) -> int:
+        """Число вакансий компании (с зарплатой) без загрузки элементов"""
+        url = f"{self.base_url}/vacancies"
+        params = {"employer_id": company_id, "per_page": 0, "only_with_salary": True}
+        response = self.transport.get(url, params=params)
+        if response.status_code == 400:
+            # Если per_page=0 не принят, достаточно страницы из одного элемента
+            response = self.transport.get(url, params={**params, "per_page": 1})
+        response.raise_for_status()
+        return response.json().get("found", 0)
+
+    def plan_crawl(self, min_vacancies: int = 5, per_page: int = 100, max_pages: int = 5,
+                   page_budget: Optional[int] = None) -> List[CrawlPlan]:
+        """
+        План обхода по пробным запросам ко всем компаниям (выполняются параллельно).
+        Компании с числом вакансий меньше min_vacancies отбрасываются до загрузки страниц,
+        остальные получают ровно нужное число страниц, при заданном page_budget —
+        пропорционально размеру. Крупные компании идут первыми: iter_companies_with_vacancies
+        обходит компании параллельно, и самые долгие обходы начинаются раньше остальных.
+        """
+        def probe(company: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[int]]:
+            try:
+                return company, self.probe_vacancies(company["id"])
+            except requests.RequestException as e:
+                print(f"Ошибка пробного запроса для {company['name']}: {e}")
+                return company, None
+
+        workers = max(1, min(getattr(self.transport, "concurrency", 1), len(self.companies)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            probes = list(executor.map(probe, self.companies))
+
+        plans = []
+        for company, found in probes:
+            if found is None or found < min_vacancies:
+                continue
+            pages = min(math.ceil(min(found, MAX_SEARCH_DEPTH) / per_page), max_pages)
+            plans.append(CrawlPlan(company["id"], company["name"], found, pages))
+
+        if page_budget is not None and sum(plan.pages for plan in plans) > page_budget:
+            total_found = sum(plan.found for plan in plans)
+            for plan in plans:
+                plan.pages = min(plan.pages, max(1, page_budget * plan.found // total_found))
+
+        plans.sort(key=lambda plan: plan.found, reverse=True)
+        print(f"📋 План обхода: {len(plans)} из {len(self.companies)} компаний, "
+              f"{sum(plan.pages for plan in plans)} страниц")
+        return plans
+
+    def _fetch_vacancies_page(self, company_id: int, per_page: int, page: int) -> Tuple[List[VacancyRecord], int]:
+        """Загрузка одной страницы вакансий компании: (записи, число страниц)"""
+        params = {
+            "employer_id": company_id,
+            "per_page": per_page,
+            "page": page,
+            "only_with_salary": True  # Только вакансии с зарплатой
+        }
+        response = self.transport.get(f"{self.base_url}/vacancies", params=params)
+        response.raise_for_status()
+
+        data = response.json()
+        # Сразу проецируем элементы, сырая страница освобождается при выходе
+        with metrics.timer("hh_parse_seconds", model="vacancy_record"):
+            records = [VacancyRecord.from_api(item) for item in data.get("items", [])]
+        metrics.inc("hh_items_parsed_total", len(records), model="vacancy_record")
+        return records, data.get("pages", 0)
+
     def get_all_companies_data(self) -> List[Dict[str, Any]]:
         """Получение данных всех компаний"""
-        companies_data = []
+        return list(self.iter_companies_data())
 
+    def iter_companies_data(self) -> Iterator[Dict[str, Any]]:
+        """Потоковое получение данных компаний: в памяти одна компания за раз"""
         for company in self.companies:
             print(f"Получение данных компании: {company['name']}...")
 
@@ -113,17 +237,13 @@ class HHCompanyAPI:
             if company_info:
                 vacancies = self.get_company_vacancies(company["id"])
                 company_info["vacancies"] = vacancies
-                companies_data.append(company_info)
-
                 print(f"✅ {company['name']}: {len(vacancies)} вакансий")
+                yield company_info
             else:
                 print(f"❌ Не удалось получить данные для {company['name']}")
 
-            time.sleep(0.5)  # Задержка между запросами
-
-        return companies_data
-
-    def _clean_html(self, text: str) -> str:
+    @staticmethod
+    def _clean_html(text: str) -> str:
         """Очистка HTML тегов из текста"""
         import re
         if not text:
@@ -133,8 +253,63 @@ class HHCompanyAPI:
 
     def get_companies_with_vacancies(self, min_vacancies: int = 5) -> List[Dict[str, Any]]:
         """Получение компаний с минимальным количеством вакансий"""
-        all_data = self.get_all_companies_data()
-        return [company for company in all_data if len(company.get("vacancies", [])) >= min_vacancies]
+        return list(self.iter_companies_with_vacancies(min_vacancies))
+
+    def iter_companies_with_vacancies(self, min_vacancies: int = 5, checkpoint=None) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковый вариант get_companies_with_vacancies: страницы грузятся только по плану обхода.
+        Компании обходятся параллельно в пределах конкурентности транспорта, в памяти
+        одновременно не больше стольких компаний; выдаются по мере готовности.
+        С checkpoint (storage.checkpoint.CrawlCheckpoint) план берется из контрольной точки,
+        а уже сохраненные компании пропускаются; отмечает их потребитель после записи.
+        Компания, запрос которой завершился ошибкой, отмечается как невыполненная.
+        """
+        if checkpoint is not None and checkpoint.plan is not None:
+            plans = [CrawlPlan(**plan) for plan in checkpoint.plan]
+        else:
+            plans = self.plan_crawl(min_vacancies)
+            if checkpoint is not None:
+                checkpoint.set_plan([asdict(plan) for plan in plans])
+        plans = [plan for plan in plans if checkpoint is None or not checkpoint.is_done(plan.employer_id)]
+        if not plans:
+            return
+
+        def fetch(plan: CrawlPlan) -> Dict[str, Any]:
+            # Ошибки запросов пробрасываются: неполные данные не должны считаться обходом компании
+            print(f"Получение данных компании: {plan.name} ({plan.found} вакансий)...")
+            company_info = self.fetch_company_info(plan.employer_id)
+            company_info["vacancies"] = self.fetch_company_vacancies(plan.employer_id, pages=plan.pages)
+            return company_info
+
+        workers = max(1, min(getattr(self.transport, "concurrency", 1), len(plans)))
+        queue = iter(plans)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Следующая компания плана запускается, как только освобождается место
+            running = {executor.submit(fetch, plan): plan for plan in islice(queue, workers)}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    plan = running.pop(future)
+                    try:
+                        company_info = future.result()
+                    except requests.RequestException as e:
+                        # Компания остается невыполненной: продолжение обхода повторит ее
+                        print(f"❌ Не удалось получить данные для {plan.name}: {e}")
+                        if checkpoint is not None:
+                            checkpoint.mark_failed(plan.employer_id, str(e))
+                        company_info = None
+                    next_plan = next(queue, None)
+                    if next_plan is not None:
+                        running[executor.submit(fetch, next_plan)] = next_plan
+
+                    if company_info is None:
+                        continue
+                    vacancies = company_info["vacancies"]
+                    if len(vacancies) >= min_vacancies:
+                        print(f"✅ {plan.name}: {len(vacancies)} вакансий")
+                        yield company_info
+                    elif checkpoint is not None:
+                        checkpoint.mark_done(plan.employer_id, vacancies=0)
 
 
 # Утилитарная функция для использования в основном коде
@@ -142,3 +317,9 @@ def fetch_companies_data() -> List[Dict[str, Any]]:
     """Получение данных компаний с вакансиями"""
     api = HHCompanyAPI()
     return api.get_companies_with_vacancies(min_vacancies=3)
+
+
+def iter_companies_data(checkpoint=None) -> Iterator[Dict[str, Any]]:
+    """Потоковое получение данных компаний с вакансиями (с продолжением по контрольной точке)"""
+    api = HHCompanyAPI()
+    return api.iter_companies_with_vacancies(min_vacancies=3, checkpoint=checkpoint)
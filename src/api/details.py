@@ -0,0 +1,130 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+try:
+    from api.hh_api import get_base_url
+    from api.transport import HTTPTransport, build_transport
+    from models.vacancy import Vacancy
+    from models.vacancy_record import VacancyRecord
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.api.hh_api import get_base_url
+    from src.api.transport import HTTPTransport, build_transport
+    from src.models.vacancy import Vacancy
+    from src.models.vacancy_record import VacancyRecord
+    from src.monitoring.metrics import metrics
+
+
+class VacancyDetailsCache:
+    """
+    Дисковый кэш полных карточек вакансий: <directory>/<id % 256>/<id>.json.
+    Запись действительна, пока не изменилась версия вакансии из выдачи (published_at).
+
+    В элементах выдачи нет updated_at, поэтому единственный сигнал сброса без запроса
+    карточки — переопубликация. Правка вакансии без смены published_at отдается из
+    кэша в прежнем виде. updated_at карточки хранится вместе с записью и проверяется,
+    если вызывающий его знает.
+    """
+
+    def __init__(self, directory: str = "data/details"):
+        self.directory = Path(directory)
+
+    def _path(self, hh_id: int) -> Path:
+        return self.directory / f"{hh_id % 256:02x}" / f"{hh_id}.json"
+
+    def get(self, hh_id: int, version: Optional[str],
+            updated_at: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        path = self._path(hh_id)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != version:
+            return None
+        if updated_at is not None and entry.get("updated_at") != updated_at:
+            return None
+        return entry
+
+    def put(self, hh_id: int, version: Optional[str], details: Dict[str, Any]) -> None:
+        path = self._path(hh_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"version": version, **details}, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class VacancyDetailsFetcher:
+    """
+    Обогащение вакансий полными карточками /vacancies/{id}: описание и ключевые навыки.
+
+    Запросы идут параллельно через общий транспорт, поэтому подчиняются тому же
+    регулятору конкурентности и повторам, что и остальные клиенты. Карточки
+    кэшируются по id и published_at из выдачи: для вакансий с прежней датой публикации
+    запросы не выполняются (ограничения см. в VacancyDetailsCache).
+    """
+
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[HTTPTransport] = None,
+                 cache: Optional[VacancyDetailsCache] = None):
+        self.base_url = get_base_url(base_url)
+        self.transport = transport or build_transport({"User-Agent": "HH-Company-API/1.0"}, priority="crawl")
+        self.cache = cache or VacancyDetailsCache(os.getenv("HH_DETAILS_CACHE_DIR", "data/details"))
+
+    def fetch(self, hh_id: int) -> Dict[str, Any]:
+        """Загрузка полной карточки вакансии"""
+        response = self.transport.get(f"{self.base_url}/vacancies/{hh_id}")
+        response.raise_for_status()
+        return self.details_from_api(response.json())
+
+    @staticmethod
+    def details_from_api(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Проекция ответа /vacancies/{id}: описание, ключевые навыки и время правки карточки"""
+        return {
+            "description": Vacancy.clean_html(data.get("description", "")),
+            "key_skills": [skill["name"] for skill in data.get("key_skills") or []],
+            "updated_at": data.get("updated_at"),
+        }
+
+    def enrich(self, records: List[VacancyRecord]) -> int:
+        """
+        Заполнение description и key_skills у записей.
+        :return: число выполненных запросов к API
+        """
+        pending = []
+        for record in records:
+            if record.hh_id is None:
+                continue
+            details = self.cache.get(record.hh_id, record.published_at)
+            if details is None:
+                metrics.inc("hh_cache_misses_total", cache="vacancy_details")
+                pending.append(record)
+            else:
+                metrics.inc("hh_cache_hits_total", cache="vacancy_details")
+                self.apply_details(record, details)
+        if not pending:
+            return 0
+
+        def load(record: VacancyRecord) -> None:
+            try:
+                details = self.fetch(record.hh_id)
+            except (requests.RequestException, ValueError) as e:
+                print(f"⚠️ Не удалось получить карточку вакансии {record.hh_id}: {e}")
+                return
+            self.apply_details(record, details)
+            self.cache.put(record.hh_id, record.published_at, details)
+
+        workers = max(1, min(getattr(self.transport, "concurrency", 1), len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(load, pending))
+        return len(pending)
+
+    @staticmethod
+    def apply_details(record: VacancyRecord, details: Dict[str, Any]) -> None:
+        record.description = details.get("description") or record.description
+        record.key_skills = details.get("key_skills") or None
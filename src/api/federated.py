@@ -0,0 +1,174 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from api.hh_api import JobAPI
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.api.hh_api import JobAPI
+    from src.monitoring.metrics import metrics
+
+
+@dataclass
+class BackendStatus:
+    """Итог по одному источнику вакансий"""
+
+    found: int = 0  # Получено вакансий (до объединения)
+    pages: int = 0  # Загружено страниц
+    complete: bool = False  # Все страницы получены до дедлайна
+    hedged: int = 0  # Сколько запросов было продублировано
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FederatedResult:
+    """Объединенная выдача всех источников"""
+
+    items: List[dict] = field(default_factory=list)
+    backends: Dict[str, BackendStatus] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def partial(self) -> bool:
+        return not all(status.complete for status in self.backends.values())
+
+
+class _Task:
+    """Логический запрос (источник, страница) и его попытки"""
+
+    def __init__(self, backend: str, page: Optional[int], started: float):
+        self.backend = backend
+        self.page = page  # None — источник без постраничного доступа
+        self.started = started
+        self.attempts: List[Future] = []
+        self.hedged = False
+
+
+class FederatedSearch:
+    """
+    Поиск сразу по нескольким источникам JobAPI с ограничением по времени.
+
+    Источники с постраничным доступом (JobAPI.paged и fetch_page) опрашиваются по
+    страницам, остальные — одним вызовом get_vacancies. Запрос, который
+    выполняется дольше hedge_after, дублируется, и засчитывается первый
+    успешный ответ. По истечении deadline возвращается то, что успело
+    прийти, а незавершенные запросы бросаются.
+    """
+
+    def __init__(self, backends: Dict[str, JobAPI], deadline: float = 5.0, hedge_after: Optional[float] = 1.0,
+                 max_pages: int = 20, max_workers: int = 16):
+        self.backends = backends
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _call(backend: JobAPI, keyword: str, page: Optional[int], params: Optional[dict]):
+        if page is None:
+            return backend.get_vacancies(keyword)
+        return backend.fetch_page(keyword, page, params)
+
+    @staticmethod
+    def _item_key(backend: str, item: dict) -> Tuple[str, Any]:
+        url = item.get("alternate_url") or item.get("url")
+        return ("url", url) if url else (backend, item.get("id"))
+
+    def search(self, keyword: str, params: Optional[dict] = None) -> FederatedResult:
+        """
+        Поиск по всем источникам.
+        :param keyword: Ключевое слово
+        :param params: Дополнительные параметры для постраничных источников
+        :return: FederatedResult; result.partial — не все источники успели
+        """
+        start = time.monotonic()
+        deadline_at = start + self.deadline
+        result = FederatedResult(backends={name: BackendStatus() for name in self.backends})
+        seen = set()
+        remaining_pages: Dict[str, int] = {}
+        tasks: Dict[Future, _Task] = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        def submit(task: _Task) -> None:
+            future = executor.submit(self._call, self.backends[task.backend], keyword, task.page, params)
+            task.attempts.append(future)
+            tasks[future] = task
+
+        def start_task(backend: str, page: Optional[int]) -> None:
+            submit(_Task(backend, page, time.monotonic()))
+
+        def collect(backend: str, items: List[dict]) -> None:
+            status = result.backends[backend]
+            status.found += len(items)
+            for item in items:
+                key = self._item_key(backend, item)
+                if key not in seen:
+                    seen.add(key)
+                    result.items.append(item)
+
+        for name, backend in self.backends.items():
+            start_task(name, 0 if getattr(backend, "paged", False) else None)
+
+        try:
+            while tasks:
+                now = time.monotonic()
+                if now >= deadline_at:
+                    break
+                timeout = deadline_at - now
+                if self.hedge_after is not None:
+                    waiting = [t.started + self.hedge_after for t in set(tasks.values()) if not t.hedged]
+                    if waiting:
+                        timeout = max(0.0, min(timeout, min(waiting) - now))
+                done, _ = wait(list(tasks), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    task = tasks.pop(future, None)
+                    if task is None:
+                        continue  # Обе попытки завершились одновременно, первая уже учтена
+                    if any(attempt in tasks for attempt in task.attempts) and future.exception() is not None:
+                        continue  # Ждем вторую попытку
+                    for attempt in task.attempts:
+                        tasks.pop(attempt, None)
+                        attempt.cancel()
+                    status = result.backends[task.backend]
+                    error = future.exception()
+                    if error is not None:
+                        status.errors.append(f"{'' if task.page is None else f'страница {task.page}: '}{error}")
+                        continue
+
+                    if task.page is None:
+                        collect(task.backend, future.result())
+                        status.pages, status.complete = 1, True
+                        continue
+                    data = future.result()
+                    collect(task.backend, data.get("items", []))
+                    status.pages += 1
+                    if task.page == 0:
+                        pages = min(data.get("pages", 0), self.max_pages)
+                        remaining_pages[task.backend] = pages - 1
+                        for page in range(1, pages):
+                            start_task(task.backend, page)
+                    else:
+                        remaining_pages[task.backend] -= 1
+                    if remaining_pages[task.backend] <= 0 and not status.errors:
+                        status.complete = True
+
+                # Медленные запросы дублируются один раз
+                if self.hedge_after is not None:
+                    now = time.monotonic()
+                    for task in set(tasks.values()):
+                        if not task.hedged and now - task.started >= self.hedge_after:
+                            task.hedged = True
+                            result.backends[task.backend].hedged += 1
+                            metrics.inc("hh_hedged_requests_total", backend=task.backend)
+                            submit(task)
+        finally:
+            # Не ждем незавершенные запросы: задержку ограничивает дедлайн
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        result.elapsed = time.monotonic() - start
+        if result.partial:
+            metrics.inc("hh_federated_partial_total")
+        return result
@@ -1,11 +1,29 @@
 import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
 import requests
 
+try:
+    from api.transport import HTTPTransport, build_transport
+except ImportError:
+    from src.api.transport import HTTPTransport, build_transport
+
+DEFAULT_BASE_URL = "https://api.hh.ru"
+
+
+def get_base_url(base_url: Optional[str] = None) -> str:
+    """Базовый URL API: аргумент, переменная HH_API_URL или боевой hh.ru"""
+    return (base_url or os.getenv("HH_API_URL") or DEFAULT_BASE_URL).rstrip("/")
+
 
 class JobAPI(ABC):
     """Абстрактный класс для работы с API вакансий"""
 
+    paged = False  # Есть ли настоящий постраничный доступ (fetch_page)
+
     @abstractmethod
     def connect(self):
         """Метод для подключения к API"""
@@ -16,55 +34,146 @@ class JobAPI(ABC):
         """Метод для получения вакансий по ключевому слову"""
         pass
 
+    def fetch_page(self, keyword: str, page: int, params: Optional[dict] = None) -> dict:
+        """
+        Одна страница выдачи: {"items": [...], "pages": N}.
+        Без постраничного доступа (paged = False) вся выдача get_vacancies — страница 0.
+        """
+        if page:
+            return {"items": [], "pages": 1}
+        return {"items": self.get_vacancies(keyword), "pages": 1}
+
+
+@dataclass
+class BatchSearchResult:
+    """Результат search_many: уникальные вакансии и статистика по каждому ключевому слову"""
+
+    items: List[dict] = field(default_factory=list)
+    found: Dict[str, int] = field(default_factory=dict)  # Получено вакансий по слову
+    new: Dict[str, int] = field(default_factory=dict)  # Из них не встречались в других словах
+    errors: Dict[str, str] = field(default_factory=dict)
+
 
 class HeadHunterAPI(JobAPI):
-    """Класс для работы с API HeadHunter"""
+    """
+    Класс для работы с API HeadHunter.
+
+    Экземпляр не хранит состояние поиска: __params — неизменяемый шаблон,
+    каждый запрос собирает свои параметры, поэтому методы можно вызывать
+    из нескольких потоков одновременно.
+    """
 
-    def __init__(self):
-        self.__base_url = "https://api.hh.ru/vacancies"
+    paged = True
+
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[HTTPTransport] = None,
+                 session: Optional[requests.Session] = None, priority: str = "interactive"):
+        self.__base_url = f"{get_base_url(base_url)}/vacancies"
         self.__headers = {"User-Agent": "HH-User-Agent"}
+        self.__transport = transport or build_transport(self.__headers, session=session, priority=priority)
         self.__params = {"text": "", "page": 0, "per_page": 100}
 
     def connect(self) -> bool:
         """Реализация абстрактного метода подключения к API"""
         try:
-            response = requests.get(self.__base_url, headers=self.__headers)
+            response = self.__transport.get(self.__base_url, retry=False)
             return response.status_code == 200
         except requests.RequestException:
             return False
 
-    def get_vacancies(self, keyword: str) -> list[dict]:
+    def get_vacancies(self, keyword: str, params: Optional[dict] = None) -> list[dict]:
         """
         Получение вакансий по ключевому слову
         :param keyword: Ключевое слово для поиска
+        :param params: Дополнительные фильтры /vacancies (см. SearchQuery.to_api_params)
         :return: Список вакансий в формате JSON
         """
         if not self.connect():
             raise ConnectionError("Не удалось подключиться к API HeadHunter")
+        try:
+            return self.__search(keyword, params)
+        except requests.RequestException as e:
+            print(f"Ошибка при запросе страницы 0: {e}")
+            return []
 
-        self.__params["text"] = keyword
-        self.__params["page"] = 0
-        vacancies = []
+    def search_many(self, keywords: Iterable[str], max_workers: Optional[int] = None,
+                    on_result: Optional[Callable[[str, List[dict]], None]] = None) -> BatchSearchResult:
+        """
+        Параллельный поиск по списку ключевых слов.
+        Результаты объединяются по id вакансии по мере поступления: вакансия,
+        найденная по нескольким словам, попадает в items один раз.
+        :param keywords: Ключевые слова (повторы игнорируются)
+        :param max_workers: Число слов, обрабатываемых одновременно
+        :param on_result: Вызывается в вызывающем потоке для каждого завершенного слова
+            с его новыми вакансиями (например, чтобы сразу сохранить их)
+        :return: BatchSearchResult
+        """
+        keywords = list(dict.fromkeys(keyword.strip() for keyword in keywords if keyword.strip()))
+        result = BatchSearchResult()
+        if not keywords:
+            return result
+        if not self.connect():
+            raise ConnectionError("Не удалось подключиться к API HeadHunter")
 
+        seen = set()
+        workers = max_workers or max(1, min(getattr(self.__transport, "concurrency", 1), len(keywords)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.__search, keyword): keyword for keyword in keywords}
+            for future in as_completed(futures):
+                keyword = futures[future]
+                try:
+                    items = future.result()
+                except (requests.RequestException, ValueError) as e:
+                    result.errors[keyword] = str(e)
+                    continue
+                # Слияние идет в вызывающем потоке по мере завершения слов
+                new_items = []
+                for item in items:
+                    vacancy_id = item.get("id") or item.get("alternate_url")
+                    if vacancy_id in seen:
+                        continue
+                    if vacancy_id is not None:
+                        seen.add(vacancy_id)
+                    new_items.append(item)
+                result.items.extend(new_items)
+                result.found[keyword] = len(items)
+                result.new[keyword] = len(new_items)
+                if on_result is not None:
+                    on_result(keyword, new_items)
+        return result
+
+    def fetch_page(self, keyword: str, page: int, params: Optional[dict] = None) -> dict:
+        """Загрузка одной страницы выдачи (используется FederatedSearch)"""
+        return self.__fetch_page(keyword, page, params)
+
+    def __search(self, keyword: str, params: Optional[dict] = None) -> list[dict]:
+        """Загрузка всех страниц выдачи по ключевому слову; ошибка первой страницы пробрасывается"""
         max_pages = 1 if os.getenv("TEST_ENV") else 20
 
-        while self.__params.get("page") < max_pages:
-            try:
-                response = requests.get(
-                    self.__base_url, headers=self.__headers, params=self.__params
-                )
-                response.raise_for_status()
-
-                data = response.json()
-                vacancies.extend(data.get("items", []))
-
-                if data.get("pages", 0) <= self.__params["page"] + 1:
+        first_page = self.__fetch_page(keyword, 0, params)
+        vacancies = list(first_page.get("items", []))
+        pages = min(first_page.get("pages", 0), max_pages)
+        if pages <= 1:
+            return vacancies
+
+        # Остальные страницы загружаются параллельно, число одновременных
+        # запросов ограничивает регулятор транспорта
+        workers = max(1, min(getattr(self.__transport, "concurrency", 1), pages - 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.__fetch_page, keyword, page, params) for page in range(1, pages)]
+            for page, future in enumerate(futures, 1):
+                try:
+                    vacancies.extend(future.result().get("items", []))
+                except requests.RequestException as e:
+                    print(f"Ошибка при запросе страницы {page}: {e}")
+                    for rest in futures[page:]:
+                        rest.cancel()
                     break
 
-                self.__params["page"] += 1
-
-            except requests.RequestException as e:
-                print(f"Ошибка при запросе страницы {self.__params['page']}: {e}")
-                break
-
         return vacancies
+
+    def __fetch_page(self, keyword: str, page: int, extra: Optional[dict] = None) -> dict:
+        """Загрузка одной страницы выдачи"""
+        params = {**self.__params, **(extra or {}), "text": keyword, "page": page}
+        response = self.__transport.get(self.__base_url, params=params)
+        response.raise_for_status()
+        return response.json()
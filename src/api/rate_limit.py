@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.monitoring.metrics import metrics
+
+# Приоритеты клиентов: ожидающий запрос с большим весом получает токен первым
+PRIORITIES = {"interactive": 10, "default": 5, "crawl": 1}
+WAITER_TTL = 2.0  # Запись об ожидании без обновления считается брошенной
+MAX_POLL = 0.25
+
+
+class HostRateLimiter:
+    """
+    Общий для всех процессов хоста лимит запросов к HH (token bucket).
+
+    Состояние корзины хранится в небольшом JSON-файле и меняется только под
+    файловой блокировкой (fcntl.flock, на Windows — msvcrt.locking), поэтому
+    любое число процессов и потоков вместе укладываются в rate запросов в
+    секунду. Ожидающие запросы регистрируются в том же файле со своим весом:
+    пока ждет запрос с большим весом (интерактивный поиск), фоновые обходы
+    токенов не получают. Retry-After от HH останавливает выдачу токенов
+    сразу во всех процессах.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, path: Optional[str] = None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.path = path or os.path.join(tempfile.gettempdir(), "hh_rate_limit.json")
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def from_env(cls) -> Optional["HostRateLimiter"]:
+        """Лимитер по HH_RATE_LIMIT (запросов в секунду), HH_RATE_LIMIT_BURST, HH_RATE_LIMIT_FILE или None"""
+        rate = float(os.getenv("HH_RATE_LIMIT", "0") or 0)
+        if rate <= 0:
+            return None
+        return cls(rate, int(os.getenv("HH_RATE_LIMIT_BURST", "1")), os.getenv("HH_RATE_LIMIT_FILE") or None)
+
+    @contextmanager
+    def _locked_state(self):
+        """Чтение и запись состояния под межпроцессной блокировкой"""
+        with self._thread_lock:
+            if self._file is None:
+                self._file = open(self.path, "a+b")
+            file = self._file
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                file.seek(0)
+                try:
+                    state = json.loads(file.read() or b"{}")
+                except ValueError:
+                    state = {}
+                yield state
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps(state).encode("utf-8"))
+                file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+                else:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _refill(self, state: Dict[str, Any], now: float) -> None:
+        updated = state.get("updated", now)
+        state["tokens"] = min(self.burst, state.get("tokens", self.burst) + max(0.0, now - updated) * self.rate)
+        state["updated"] = now
+        state["waiters"] = {key: value for key, value in state.get("waiters", {}).items() if value[1] > now}
+
+    def _try_acquire(self, waiter: str, weight: int) -> float:
+        """Попытка взять токен; 0 — токен получен, иначе сколько ждать до следующей попытки"""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            waiters = state["waiters"]
+            paused = state.get("paused_until", 0) - now
+            top = max([value[0] for key, value in waiters.items() if key != waiter], default=weight)
+            if paused <= 0 and state["tokens"] >= 1 and weight >= top:
+                state["tokens"] -= 1
+                waiters.pop(waiter, None)
+                return 0.0
+            waiters[waiter] = [weight, now + WAITER_TTL]
+            if paused > 0:
+                return min(paused, MAX_POLL)
+            if weight < top:
+                return min(1 / self.rate, MAX_POLL)
+            return min(max(1 - state["tokens"], 0.0) / self.rate, MAX_POLL)
+
+    def acquire(self, priority: str = "default") -> float:
+        """
+        Ожидание права на один запрос.
+        :param priority: Ключ PRIORITIES
+        :return: время ожидания в секундах
+        """
+        weight = PRIORITIES.get(priority, PRIORITIES["default"])
+        waiter = f"{os.getpid()}:{threading.get_ident()}"
+        start = time.monotonic()
+        while True:
+            delay = self._try_acquire(waiter, weight)
+            if delay <= 0:
+                break
+            time.sleep(delay)
+        waited = time.monotonic() - start
+        metrics.observe("hh_rate_limit_wait_seconds", waited, priority=priority)
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Остановка выдачи токенов во всех процессах (ответ 429 с Retry-After)"""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            state["paused_until"] = max(state.get("paused_until", 0), now + seconds)
+            state["tokens"] = 0.0
+
+
+_shared_limiter: Optional[HostRateLimiter] = None
+_limiter_loaded = False
+_limiter_lock = threading.Lock()
+
+
+def get_shared_limiter() -> Optional[HostRateLimiter]:
+    """Общий для процесса межпроцессный лимитер (None, если HH_RATE_LIMIT не задан)"""
+    global _shared_limiter, _limiter_loaded
+    with _limiter_lock:
+        if not _limiter_loaded:
+            _shared_limiter = HostRateLimiter.from_env()
+            _limiter_loaded = True
+        return _shared_limiter
@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+NO_SALARY_LIMIT = 999999999
+SEARCH_FIELDS = ("name", "company_name", "description")
+
+
+@dataclass
+class SearchQuery:
+    """
+    Поисковый запрос с фильтрами, разделяемый между HH API и локальной фильтрацией.
+
+    to_api_params() переносит в запрос к API все, что HH умеет отсекать сам, —
+    выдача сужается еще до загрузки страниц. residual_criteria() возвращает
+    критерии для JSONSaver.get_vacancies, которые API не гарантирует точно.
+    """
+
+    text: str
+    words: List[str] = field(default_factory=list)  # Слова, обязательные в описании
+    salary_min: int = 0
+    salary_max: int = NO_SALARY_LIMIT
+    only_with_salary: bool = False  # Требовать зарплату и без заданных границ
+    currency: str = "RUR"
+    search_field: Optional[str] = None  # name | company_name | description
+    period: Optional[int] = None  # Вакансии за последние N дней
+    push_salary: bool = False  # Передавать salary_min в API (HH ищет близкие вилки, см. ниже)
+    push_words: bool = False  # Добавлять слова фильтра к text (HH ищет целые слова, см. ниже)
+
+    def __post_init__(self):
+        if self.search_field is not None and self.search_field not in SEARCH_FIELDS:
+            raise ValueError(f"search_field должно быть одним из {', '.join(SEARCH_FIELDS)}")
+
+    @property
+    def requires_salary(self) -> bool:
+        return self.only_with_salary or self.salary_min > 0 or self.salary_max < NO_SALARY_LIMIT
+
+    def to_api_params(self) -> Dict[str, Any]:
+        """Параметры /vacancies, сужающие выдачу без потери подходящих вакансий"""
+        # Локально слова ищутся как подстроки описания ("sql" находится в "PostgreSQL"),
+        # а HH сопоставляет слова text целиком с учетом морфологии и такие вакансии
+        # не вернет, поэтому слова добавляются к text только по явному запросу
+        pushed = self.push_words and self.search_field in (None, "description")
+        words = self.words if pushed else []
+        params: Dict[str, Any] = {"text": " ".join([self.text, *words]).strip()}
+        if self.requires_salary:
+            # Локальный фильтр отбрасывает вакансии без зарплаты
+            params["only_with_salary"] = "true"
+            params["currency"] = self.currency
+            if self.push_salary and self.salary_min > 0:
+                # HH возвращает вакансии, вилка которых близка к значению, и может
+                # отсечь вилки целиком выше него, поэтому только по явному запросу
+                params["salary"] = self.salary_min
+        if self.search_field:
+            params["search_field"] = self.search_field
+        if self.period:
+            params["period"] = self.period
+        return params
+
+    def residual_criteria(self) -> Dict[str, Any]:
+        """Критерии JSONSaver.get_vacancies, которые остаются за локальной фильтрацией"""
+        criteria: Dict[str, Any] = {}
+        if self.words:
+            # API ищет слова во всей вакансии, локально проверяется описание
+            criteria["description"] = " ".join(self.words)
+        if self.requires_salary:
+            # Точные границы по средней зарплате API не проверяет
+            criteria["salary"] = {"min": self.salary_min, "max": self.salary_max}
+        return criteria
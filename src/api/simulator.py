@@ -0,0 +1,289 @@
+"""
+Локальный симулятор HH API для нагрузочного тестирования без сети.
+
+Реализует /vacancies, /vacancies/{id} и /employers/{id} с пагинацией, полями found/pages,
+ограничением глубины выдачи в 2000 элементов, настраиваемой задержкой,
+ответами 429 с заголовком Retry-After и случайными ошибками 5xx.
+
+Запуск: python -m src.api.simulator --port 8080 --rps 20 --error-rate 0.01
+Клиенты подключаются через HH_API_URL=http://127.0.0.1:8080
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+MAX_DEPTH = 2000  # HH не отдает элементы глубже 2000-го
+MAX_PER_PAGE = 100
+
+
+@dataclass
+class SimulatorConfig:
+    """Параметры поведения симулятора"""
+    latency: str = "none"  # none | fixed | uniform | exponential | lognormal
+    latency_ms: float = 0.0  # Средняя (или фиксированная) задержка
+    latency_spread: float = 0.5  # Разброс: ширина для uniform, sigma для lognormal
+    rate_limit_rps: float = 0.0  # 0 — без ограничения
+    rate_burst: int = 10
+    retry_after: int = 1  # Значение заголовка Retry-After, секунды
+    error_rate: float = 0.0  # Доля ответов 5xx
+    max_found: int = 5000  # Верхняя граница found для поиска
+    seed: int = 42
+
+
+@dataclass
+class SimulatorStats:
+    """Счетчики обработанных запросов"""
+    requests: int = 0
+    throttled: int = 0
+    errors: int = 0
+    by_path: Dict[str, int] = field(default_factory=dict)
+
+
+class _TokenBucket:
+    """Потокобезопасное ведро токенов для имитации квоты"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def _stable_seed(*parts: Any) -> int:
+    return zlib.crc32("|".join(map(str, parts)).encode("utf-8"))
+
+
+def _make_item(vacancy_id: int, employer_id: int, rng: random.Random, with_salary: bool) -> Dict[str, Any]:
+    salary_from = rng.randrange(50_000, 300_000, 5_000)
+    salary = {"from": salary_from, "to": salary_from + rng.randrange(0, 100_000, 5_000),
+              "currency": "RUR", "gross": True}
+    if not with_salary and rng.random() < 0.4:
+        salary = None
+    return {
+        "id": str(vacancy_id),
+        "name": f"Вакансия {vacancy_id}",
+        "area": {"id": "1", "name": "Москва"},
+        "salary": salary,
+        "published_at": "2025-08-01T12:00:00+0300",
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "employer": {"id": str(employer_id), "name": f"Employer {employer_id}"},
+        "snippet": {"requirement": "Опыт работы с <highlighttext>Python</highlighttext>",
+                    "responsibility": "Разработка сервисов"},
+        "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+        "employment": {"id": "full", "name": "Полная занятость"},
+    }
+
+
+class HHSimulator:
+    """HTTP-сервер, имитирующий HH API"""
+
+    def __init__(self, config: Optional[SimulatorConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or SimulatorConfig()
+        self.stats = SimulatorStats()
+        self._stats_lock = threading.Lock()
+        self._bucket = _TokenBucket(self.config.rate_limit_rps, self.config.rate_burst) \
+            if self.config.rate_limit_rps > 0 else None
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "HHSimulator":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "HHSimulator":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _delay(self) -> float:
+        """Задержка ответа в секундах согласно выбранному распределению"""
+        cfg = self.config
+        mean = cfg.latency_ms / 1000
+        with self._rng_lock:
+            if cfg.latency == "fixed":
+                return mean
+            if cfg.latency == "uniform":
+                return max(0.0, self._rng.uniform(mean * (1 - cfg.latency_spread), mean * (1 + cfg.latency_spread)))
+            if cfg.latency == "exponential":
+                return self._rng.expovariate(1 / mean) if mean else 0.0
+            if cfg.latency == "lognormal":
+                sigma = cfg.latency_spread
+                return self._rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma) if mean else 0.0
+        return 0.0
+
+    def found_for(self, query: Dict[str, str]) -> int:
+        """Детерминированное число найденных вакансий для запроса"""
+        if query.get("employer_id"):
+            return _stable_seed("employer", query["employer_id"]) % 600
+        return _stable_seed("text", query.get("text", "")) % self.config.max_found
+
+    def vacancies(self, query: Dict[str, str]) -> tuple:
+        page = int(query.get("page", 0))
+        per_page = min(int(query.get("per_page", 20)), MAX_PER_PAGE)
+        with_salary = query.get("only_with_salary", "").lower() == "true"
+        found = self.found_for(query)
+        if per_page and (page + 1) * per_page > MAX_DEPTH:
+            return 400, {"errors": [{"type": "bad_argument", "value": "page"}],
+                         "description": "Нельзя получить больше 2000 вакансий"}
+
+        available = min(found, MAX_DEPTH)
+        start = page * per_page
+        count = max(0, min(per_page, available - start))
+        employer_id = int(query.get("employer_id") or 0)
+        base_id = 10_000_000 + _stable_seed(query.get("text", ""), employer_id) % 1_000_000 * 100
+        rng = random.Random(_stable_seed(base_id, page))
+        items = [_make_item(base_id + start + i, employer_id or 1000 + (start + i) % 50, rng, with_salary)
+                 for i in range(count)]
+        pages = math.ceil(available / per_page) if per_page else 0
+        return 200, {"items": items, "found": found, "pages": pages, "page": page, "per_page": per_page}
+
+    def vacancy(self, vacancy_id: str) -> tuple:
+        """Полная карточка вакансии: описание и ключевые навыки"""
+        if not vacancy_id.isdigit():
+            return 404, {"errors": [{"type": "not_found"}]}
+        rng = random.Random(_stable_seed("vacancy", vacancy_id))
+        item = _make_item(int(vacancy_id), 1000 + int(vacancy_id) % 50, rng, with_salary=True)
+        skills = rng.sample(["Python", "Django", "PostgreSQL", "Docker", "Kafka", "Go", "Linux"], 3)
+        item["description"] = f"<p>Полное описание вакансии {vacancy_id}.</p><ul><li>{skills[0]}</li></ul>"
+        item["key_skills"] = [{"name": skill} for skill in skills]
+        item["updated_at"] = item.get("published_at")
+        return 200, item
+
+    def employer(self, employer_id: str) -> tuple:
+        if not employer_id.isdigit():
+            return 404, {"errors": [{"type": "not_found"}]}
+        return 200, {
+            "id": employer_id,
+            "name": f"Employer {employer_id}",
+            "alternate_url": f"https://hh.ru/employer/{employer_id}",
+            "description": "<p>Описание работодателя</p>",
+            "vacancies_url": f"https://api.hh.ru/vacancies?employer_id={employer_id}",
+            "open_vacancies": self.found_for({"employer_id": employer_id}),
+        }
+
+    def handle(self, path: str, query: Dict[str, str]) -> tuple:
+        """Маршрутизация запроса: (статус, тело, заголовки)"""
+        with self._stats_lock:
+            self.stats.requests += 1
+            key = "/employers" if path.startswith("/employers/") else path
+            if path.startswith("/vacancies/"):
+                key = "/vacancies/{id}"
+            self.stats.by_path[key] = self.stats.by_path.get(key, 0) + 1
+
+        if self._bucket and not self._bucket.take():
+            with self._stats_lock:
+                self.stats.throttled += 1
+            return 429, {"errors": [{"type": "too_many_requests"}]}, {"Retry-After": str(self.config.retry_after)}
+
+        time.sleep(self._delay())
+
+        if self.config.error_rate and self._random() < self.config.error_rate:
+            with self._stats_lock:
+                self.stats.errors += 1
+            status = (500, 502, 503)[int(self._random() * 3)]
+            return status, {"errors": [{"type": "server_error"}]}, {}
+
+        if path.rstrip("/") == "/vacancies":
+            return (*self.vacancies(query), {})
+        if path.startswith("/vacancies/"):
+            return (*self.vacancy(path.rstrip("/").rsplit("/", 1)[-1]), {})
+        if path.startswith("/employers/"):
+            return (*self.employer(path.rstrip("/").rsplit("/", 1)[-1]), {})
+        return 404, {"errors": [{"type": "not_found"}]}, {}
+
+    def _make_handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                status, body, headers = simulator.handle(parsed.path, query)
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный симулятор HH API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", default="none", choices=["none", "fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--rps", type=float, default=0.0, help="Квота запросов в секунду (0 — без ограничения)")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        rate_limit_rps=args.rps,
+        rate_burst=args.burst,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+    )
+    simulator = HHSimulator(config, args.host, args.port)
+    print(f"🚀 Симулятор HH API запущен: {simulator.url}")
+    try:
+        simulator._server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Симулятор остановлен")
+    finally:
+        simulator._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
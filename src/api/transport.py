@@ -0,0 +1,226 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from api.backoff import AIMDController, RetryingTransport, RetryPolicy
+    from api.rate_limit import get_shared_limiter
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.api.backoff import AIMDController, RetryingTransport, RetryPolicy
+    from src.api.rate_limit import get_shared_limiter
+    from src.monitoring.metrics import metrics
+
+
+# Таймауты (соединение, чтение) в секундах: зависшее соединение должно завершиться
+# ошибкой, которую повторит RetryingTransport, а не блокировать поток навсегда
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+
+def timeout_from_env() -> Tuple[float, float]:
+    """Таймауты по HH_CONNECT_TIMEOUT и HH_READ_TIMEOUT (по умолчанию DEFAULT_TIMEOUT)"""
+    return (float(os.getenv("HH_CONNECT_TIMEOUT", "") or DEFAULT_TIMEOUT[0]),
+            float(os.getenv("HH_READ_TIMEOUT", "") or DEFAULT_TIMEOUT[1]))
+
+
+def endpoint_label(url: str) -> str:
+    """Метка эндпоинта для метрик: числовые сегменты пути заменяются на {id}"""
+    parts = urlparse(url).path.rstrip("/").split("/")
+    return "/".join("{id}" if part.isdigit() else part for part in parts) or "/"
+
+
+def make_session(pool_size: int = 32) -> requests.Session:
+    """Сессия с пулом keep-alive соединений на pool_size одновременных запросов"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class HTTPTransport:
+    """Транспортный уровень API-клиентов: выполнение GET-запросов"""
+
+    concurrency = 1  # Сколько запросов клиент может выполнять параллельно
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None,
+                 timeout: Optional[Union[float, Tuple[float, float]]] = DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None):
+        self.headers = headers or {}
+        self.timeout = timeout
+        # Без сессии каждый запрос открывает новое соединение (requests.get)
+        self.session = session
+
+    def _send(self, url: str, **kwargs) -> requests.Response:
+        if self.session is not None:
+            return self.session.get(url, **kwargs)
+        return requests.get(url, **kwargs)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, retry: bool = True) -> requests.Response:
+        """Выполнение GET-запроса (retry учитывают обертки с повторами)"""
+        kwargs = {"headers": self.headers}
+        if params is not None:
+            kwargs["params"] = params
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        if not metrics.enabled:
+            return self._send(url, **kwargs)
+
+        endpoint = endpoint_label(url)
+        start = time.perf_counter()
+        try:
+            response = self._send(url, **kwargs)
+        except requests.RequestException as e:
+            metrics.inc("hh_http_requests_total", endpoint=endpoint, status=type(e).__name__)
+            raise
+        metrics.observe("hh_http_request_seconds", time.perf_counter() - start,
+                        endpoint=endpoint, status=response.status_code)
+        metrics.inc("hh_http_requests_total", endpoint=endpoint, status=response.status_code)
+        metrics.inc("hh_http_response_bytes_total", len(response.content or b""), endpoint=endpoint)
+        return response
+
+
+class CassetteResponse:
+    """Ответ, воспроизведенный из кассеты"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], body: str):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.text = body
+        self.content = body.encode("utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class CassetteTransport(HTTPTransport):
+    """
+    Транспорт с записью и воспроизведением ответов.
+
+    record — запросы выполняются по сети, успешные ответы сохраняются в кассеты;
+    replay — ответы отдаются только с диска, отсутствующий запрос считается ошибкой сети.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, mode: str, directory: str = "data/cassettes", latency_ms: float = 0.0,
+                 headers: Optional[Dict[str, str]] = None,
+                 timeout: Optional[Union[float, Tuple[float, float]]] = DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None):
+        super().__init__(headers, timeout, session)
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим кассет: {mode}")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency = latency_ms / 1000
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def request_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Ключ кассеты: хэш URL и отсортированных параметров"""
+        query = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return hashlib.sha1(f"GET {url}?{query}".encode("utf-8")).hexdigest()
+
+    def cassette_path(self, url: str, params: Optional[Dict[str, Any]] = None) -> Path:
+        return self.directory / f"{self.request_key(url, params)}.json.gz"
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, retry: bool = True):
+        path = self.cassette_path(url, params)
+
+        if self.mode == "replay":
+            if not path.exists():
+                metrics.inc("hh_cache_misses_total", cache="cassette")
+                raise requests.ConnectionError(f"Запрос отсутствует в кассетах: {url} {params or ''}")
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                record = json.load(file)
+            metrics.inc("hh_cache_hits_total", cache="cassette")
+            if self.latency:
+                time.sleep(self.latency)
+            return CassetteResponse(url, record["status_code"], record["headers"], record["body"])
+
+        response = super().get(url, params)
+        # Временные ошибки не записываем, чтобы не воспроизводить их бесконечно
+        if response.status_code < 500 and response.status_code != 429:
+            record = {
+                "request": {"url": url, "params": {str(k): str(v) for k, v in (params or {}).items()}},
+                "status_code": response.status_code,
+                "headers": {"Content-Type": response.headers.get("Content-Type", "application/json")},
+                "body": response.text,
+            }
+            tmp_path = path.with_suffix(".tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+                json.dump(record, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        return response
+
+
+_shared_controller: Optional[AIMDController] = None
+_controller_lock = threading.Lock()
+
+
+def get_shared_controller() -> AIMDController:
+    """Общий для процесса регулятор конкурентности всех API-клиентов"""
+    global _shared_controller
+    with _controller_lock:
+        if _shared_controller is None:
+            _shared_controller = AIMDController.from_env()
+        return _shared_controller
+
+
+def build_transport(headers: Optional[Dict[str, str]] = None, session: Optional[requests.Session] = None,
+                    priority: str = "default"):
+    """
+    Создание транспорта по переменным окружения:
+    HH_CASSETTE_MODE (record | replay), HH_CASSETTE_DIR, HH_CASSETTE_LATENCY_MS,
+    HH_ARCHIVE_DIR (архив сырых ответов, см. api.archive),
+    HH_HTTP_POOL_SIZE (пул соединений, если session не передана),
+    HH_CONNECT_TIMEOUT, HH_READ_TIMEOUT (таймауты запроса, по умолчанию 5 и 30 секунд),
+    HH_RATE_LIMIT (общий для процессов хоста лимит, см. api.rate_limit; priority — его приоритет),
+    HH_MAX_RETRIES, HH_MAX_CONCURRENCY и др. (см. RetryPolicy, AIMDController)
+    """
+    pool_size = int(os.getenv("HH_HTTP_POOL_SIZE", "0") or 0)
+    if session is None and pool_size > 0:
+        session = make_session(pool_size)
+    # Сжатие ответов на стороне HH: страницы JSON уменьшаются в несколько раз
+    headers = {"Accept-Encoding": "gzip", **(headers or {})}
+    timeout = timeout_from_env()
+    mode = os.getenv("HH_CASSETTE_MODE", "").strip().lower()
+    if mode:
+        transport = CassetteTransport(
+            mode,
+            directory=os.getenv("HH_CASSETTE_DIR", "data/cassettes"),
+            latency_ms=float(os.getenv("HH_CASSETTE_LATENCY_MS", "0") or 0),
+            headers=headers,
+            timeout=timeout,
+            session=session,
+        )
+        if mode == "replay":
+            # Воспроизведение не требует ни повторов, ни регулирования
+            return transport
+    else:
+        transport = HTTPTransport(headers, timeout, session=session)
+
+    archive_dir = os.getenv("HH_ARCHIVE_DIR")
+    if archive_dir:
+        # Импорт здесь: archive сам зависит от этого модуля
+        try:
+            from api.archive import ArchivingTransport, PayloadArchive
+        except ImportError:
+            from src.api.archive import ArchivingTransport, PayloadArchive
+        transport = ArchivingTransport(transport, PayloadArchive(archive_dir))
+    return RetryingTransport(transport, RetryPolicy.from_env(), get_shared_controller(),
+                             limiter=get_shared_limiter(), priority=priority)
@@ -0,0 +1,452 @@
+"""
+Неинтерактивный интерфейс командной строки для cron и скриптов.
+
+    python -m src.cli fill                   # создать БД и заполнить, если она пуста
+    python -m src.cli sync                   # повторно загрузить данные работодателей
+    python -m src.cli search python --salary-min 150000 --words django --json
+    python -m src.cli export --format csv --output vacancies.csv
+    python -m src.cli stats
+    python -m src.cli purge --retention-months 12
+    python -m src.cli enqueue --register employers.txt   # очередь обхода для воркеров
+    python -m src.cli worker                             # запускается на любом числе машин
+    python -m src.cli replay --archive data/archive      # пересборка БД из архива ответов
+
+Тяжелые зависимости (psycopg2, requests, dotenv) импортируются внутри
+подкоманд, поэтому каждая команда загружает только нужные ей подсистемы.
+"""
+import argparse
+import json
+import sys
+from datetime import date
+from typing import List, Optional
+
+
+def _load_env() -> None:
+    """Загрузка .env, если установлен python-dotenv"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _db_manager(strict: bool = False):
+    """strict — ошибки чтения пробрасываются (см. _read_failed), а не печатаются в stdout"""
+    from src.database.db_manager import DBConfig, DBManager
+
+    return DBManager(DBConfig.from_env(), strict=strict)
+
+
+def _read_failed(error: Exception) -> int:
+    """Диагностика в stderr и ненулевой код: stdout команд чтения остается чистым для | jq"""
+    print(f"❌ Ошибка чтения из БД: {error}", file=sys.stderr)
+    return 1
+
+
+def _fill(force: bool, resume: bool = False) -> int:
+    from src.api.company_api import iter_companies_data
+    from src.database.db_manager import SCHEMA_VERSION, setup_database
+    from src.database.loader import load_companies
+    from src.storage.checkpoint import FILL_CHECKPOINT, CrawlCheckpoint
+
+    db_manager = _db_manager()
+    try:
+        state = db_manager.get_startup_state()
+    except Exception:
+        state = None
+
+    if state is None or state["schema_version"] < SCHEMA_VERSION:
+        if not setup_database():
+            return 1
+    elif not force and not resume and state["vacancies_count"]:
+        print(f"ℹ️ База данных уже содержит {state['vacancies_count']} вакансий, используйте sync для обновления")
+        return 0
+
+    # Прогресс сохраняется после каждой компании: при сбое --resume продолжит с нее
+    checkpoint = CrawlCheckpoint(FILL_CHECKPOINT, "companies")
+    resumed = checkpoint.start(resume)
+    companies_count, total_vacancies = load_companies(db_manager, iter_companies_data(checkpoint), checkpoint)
+    if not companies_count and not resumed:
+        print("❌ Не удалось получить данные компаний")
+        return 1
+    print(f"🎉 Компаний: {companies_count}, добавлено вакансий: {total_vacancies}")
+    return 0
+
+
+def cmd_fill(args: argparse.Namespace) -> int:
+    """Создание БД и первичное заполнение"""
+    return _fill(force=False, resume=args.resume)
+
+
+def cmd_sync(args: argparse.Namespace) -> int:
+    """Повторная загрузка данных работодателей"""
+    return _fill(force=True, resume=args.resume)
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    """Поиск вакансий через HH API с локальной фильтрацией"""
+    from src.api.hh_api import HeadHunterAPI
+    from src.api.search_query import NO_SALARY_LIMIT, SearchQuery
+    from src.models.vacancy import Vacancy
+
+    query = SearchQuery(
+        args.query, args.words or [], args.salary_min or 0, args.salary_max or NO_SALARY_LIMIT,
+        currency=args.currency, search_field=args.search_field, period=args.period, push_salary=args.push_salary,
+        push_words=args.push_words,
+    )
+    params = query.to_api_params()
+    text = params.pop("text")
+    if args.deadline:
+        from src.api.federated import FederatedSearch
+
+        # Время ответа ограничено дедлайном: медленные страницы дублируются или отбрасываются
+        result = FederatedSearch({"hh": HeadHunterAPI()}, deadline=args.deadline,
+                                 hedge_after=args.hedge_after).search(text, params)
+        items = result.items
+        if result.partial:
+            print(f"⚠️ Дедлайн {args.deadline} с: показаны частичные результаты ({len(items)} вакансий)",
+                  file=sys.stderr)
+    else:
+        items = HeadHunterAPI().get_vacancies(text, params)
+    criteria = query.residual_criteria()
+
+    if args.save:
+        from src.storage.json_saver import JSONSaver
+        from src.storage.seen_set import SeenSet
+
+        # Разбираются и сохраняются только новые и изменившиеся вакансии
+        json_saver = JSONSaver(args.save)
+        seen = SeenSet.for_storage(json_saver.file_path)
+        new_items = seen.filter_new(items)
+        saved = json_saver.add_vacancies(Vacancy.cast_to_object_list(new_items), update=True)
+        seen.mark_saved(new_items, saved)
+        seen.save()
+        found = json_saver.get_vacancies(criteria)
+    else:
+        found = [v for v in Vacancy.cast_to_object_list(items) if _matches(v, criteria)]
+
+    found = sorted(found, reverse=True)[:args.limit]
+    if args.json:
+        rows = [{"title": v.title, "url": v.url, "salary": v.salary, "description": v.description} for v in found]
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        for i, vacancy in enumerate(found, 1):
+            salary = f"{vacancy.salary} руб." if vacancy.salary else "не указана"
+            print(f"{i}. {vacancy.title} | {salary} | {vacancy.url}")
+    return 0
+
+
+def cmd_batch(args: argparse.Namespace) -> int:
+    """Параллельный поиск по списку ключевых слов с объединением результатов"""
+    import os
+
+    from src.api.hh_api import HeadHunterAPI
+    from src.api.transport import make_session
+    from src.models.vacancy import Vacancy
+    from src.storage.checkpoint import CrawlCheckpoint
+
+    with open(args.keywords, encoding="utf-8") as file:
+        keywords = list(dict.fromkeys(line.strip() for line in file if line.strip() and not line.startswith("#")))
+
+    on_result, checkpoint = None, None
+    if args.save:
+        from src.storage.json_saver import JSONSaver
+        from src.storage.seen_set import SeenSet
+
+        json_saver = JSONSaver(args.save)
+        seen = SeenSet.for_storage(json_saver.file_path)
+        # Каждое слово сохраняется сразу и отмечается в контрольной точке: --resume его пропустит
+        name = os.path.splitext(os.path.basename(args.keywords))[0]
+        checkpoint = CrawlCheckpoint(f"data/checkpoints/batch-{name}.json", f"batch:{os.path.abspath(args.keywords)}")
+        if checkpoint.start(args.resume):
+            keywords = [keyword for keyword in keywords if not checkpoint.is_done(keyword)]
+
+        def save_keyword(keyword: str, items: list) -> None:
+            new_items = seen.filter_new(items)
+            saved = json_saver.add_vacancies(Vacancy.cast_to_object_list(new_items), update=True)
+            seen.mark_saved(new_items, saved)
+            seen.save()
+            checkpoint.mark_done(keyword, found=len(items))
+
+        on_result = save_keyword
+
+    with make_session(args.pool) as session:
+        api = HeadHunterAPI(session=session, priority="crawl")
+        result = api.search_many(keywords, max_workers=args.workers, on_result=on_result)
+    for keyword in keywords:
+        if keyword in result.errors:
+            print(f"❌ {keyword}: {result.errors[keyword]}")
+        elif keyword in result.found:
+            print(f"🔎 {keyword}: найдено {result.found[keyword]}, новых {result.new[keyword]}")
+    print(f"✅ Уникальных вакансий: {len(result.items)}")
+
+    if checkpoint is not None and not result.errors:
+        checkpoint.finish()
+    return 1 if result.errors and not result.found else 0
+
+
+def _matches(vacancy, criteria: dict) -> bool:
+    """Проверка вакансии по тем же правилам, что и JSONSaver.get_vacancies"""
+    words = criteria.get("description", "").lower().split()
+    if words and not all(word in vacancy.description.lower() for word in words):
+        return False
+    if "salary" in criteria:
+        if vacancy.salary is None:
+            return False
+        return criteria["salary"]["min"] <= vacancy.salary <= criteria["salary"]["max"]
+    return True
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Выгрузка вакансий из БД в JSON или CSV"""
+    try:
+        rows = _db_manager(strict=True).get_all_vacancies(since=args.since)
+    except Exception as e:
+        return _read_failed(e)
+    columns = ("company", "title", "salary", "currency", "url")
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            import csv
+
+            writer = csv.writer(output)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        else:
+            json.dump([dict(zip(columns, row)) for row in rows], output, ensure_ascii=False, indent=2, default=str)
+            output.write("\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if args.output:
+        print(f"✅ Выгружено {len(rows)} вакансий в {args.output}")
+    return 0
+
+
+def _parse_criterion(text: str) -> tuple:
+    """Критерий вида имя=значение[,значение...]; значение raw — JSON"""
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"ожидается имя=значение: {text}")
+    if name == "raw":
+        return name, json.loads(value)
+    values = [item for item in value.split(",") if item]
+    return name, values if len(values) > 1 else value
+
+
+def cmd_find(args: argparse.Namespace) -> int:
+    """Поиск вакансий в БД по критериям колонки raw"""
+    try:
+        rows = _db_manager(strict=True).find_vacancies(dict(args.filter or []), limit=args.limit)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        return _read_failed(e)
+    columns = ("company", "title", "salary", "currency", "url")
+    if args.json:
+        print(json.dumps([dict(zip(columns, row)) for row in rows], ensure_ascii=False, indent=2, default=str))
+    else:
+        for company, title, salary, currency, url in rows:
+            print(f"{company} | {title} | {salary or 'не указана'} {currency or ''} | {url}")
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    """Сводка по базе данных"""
+    db_manager = _db_manager(strict=True)
+    try:
+        companies = db_manager.get_companies_and_vacancies_count()
+        stats = {
+            "companies": len(companies),
+            "vacancies": sum(count for _, count in companies),
+            "avg_salary": float(db_manager.get_avg_salary()),
+            "salary_quantiles_rur": {f"p{round(q * 100)}": value
+                                     for q, value in db_manager.get_salary_quantiles().items()},
+            "by_company": {name: count for name, count in companies},
+        }
+    except Exception as e:
+        return _read_failed(e)
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        print(f"Компаний: {stats['companies']}, вакансий: {stats['vacancies']}, "
+              f"средняя зарплата: {stats['avg_salary']:,.0f}")
+        if stats["salary_quantiles_rur"]:
+            print("Квантили зарплат, руб.: " + ", ".join(
+                f"{name}={value:,.0f}" for name, value in stats["salary_quantiles_rur"].items()))
+        for name, count in stats["by_company"].items():
+            print(f"  {name:<25} | {count:5d}")
+    return 0
+
+
+def cmd_purge(args: argparse.Namespace) -> int:
+    """Удаление старых месячных секций вакансий"""
+    db_manager = _db_manager()
+    dropped = db_manager.purge_old_partitions(args.retention_months)
+    if dropped:
+        db_manager.record_load()
+    else:
+        print("ℹ️ Нет секций для удаления")
+    return 0
+
+
+def cmd_enqueue(args: argparse.Namespace) -> int:
+    """Регистрация работодателей и постановка заданий обхода в очередь"""
+    from src.database.crawl_queue import CrawlQueue
+
+    queue = CrawlQueue(_db_manager())
+    if args.register:
+        # Файл: по одному работодателю в строке — "hh_id[;название]"
+        with open(args.register, encoding="utf-8") as file:
+            rows = [line.strip().split(";", 1) for line in file if line.strip() and not line.startswith("#")]
+        employers = [(int(row[0]), row[1] if len(row) > 1 else None) for row in rows]
+    else:
+        from src.api.company_api import PREDEFINED_COMPANIES
+
+        employers = [(c["id"], c["name"]) for c in PREDEFINED_COMPANIES]
+    registered = queue.register_employers(employers)
+    queued = queue.enqueue_all()
+    print(f"✅ Работодателей в реестре обновлено: {registered}, заданий поставлено: {queued}")
+    return 0
+
+
+def cmd_worker(args: argparse.Namespace) -> int:
+    """Воркер обхода: выполняет задания из очереди до ее опустошения"""
+    from src.database.crawl_queue import CrawlQueue
+    from src.database.crawl_worker import CrawlWorker
+
+    db_manager = _db_manager()
+    queue = CrawlQueue(db_manager, lease_seconds=args.lease)
+    worker = CrawlWorker(db_manager, queue, worker_id=args.id)
+    try:
+        done = worker.run(max_jobs=args.max_jobs, exit_when_idle=not args.forever)
+    except KeyboardInterrupt:
+        worker.stop()
+        return 130
+    print(f"🏁 Воркер {worker.worker_id}: выполнено заданий {done}, очередь: {queue.stats()}")
+    return 0
+
+
+def cmd_replay(args: argparse.Namespace) -> int:
+    """Пересборка БД или JSON-хранилища из архива сырых ответов"""
+    from src.api.archive import PayloadArchive
+
+    archive = PayloadArchive(args.archive)
+    if args.target == "json":
+        from src.database.replay import replay_to_json
+        from src.storage.json_saver import JSONSaver
+
+        count = replay_to_json(JSONSaver(args.output), archive, since=args.since)
+        print(f"✅ Из архива в data/{args.output} записано {count} вакансий")
+    else:
+        from src.database.replay import replay_to_db
+
+        companies_count, total = replay_to_db(_db_manager(), archive, since=args.since)
+        print(f"✅ Из архива восстановлено компаний: {companies_count}, записано вакансий: {total}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="HH API Integration: пакетный режим")
+    parser.add_argument("--profile", metavar="DIR", help="Профилировать этапы и сохранить отчет в DIR")
+    parser.add_argument("--profile-memory", action="store_true", help="Отслеживать память через tracemalloc")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fill = subparsers.add_parser("fill", help="Создать БД и заполнить, если она пуста")
+    fill.add_argument("--resume", action="store_true", help="Продолжить прерванное заполнение")
+    fill.set_defaults(func=cmd_fill)
+    sync = subparsers.add_parser("sync", help="Повторно загрузить данные работодателей")
+    sync.add_argument("--resume", action="store_true", help="Продолжить прерванную загрузку")
+    sync.set_defaults(func=cmd_sync)
+
+    search = subparsers.add_parser("search", help="Поиск вакансий через HH API")
+    search.add_argument("query")
+    search.add_argument("--words", nargs="*", help="Ключевые слова для фильтрации по описанию")
+    search.add_argument("--salary-min", type=int)
+    search.add_argument("--salary-max", type=int)
+    search.add_argument("--currency", default="RUR")
+    search.add_argument("--search-field", choices=["name", "company_name", "description"])
+    search.add_argument("--period", type=int, metavar="DAYS", help="Только вакансии за последние DAYS дней")
+    search.add_argument("--push-salary", action="store_true",
+                        help="Передать минимальную зарплату в API (HH подбирает близкие вилки)")
+    search.add_argument("--push-words", action="store_true",
+                        help="Добавить --words к запросу API (HH ищет целые слова, подстроки теряются)")
+    search.add_argument("--deadline", type=float, metavar="SEC", help="Вернуть то, что успело прийти за SEC секунд")
+    search.add_argument("--hedge-after", type=float, default=1.0, metavar="SEC",
+                        help="Дублировать запрос страницы, если ответа нет дольше SEC секунд")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--save", metavar="FILE", help="Сохранить найденное в JSON-хранилище data/FILE")
+    search.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    search.set_defaults(func=cmd_search)
+
+    batch = subparsers.add_parser("batch", help="Поиск по списку ключевых слов из файла")
+    batch.add_argument("keywords", help="Файл с ключевыми словами, по одному в строке")
+    batch.add_argument("--workers", type=int, help="Слов одновременно (по умолчанию — по регулятору транспорта)")
+    batch.add_argument("--pool", type=int, default=32, help="Размер пула HTTP-соединений")
+    batch.add_argument("--save", metavar="FILE", help="Сохранить найденное в JSON-хранилище data/FILE")
+    batch.add_argument("--resume", action="store_true", help="Пропустить слова, сохраненные прерванным запуском")
+    batch.set_defaults(func=cmd_batch)
+
+    export = subparsers.add_parser("export", help="Выгрузить вакансии из БД")
+    export.add_argument("--format", choices=["json", "csv"], default="json")
+    export.add_argument("--output", help="Файл (по умолчанию stdout)")
+    export.add_argument("--since", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help="Только вакансии, опубликованные с этой даты")
+    export.set_defaults(func=cmd_export)
+
+    find = subparsers.add_parser("find", help="Вакансии из БД по критериям raw (нужен DB_STORE_RAW=1)")
+    find.add_argument("--filter", action="append", type=_parse_criterion, metavar="ИМЯ=ЗНАЧЕНИЕ",
+                      help="area=1,2 schedule=remote key_skills=Python,SQL salary_min=150000 raw='{...}'")
+    find.add_argument("--limit", type=int, default=100)
+    find.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    find.set_defaults(func=cmd_find)
+
+    stats = subparsers.add_parser("stats", help="Сводка по базе данных")
+    stats.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    stats.set_defaults(func=cmd_stats)
+
+    purge = subparsers.add_parser("purge", help="Удалить секции вакансий старше срока хранения")
+    purge.add_argument("--retention-months", type=int, help="По умолчанию DB_RETENTION_MONTHS")
+    purge.set_defaults(func=cmd_purge)
+
+    enqueue = subparsers.add_parser("enqueue", help="Поставить работодателей в очередь обхода")
+    enqueue.add_argument("--register", metavar="FILE", help="Файл с работодателями (hh_id;название)")
+    enqueue.set_defaults(func=cmd_enqueue)
+
+    worker = subparsers.add_parser("worker", help="Запустить воркер обхода")
+    worker.add_argument("--id", help="Идентификатор воркера (по умолчанию хост:PID)")
+    worker.add_argument("--lease", type=int, default=120, help="Срок аренды задания, с")
+    worker.add_argument("--max-jobs", type=int)
+    worker.add_argument("--forever", action="store_true", help="Ждать новые задания вместо выхода")
+    worker.set_defaults(func=cmd_worker)
+
+    replay = subparsers.add_parser("replay", help="Пересобрать данные из архива ответов API (HH_ARCHIVE_DIR)")
+    replay.add_argument("--archive", default="data/archive", help="Каталог архива")
+    replay.add_argument("--target", choices=["db", "json"], default="db")
+    replay.add_argument("--output", default="vacancies.json", help="Файл JSON-хранилища для --target json")
+    replay.add_argument("--since", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    replay.set_defaults(func=cmd_replay)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    _load_env()
+
+    from src.monitoring.metrics import metrics
+
+    metrics.configure_from_env()
+    try:
+        if args.profile:
+            from src.monitoring.profiling import profiling
+
+            with profiling(args.profile, memory=args.profile_memory):
+                return args.func(args)
+        return args.func(args)
+    finally:
+        metrics.export_from_env()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+try:
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.monitoring.metrics import metrics
+
+NOTIFY_CHANNEL = "hh_data_changed"
+
+
+class QueryCache:
+    """
+    Кэш результатов аналитических запросов с вытеснением LRU/TTL.
+
+    Каждая запись помнит поколение данных, при котором она получена.
+    Любая запись в БД увеличивает поколение (invalidate), и старые записи
+    перестают считаться попаданием. Для нескольких процессов поколение
+    можно увеличивать по уведомлениям LISTEN/NOTIFY из PostgreSQL.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0, enabled: bool = True,
+                 listen_enabled: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.listen_enabled = listen_enabled
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    @classmethod
+    def from_env(cls):
+        """Создание кэша из переменных окружения"""
+        return cls(
+            maxsize=int(os.getenv("HH_QUERY_CACHE_SIZE", "128")),
+            ttl=float(os.getenv("HH_QUERY_CACHE_TTL", "300")),
+            enabled=os.getenv("HH_QUERY_CACHE", "1") != "0",
+            listen_enabled=os.getenv("HH_QUERY_CACHE_LISTEN", "0") == "1",
+        )
+
+    @property
+    def listening(self) -> bool:
+        return self._listener is not None
+
+    def invalidate(self) -> None:
+        """Новое поколение данных: все записи становятся устаревшими"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Значение из кэша или результат loader(), сохраненный в кэш"""
+        if not self.enabled:
+            return loader()
+
+        self._poll_notifications()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, generation, stored_at = entry
+                if generation == self.generation and now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    metrics.inc("hh_cache_hits_total", cache="db_query")
+                    return value
+                del self._entries[key]
+            generation = self.generation
+
+        metrics.inc("hh_cache_misses_total", cache="db_query")
+        value = loader()
+
+        with self._lock:
+            # Пока шел запрос, данные могли измениться — такой результат не кэшируем
+            if generation == self.generation:
+                self._entries[key] = (value, generation, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def listen(self, connection) -> None:
+        """
+        Подписка на уведомления об изменениях данных из других процессов.
+        :param connection: отдельное соединение psycopg2, переводится в autocommit
+        """
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        self._listener = connection
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _poll_notifications(self) -> None:
+        listener: Optional[Any] = self._listener
+        if listener is None:
+            return
+        try:
+            listener.poll()
+        except Exception as e:
+            print(f"Ошибка получения уведомлений БД: {e}")
+            self._listener = None
+            self.invalidate()
+            return
+        if listener.notifies:
+            listener.notifies.clear()
+            self.invalidate()
+
+
+_shared_cache: Optional[QueryCache] = None
+
+
+def get_shared_cache() -> QueryCache:
+    """Общий для процесса кэш запросов: все DBManager видят одно поколение данных"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = QueryCache.from_env()
+    return _shared_cache
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+from psycopg2.extras import execute_values
+
+try:
+    from database.db_manager import DBManager
+except ImportError:
+    from src.database.db_manager import DBManager
+
+
+@dataclass
+class CrawlJob:
+    """Задание обхода одного работодателя, выданное воркеру в аренду"""
+    job_id: int
+    employer_hh_id: int
+    attempts: int
+
+
+class CrawlQueue:
+    """
+    Реестр работодателей и очередь заданий обхода в PostgreSQL.
+
+    Воркеры забирают задания через FOR UPDATE SKIP LOCKED, поэтому несколько
+    процессов и машин не блокируют друг друга и не получают одно задание.
+    Задание выдается в аренду на lease_seconds и продлевается heartbeat;
+    аренда упавшего воркера истекает, и задание снова становится доступным.
+    """
+
+    def __init__(self, db_manager: DBManager, lease_seconds: int = 120, max_attempts: int = 3):
+        self.db_manager = db_manager
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def register_employers(self, employers: Iterable[Tuple[int, str]]) -> int:
+        """Добавление работодателей (hh_id, name) в реестр; существующие обновляют имя"""
+        rows = [(int(hh_id), name) for hh_id, name in employers]
+        if not rows:
+            return 0
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO employers (hh_id, name) VALUES %s
+                    ON CONFLICT (hh_id) DO UPDATE SET name = EXCLUDED.name
+                """, rows)
+                conn.commit()
+        return len(rows)
+
+    def enqueue_all(self) -> int:
+        """Постановка в очередь всех активных работодателей без активного задания"""
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.db_manager._execute(cursor, "enqueue_crawl_jobs", """
+                    INSERT INTO crawl_jobs (employer_hh_id)
+                    SELECT hh_id FROM employers WHERE active
+                    ON CONFLICT (employer_hh_id) WHERE status IN ('pending', 'running') DO NOTHING
+                """, table="crawl_jobs")
+                conn.commit()
+                return max(cursor.rowcount, 0)
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[CrawlJob]:
+        """Аренда до limit заданий: ожидающих или с истекшей арендой"""
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.db_manager._execute(cursor, "claim_crawl_jobs", """
+                    WITH next_jobs AS (
+                        SELECT job_id FROM crawl_jobs
+                        WHERE status = 'pending'
+                           OR (status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP
+                               AND attempts < %(max_attempts)s)
+                        ORDER BY job_id
+                        LIMIT %(limit)s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    UPDATE crawl_jobs j
+                    SET status = 'running',
+                        worker_id = %(worker_id)s,
+                        attempts = j.attempts + 1,
+                        heartbeat_at = CURRENT_TIMESTAMP,
+                        lease_expires_at = CURRENT_TIMESTAMP + %(lease)s * INTERVAL '1 second'
+                    FROM next_jobs
+                    WHERE j.job_id = next_jobs.job_id
+                    RETURNING j.job_id, j.employer_hh_id, j.attempts
+                """, {"max_attempts": self.max_attempts, "limit": limit,
+                      "worker_id": worker_id, "lease": self.lease_seconds})
+                jobs = [CrawlJob(*row) for row in cursor.fetchall()]
+                conn.commit()
+                return jobs
+
+    def heartbeat(self, worker_id: str, job_ids: List[int]) -> int:
+        """Продление аренды; возвращает число заданий, которые воркер еще удерживает"""
+        if not job_ids:
+            return 0
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.db_manager._execute(cursor, "heartbeat_crawl_jobs", """
+                    UPDATE crawl_jobs
+                    SET heartbeat_at = CURRENT_TIMESTAMP,
+                        lease_expires_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+                    WHERE job_id = ANY(%s) AND worker_id = %s AND status = 'running'
+                """, (self.lease_seconds, list(job_ids), worker_id))
+                conn.commit()
+                return cursor.rowcount
+
+    def complete(self, worker_id: str, job: CrawlJob) -> bool:
+        """Завершение задания; False, если аренда уже перешла к другому воркеру"""
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.db_manager._execute(cursor, "complete_crawl_job", """
+                    UPDATE crawl_jobs
+                    SET status = 'done', finished_at = CURRENT_TIMESTAMP, lease_expires_at = NULL
+                    WHERE job_id = %s AND worker_id = %s AND status = 'running'
+                """, (job.job_id, worker_id))
+                completed = cursor.rowcount > 0
+                if completed:
+                    cursor.execute("UPDATE employers SET last_crawled_at = CURRENT_TIMESTAMP WHERE hh_id = %s",
+                                   (job.employer_hh_id,))
+                conn.commit()
+                return completed
+
+    def fail(self, worker_id: str, job: CrawlJob, error: str) -> None:
+        """Ошибка задания: повтор, пока не исчерпаны попытки, затем статус failed"""
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.db_manager._execute(cursor, "fail_crawl_job", """
+                    UPDATE crawl_jobs
+                    SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                        last_error = %s,
+                        lease_expires_at = NULL,
+                        finished_at = CASE WHEN attempts >= %s THEN CURRENT_TIMESTAMP END
+                    WHERE job_id = %s AND worker_id = %s AND status = 'running'
+                """, (self.max_attempts, error[:1000], self.max_attempts, job.job_id, worker_id))
+                conn.commit()
+
+    def requeue_expired(self) -> int:
+        """Возврат в очередь заданий с истекшей арендой (упавшие воркеры)"""
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.db_manager._execute(cursor, "requeue_crawl_jobs", """
+                    UPDATE crawl_jobs
+                    SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                        last_error = 'lease expired',
+                        lease_expires_at = NULL
+                    WHERE status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP
+                """, (self.max_attempts,))
+                conn.commit()
+                return cursor.rowcount
+
+    def stats(self) -> dict:
+        """Число заданий по статусам"""
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self.db_manager._execute(cursor, "crawl_jobs_stats",
+                                         "SELECT status, COUNT(*) FROM crawl_jobs GROUP BY status")
+                return dict(cursor.fetchall())
@@ -0,0 +1,105 @@
+import os
+import socket
+import threading
+from typing import Optional
+
+try:
+    from api.company_api import HHCompanyAPI
+    from database.crawl_queue import CrawlJob, CrawlQueue
+    from database.db_manager import DBManager
+    from database.loader import load_company
+except ImportError:
+    from src.api.company_api import HHCompanyAPI
+    from src.database.crawl_queue import CrawlJob, CrawlQueue
+    from src.database.db_manager import DBManager
+    from src.database.loader import load_company
+
+
+def default_worker_id() -> str:
+    """Идентификатор воркера: хост и PID"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class CrawlWorker:
+    """
+    Воркер обхода: арендует задания из CrawlQueue, загружает вакансии
+    работодателя и записывает дельту в БД. Пока задание выполняется,
+    фоновый поток продлевает аренду.
+    """
+
+    def __init__(self, db_manager: DBManager, queue: CrawlQueue, api: Optional[HHCompanyAPI] = None,
+                 worker_id: Optional[str] = None, poll_interval: float = 5.0):
+        self.db_manager = db_manager
+        self.queue = queue
+        self.api = api or HHCompanyAPI()
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.company_ids = None
+        self._current: Optional[CrawlJob] = None
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(self.queue.lease_seconds / 3, 1)
+        while not self._stop.wait(interval):
+            job = self._current
+            if job is None:
+                continue
+            try:
+                if not self.queue.heartbeat(self.worker_id, [job.job_id]):
+                    print(f"⚠️ Аренда задания {job.job_id} потеряна")
+            except Exception as e:
+                print(f"⚠️ Ошибка heartbeat: {e}")
+
+    def process(self, job: CrawlJob) -> None:
+        """Выполнение одного задания; ошибка сети пробрасывается, и задание уходит в fail()"""
+        company_info = self.api.fetch_company_info(job.employer_hh_id)
+        if not company_info.get("id"):
+            raise RuntimeError(f"нет данных работодателя {job.employer_hh_id}")
+        company_info["vacancies"] = self.api.fetch_company_vacancies(job.employer_hh_id)
+
+        if self.company_ids is None:
+            self.company_ids = self.db_manager.get_company_ids()
+        added, updated, unchanged = load_company(self.db_manager, company_info, self.company_ids)
+        print(f"✅ [{self.worker_id}] {company_info['name']}: добавлено {added}, "
+              f"обновлено {updated}, без изменений {unchanged}")
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_idle: bool = True) -> int:
+        """
+        Цикл воркера до опустошения очереди (exit_when_idle) или stop().
+        :return: число успешно выполненных заданий
+        """
+        self._stop.clear()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        done = 0
+        try:
+            while not self._stop.is_set() and (max_jobs is None or done < max_jobs):
+                # Задания упавших воркеров возвращаются в очередь и при разовом запуске
+                self.queue.requeue_expired()
+                jobs = self.queue.claim(self.worker_id)
+                if not jobs:
+                    if exit_when_idle:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                job = self._current = jobs[0]
+                try:
+                    self.process(job)
+                except Exception as e:
+                    print(f"❌ [{self.worker_id}] Задание {job.job_id}: {e}")
+                    self.queue.fail(self.worker_id, job, str(e))
+                else:
+                    if self.queue.complete(self.worker_id, job):
+                        done += 1
+                finally:
+                    self._current = None
+        finally:
+            self._stop.set()
+            heartbeat.join()
+            if done:
+                self.db_manager.record_load()
+        return done
@@ -1,9 +1,77 @@
 import psycopg2
-from typing import List, Dict, Any, Optional
+import psycopg2.errors
+import hashlib
+import json
+import threading
+from typing import List, Dict, Any, Optional, Union
 from dataclasses import dataclass
+from datetime import date, datetime
 import os
 from contextlib import contextmanager
 
+try:
+    from analytics.quantiles import KLLSketch
+    from database.cache import NOTIFY_CHANNEL, QueryCache, get_shared_cache
+    from database.raw_filter import compile_raw_filter
+    from models.vacancy_record import VacancyRecord
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.analytics.quantiles import KLLSketch
+    from src.database.cache import NOTIFY_CHANNEL, QueryCache, get_shared_cache
+    from src.database.raw_filter import compile_raw_filter
+    from src.models.vacancy_record import VacancyRecord
+    from src.monitoring.metrics import metrics
+
+SCHEMA_VERSION = 9  # Увеличивается при каждом изменении схемы
+
+# Общие колонки вакансий для обычной и секционированной таблицы
+VACANCY_COLUMNS = """
+    hh_id BIGINT,
+    title VARCHAR(500) NOT NULL,
+    company_id INTEGER REFERENCES companies(company_id) ON DELETE CASCADE,
+    salary_from INTEGER,
+    salary_to INTEGER,
+    salary_avg INTEGER,
+    currency VARCHAR(10),
+    description TEXT,
+    experience VARCHAR(100),
+    employment_mode VARCHAR(100),
+    key_skills TEXT[],
+    content_hash CHAR(40),
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+"""
+
+
+def month_start(value: date) -> date:
+    """Первый день месяца"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    """Первый день месяца, отстоящего от month на count месяцев"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Имя месячной секции таблицы вакансий"""
+    return f"vacancies_p{month.year:04d}{month.month:02d}"
+
+
+def published_month(published_at: Optional[str]) -> date:
+    """Месяц публикации из строки ISO 8601; без даты — текущий месяц"""
+    try:
+        return datetime.strptime(published_at[:7], "%Y-%m").date()
+    except (TypeError, ValueError):
+        return month_start(date.today())
+
+
+def company_hash(company_data: Dict[str, Any]) -> str:
+    """Хэш изменяемых полей компании: по нему определяется, изменилась ли компания"""
+    fields = (company_data.get("name"), company_data.get("alternate_url"), company_data.get("description"))
+    normalized = "\x1f".join("" if value is None else str(value).strip() for value in fields)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
 
 @dataclass
 class DBConfig:
@@ -13,6 +81,9 @@ class DBConfig:
     password: str = "password"  # Измените на ваш пароль!
     host: str = "localhost"
     port: str = "5432"
+    partitioned: bool = False  # Секционирование вакансий по месяцу публикации
+    retention_months: int = 0  # Сколько месяцев хранить секции (0 — без ограничения)
+    store_raw: bool = False  # Сохранять проекцию элемента выдачи в JSONB-колонку raw
 
     @classmethod
     def from_env(cls):
@@ -22,41 +93,91 @@ class DBConfig:
             user=os.getenv("DB_USER", "postgres"),
             password=os.getenv("DB_PASSWORD", "password"),
             host=os.getenv("DB_HOST", "localhost"),
-            port=os.getenv("DB_PORT", "5432")
+            port=os.getenv("DB_PORT", "5432"),
+            partitioned=os.getenv("DB_PARTITIONED", "0") == "1",
+            retention_months=int(os.getenv("DB_RETENTION_MONTHS", "0")),
+            store_raw=os.getenv("DB_STORE_RAW", "0") == "1",
         )
 
 
 class DBManager:
     """Класс для управления базой данных вакансий"""
 
-    def __init__(self, config: DBConfig = None):
+    def __init__(self, config: DBConfig = None, cache: Optional[QueryCache] = None, strict: bool = False):
         self.config = config or DBConfig()
         self.connection = None
+        # Строгий режим (CLI): ошибки чтения передаются вызывающему вместо печати и пустого результата
+        self.strict = strict
+        # Кэш общий для процесса: запись через любой DBManager сбрасывает его для всех
+        self.cache = cache or get_shared_cache()
+        self._partitions = set()  # Месяцы, для которых секция уже создана
+        # Скетчи зарплат новых вакансий, еще не слитые в salary_sketches
+        self._pending_sketches: Dict[tuple, KLLSketch] = {}
+        self._sketches_lock = threading.Lock()
+        # Изменение числа строк с прошлого record_load: счетчики schema_meta обновляются без COUNT(*)
+        self._row_deltas = {"companies": 0, "vacancies": 0}
+        self._deltas_lock = threading.Lock()
+
+    def _connect(self):
+        return psycopg2.connect(
+            dbname=self.config.dbname,
+            user=self.config.user,
+            password=self.config.password,
+            host=self.config.host,
+            port=self.config.port,
+            options="-c client_encoding=UTF8"  # Добавляем явное указание кодировки
+        )
 
     @contextmanager
     def get_connection(self):
         """Контекстный менеджер для подключения к БД"""
         conn = None
         try:
-            conn = psycopg2.connect(
-                dbname=self.config.dbname,
-                user=self.config.user,
-                password=self.config.password,
-                host=self.config.host,
-                port=self.config.port,
-                options="-c client_encoding=UTF8"  # Добавляем явное указание кодировки
-            )
+            conn = self._connect()
             # Устанавливаем кодировку явно
             with conn.cursor() as cursor:
                 cursor.execute("SET client_encoding TO 'UTF8'")
             yield conn
         except Exception as e:
-            print(f"❌ Ошибка подключения к БД: {e}")
+            if not self.strict:
+                print(f"❌ Ошибка подключения к БД: {e}")
             raise
         finally:
             if conn:
                 conn.close()
 
+    def _execute(self, cursor, statement: str, query: str, params: Optional[Union[tuple, dict]] = None,
+                 table: Optional[str] = None) -> None:
+        """Выполнение SQL-запроса с учетом метрик (table — для подсчета записанных строк)"""
+        with metrics.timer("hh_db_statement_seconds", statement=statement):
+            cursor.execute(query, params)
+        metrics.inc("hh_db_statements_total", statement=statement)
+        if table and cursor.rowcount > 0:
+            metrics.inc("hh_db_rows_written_total", cursor.rowcount, table=table)
+
+    def _cached(self, key: tuple, loader):
+        """Результат запроса из кэша; ключ дополняется адресом БД"""
+        if self.cache.listen_enabled and not self.cache.listening:
+            try:
+                self.cache.listen(self._connect())
+            except Exception as e:
+                print(f"⚠️ Не удалось подписаться на изменения БД: {e}")
+                self.cache.listen_enabled = False
+        database = (self.config.host, self.config.port, self.config.dbname)
+        return self.cache.get_or_load((database, *key), loader)
+
+    def _read_failed(self, message: str, error: Exception, default):
+        """Ошибка чтения: в строгом режиме пробрасывается, иначе печатается и заменяется default"""
+        if self.strict:
+            raise error
+        print(f"{message}: {error}")
+        return default
+
+    @staticmethod
+    def _notify_changed(cursor) -> None:
+        """Уведомление других процессов об изменении данных (доставляется при commit)"""
+        cursor.execute(f"NOTIFY {NOTIFY_CHANNEL}")
+
     def create_database(self):
         """Создание базы данных если не существует"""
         try:
@@ -107,96 +228,473 @@ class DBManager:
                         hh_id INTEGER UNIQUE
                     )
                 """)
+                cursor.execute("ALTER TABLE companies ADD COLUMN IF NOT EXISTS content_hash CHAR(40)")
 
                 # Таблица вакансий
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS vacancies (
-                        vacancy_id SERIAL PRIMARY KEY,
-                        title VARCHAR(500) NOT NULL,
-                        company_id INTEGER REFERENCES companies(company_id) ON DELETE CASCADE,
-                        salary_from INTEGER,
-                        salary_to INTEGER,
-                        salary_avg INTEGER,
-                        currency VARCHAR(10),
-                        url VARCHAR(500) UNIQUE,
-                        description TEXT,
-                        experience VARCHAR(100),
-                        employment_mode VARCHAR(100),
-                        created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
+                if self.config.partitioned:
+                    # Уникальные ключи секционированной таблицы обязаны содержать ключ секционирования
+                    cursor.execute(f"""
+                        CREATE TABLE IF NOT EXISTS vacancies (
+                            vacancy_id SERIAL,
+                            url VARCHAR(500) NOT NULL,
+                            {VACANCY_COLUMNS}
+                            published_at TIMESTAMP NOT NULL,
+                            PRIMARY KEY (vacancy_id, published_at)
+                        ) PARTITION BY RANGE (published_at)
+                    """)
+                    self._ensure_partition(cursor, month_start(date.today()))
+                else:
+                    cursor.execute(f"""
+                        CREATE TABLE IF NOT EXISTS vacancies (
+                            vacancy_id SERIAL PRIMARY KEY,
+                            url VARCHAR(500),
+                            {VACANCY_COLUMNS}
+                            published_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    # Миграция таблиц, созданных до появления published_at
+                    cursor.execute("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS published_at TIMESTAMP")
+                    cursor.execute("UPDATE vacancies SET published_at = created_date WHERE published_at IS NULL")
+                    cursor.execute("ALTER TABLE vacancies ALTER COLUMN published_at SET DEFAULT CURRENT_TIMESTAMP")
+
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS content_hash CHAR(40)")
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS key_skills TEXT[]")
+
+                # Ключ дедупликации — числовой id HH; для старых строк берется из ссылки
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS hh_id BIGINT")
+                cursor.execute(r"""
+                    UPDATE vacancies SET hh_id = substring(url FROM '/vacancy/(\d+)')::BIGINT
+                    WHERE hh_id IS NULL AND url ~ '/vacancy/\d+'
                 """)
+                hh_key = "hh_id, published_at" if self.config.partitioned else "hh_id"
+                cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_vacancies_hh_id ON vacancies({hh_key})")
+
+                # Проекция выдачи для произвольных фильтров (DB_STORE_RAW=1, см. find_vacancies);
+                # jsonb_path_ops поддерживает только @>, зато индекс в разы меньше обычного GIN
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS raw JSONB")
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_vacancies_raw ON vacancies USING GIN (raw jsonb_path_ops)"
+                )
+
+                cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'vacancies'::regclass")
+                if (cursor.fetchone()[0] == "p") != self.config.partitioned:
+                    print("⚠️ Таблица vacancies уже создана с другой схемой секционирования, "
+                          "для смены схемы ее нужно пересоздать")
 
                 # Индексы для улучшения производительности
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_title ON vacancies(title)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_salary_avg ON vacancies(salary_avg)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_company ON vacancies(company_id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_published ON vacancies(published_at)")
 
+                # Реестр работодателей и очередь заданий обхода для воркеров (см. crawl_queue)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS employers (
+                        hh_id INTEGER PRIMARY KEY,
+                        name VARCHAR(255),
+                        active BOOLEAN NOT NULL DEFAULT TRUE,
+                        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_crawled_at TIMESTAMP
+                    )
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS crawl_jobs (
+                        job_id BIGSERIAL PRIMARY KEY,
+                        employer_hh_id INTEGER NOT NULL REFERENCES employers(hh_id) ON DELETE CASCADE,
+                        status VARCHAR(16) NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        worker_id VARCHAR(100),
+                        lease_expires_at TIMESTAMP,
+                        heartbeat_at TIMESTAMP,
+                        last_error TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        finished_at TIMESTAMP
+                    )
+                """)
+                # Не больше одного активного задания на работодателя
+                cursor.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_crawl_jobs_active
+                    ON crawl_jobs(employer_hh_id) WHERE status IN ('pending', 'running')
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_crawl_jobs_claim
+                    ON crawl_jobs(status, lease_expires_at, job_id)
+                """)
+
+                # Скетчи квантилей зарплат: обновляются при загрузке, сливаются между воркерами
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS salary_sketches (
+                        company_id INTEGER REFERENCES companies(company_id) ON DELETE CASCADE,
+                        experience VARCHAR(100) NOT NULL DEFAULT '',
+                        currency VARCHAR(10) NOT NULL DEFAULT '',
+                        sketch JSONB NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (company_id, experience, currency)
+                    )
+                """)
+
+                # Метаданные схемы: одна строка, читается при запуске вместо COUNT(*)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_meta (
+                        id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                        schema_version INTEGER NOT NULL,
+                        last_load_at TIMESTAMP,
+                        companies_count BIGINT NOT NULL DEFAULT 0,
+                        vacancies_count BIGINT NOT NULL DEFAULT 0
+                    )
+                """)
+                # Первичное заполнение для баз, созданных до появления schema_meta
+                cursor.execute("""
+                    INSERT INTO schema_meta (id, schema_version, companies_count, vacancies_count)
+                    SELECT 1, %s, (SELECT COUNT(*) FROM companies), (SELECT COUNT(*) FROM vacancies)
+                    WHERE NOT EXISTS (SELECT 1 FROM schema_meta)
+                """, (SCHEMA_VERSION,))
+                cursor.execute("UPDATE schema_meta SET schema_version = %s WHERE id = 1", (SCHEMA_VERSION,))
+
+                self._notify_changed(cursor)
                 conn.commit()
+                self._partitions.clear()
+                self.cache.invalidate()
                 print("Таблицы созданы успешно")
 
+    def _ensure_partition(self, cursor, month: date) -> bool:
+        """
+        Создание секции месяца month, если ее еще нет.
+        :return: True, если выполнялся DDL (секцию нужно запомнить после commit)
+        """
+        if month in self._partitions:
+            return False
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF vacancies "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            (month, add_months(month, 1)),
+        )
+        return True
+
+    def _retention_cutoff(self, retention_months: Optional[int] = None) -> Optional[date]:
+        """Первый хранимый месяц секционированной таблицы (None — срок хранения не задан)"""
+        retention = self.config.retention_months if retention_months is None else retention_months
+        if not self.config.partitioned or retention <= 0:
+            return None
+        return add_months(month_start(date.today()), -retention)
+
+    def purge_old_partitions(self, retention_months: Optional[int] = None) -> List[str]:
+        """
+        Удаление секций старше retention_months месяцев: DROP TABLE вместо DELETE.
+        :return: имена удаленных секций
+        """
+        cutoff = self._retention_cutoff(retention_months)
+        if cutoff is None:
+            return []
+
+        dropped = []
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self._execute(cursor, "list_partitions", """
+                    SELECT child.relname, child.reltuples
+                    FROM pg_inherits
+                    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                    WHERE parent.relname = 'vacancies'
+                """)
+                removed = 0
+                for name, rows in cursor.fetchall():
+                    try:
+                        month = datetime.strptime(name, "vacancies_p%Y%m").date()
+                    except ValueError:
+                        continue
+                    if add_months(month, 1) <= cutoff:
+                        self._execute(cursor, "drop_partition", f"DROP TABLE {name}")
+                        self._partitions.discard(month)
+                        dropped.append(name)
+                        # Оценка статистики вместо подсчета строк удаляемой секции
+                        removed += max(0, int(rows or 0))
+                if dropped:
+                    self._notify_changed(cursor)
+                conn.commit()
+
+        if dropped:
+            self._count_rows("vacancies", -removed)
+            self.cache.invalidate()
+            print(f"🗑️ Удалены секции старше {cutoff:%Y-%m}: {', '.join(sorted(dropped))}")
+        return dropped
+
+    def get_startup_state(self) -> Optional[Dict[str, Any]]:
+        """
+        Состояние БД для решения при запуске: одна выборка по первичному ключу.
+        :return: None, если схема еще не создана
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                try:
+                    self._execute(cursor, "startup_state", """
+                        SELECT schema_version, last_load_at, companies_count, vacancies_count
+                        FROM schema_meta
+                        WHERE id = 1
+                    """)
+                except psycopg2.errors.UndefinedTable:
+                    return None
+                row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return {
+            "schema_version": row[0],
+            "last_load_at": row[1],
+            "companies_count": row[2],
+            "vacancies_count": row[3],
+        }
+
+    def _count_rows(self, table: str, delta: int) -> None:
+        with self._deltas_lock:
+            self._row_deltas[table] += delta
+
+    def record_load(self) -> None:
+        """
+        Обновление метаданных после загрузки: время и число строк.
+        Счетчики сдвигаются на число строк, добавленных и удаленных этим DBManager,
+        поэтому таблицы не сканируются (после удаления секций — по оценке pg_class.reltuples).
+        """
+        with self._deltas_lock:
+            deltas = dict(self._row_deltas)
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, "record_load", """
+                        UPDATE schema_meta
+                        SET last_load_at = CURRENT_TIMESTAMP,
+                            companies_count = GREATEST(0, companies_count + %(companies)s),
+                            vacancies_count = GREATEST(0, vacancies_count + %(vacancies)s)
+                        WHERE id = 1
+                    """, deltas)
+                    conn.commit()
+        except Exception as e:
+            print(f"Ошибка при обновлении метаданных загрузки: {e}")
+            return
+        # Учтенные изменения вычитаются: параллельные вставки остаются до следующего вызова
+        with self._deltas_lock:
+            for table, delta in deltas.items():
+                self._row_deltas[table] -= delta
+
     def insert_company(self, company_data: Dict[str, Any]) -> Optional[int]:
-        """Добавление компании в базу данных"""
+        """
+        Добавление компании или обновление, если изменилось ее содержимое (хэш company_hash).
+        Возвращает company_id и для уже существующей компании, в том числе без изменений.
+        """
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO companies (name, url, description, hh_id)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (hh_id) DO NOTHING
-                        RETURNING company_id
+                    self._execute(cursor, "insert_company", """
+                        INSERT INTO companies (name, url, description, hh_id, content_hash)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (hh_id) DO UPDATE
+                        SET name = EXCLUDED.name,
+                            url = EXCLUDED.url,
+                            description = COALESCE(EXCLUDED.description, companies.description),
+                            content_hash = EXCLUDED.content_hash
+                        WHERE companies.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                        RETURNING company_id, (xmax = 0) AS inserted
                     """, (
                         company_data.get('name'),
                         company_data.get('alternate_url'),
                         company_data.get('description'),
-                        company_data.get('id')
-                    ))
-
-                    result = cursor.fetchone()
-                    conn.commit()
-                    return result[0] if result else None
+                        company_data.get('id'),
+                        company_hash(company_data)
+                    ), table="companies")
+
+                    result = cursor.fetchone() if cursor.rowcount > 0 else None
+                    if result:
+                        self._notify_changed(cursor)
+                        conn.commit()
+                        self.cache.invalidate()
+                        if result[1]:
+                            self._count_rows("companies", 1)
+                        return result[0]
+
+                    # Компания не изменилась: строка не переписывается
+                    self._execute(cursor, "company_id", "SELECT company_id FROM companies WHERE hh_id = %s",
+                                  (company_data.get('id'),))
+                    row = cursor.fetchone()
+                    return row[0] if row else None
 
         except Exception as e:
             print(f"Ошибка при добавлении компании: {e}")
             return None
 
-    def insert_vacancy(self, vacancy_data: Dict[str, Any], company_id: int) -> bool:
-        """Добавление вакансии в базу данных"""
+    def get_company_ids(self) -> Dict[int, int]:
+        """Отображение hh_id → company_id для всех компаний одним запросом"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                self._execute(cursor, "company_ids", "SELECT hh_id, company_id FROM companies WHERE hh_id IS NOT NULL")
+                return dict(cursor.fetchall())
+
+    def get_vacancy_hashes(self, company_id: int) -> Dict[int, str]:
+        """Хэши содержимого вакансий компании: hh_id → content_hash"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                # При включенном store_raw строки без raw считаются изменившимися и дописываются
+                self._execute(cursor, "vacancy_hashes", """
+                    SELECT hh_id, content_hash FROM vacancies
+                    WHERE company_id = %s AND hh_id IS NOT NULL AND (NOT %s OR raw IS NOT NULL)
+                """, (company_id, self.config.store_raw))
+                return dict(cursor.fetchall())
+
+    def insert_vacancy(self, vacancy_data: Union[VacancyRecord, Dict[str, Any]], company_id: int,
+                       content_hash: Optional[str] = None) -> bool:
+        """
+        Добавление вакансии в базу данных или обновление, если изменилось ее содержимое.
+
+        В секционированной таблице ключ строки — (hh_id, published_at). Вакансия,
+        переопубликованная с новой датой, переносится: строка с прежней датой удаляется
+        в той же транзакции. Загрузчик пропускает вакансии с прежним хэшем содержимого,
+        поэтому при переопубликации без изменений остается первая дата, и срок хранения
+        отсчитывается от нее. Вакансии старше срока хранения (DB_RETENTION_MONTHS)
+        пропускаются, чтобы не создавать заново уже удаленные секции.
+        :param content_hash: заранее посчитанный VacancyRecord.content_hash()
+        :return: True, если строка добавлена или обновлена
+        """
         try:
-            salary = vacancy_data.get('salary', {})
-            salary_from = salary.get('from')
-            salary_to = salary.get('to')
-            salary_avg = self._calculate_avg_salary(salary_from, salary_to)
+            if isinstance(vacancy_data, dict):
+                vacancy_data = VacancyRecord.from_api(vacancy_data)
+            if vacancy_data.hh_id is None:
+                # Без id строку нельзя сопоставить с сохраненной: повторная загрузка дала бы дубликат
+                print(f"⚠️ Вакансия без id HH пропущена: {vacancy_data.alternate_url}")
+                return False
+            content_hash = content_hash or vacancy_data.content_hash()
+            salary_avg = self._calculate_avg_salary(vacancy_data.salary_from, vacancy_data.salary_to)
+            published_at = vacancy_data.published_at or datetime.now().isoformat(timespec="seconds")
+            conflict = "(hh_id, published_at)" if self.config.partitioned else "(hh_id)"
+            month = published_month(published_at)
+            cutoff = self._retention_cutoff()
+            if cutoff is not None and add_months(month, 1) <= cutoff:
+                metrics.inc("hh_db_rows_skipped_total", reason="retention")
+                return False
 
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
+                    created = self.config.partitioned and self._ensure_partition(cursor, month)
+                    replaced = 0
+                    if self.config.partitioned:
+                        # Переопубликованная вакансия: прежняя строка лежит в секции другого месяца
+                        self._execute(cursor, "delete_republished", """
+                            DELETE FROM vacancies
+                            WHERE hh_id = %s AND published_at <> %s::timestamp
+                        """, (vacancy_data.hh_id, published_at))
+                        replaced = max(cursor.rowcount, 0)
+                    self._execute(cursor, "insert_vacancy", f"""
                         INSERT INTO vacancies (
-                            title, company_id, salary_from, salary_to, 
-                            salary_avg, currency, url, description, 
-                            experience, employment_mode
+                            hh_id, title, company_id, salary_from, salary_to,
+                            salary_avg, currency, url, description,
+                            experience, employment_mode, published_at, key_skills, content_hash, raw
                         )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (url) DO NOTHING
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT {conflict} DO UPDATE
+                        SET title = EXCLUDED.title,
+                            url = EXCLUDED.url,
+                            company_id = EXCLUDED.company_id,
+                            salary_from = EXCLUDED.salary_from,
+                            salary_to = EXCLUDED.salary_to,
+                            salary_avg = EXCLUDED.salary_avg,
+                            currency = EXCLUDED.currency,
+                            description = COALESCE(NULLIF(EXCLUDED.description, ''), vacancies.description),
+                            experience = EXCLUDED.experience,
+                            employment_mode = EXCLUDED.employment_mode,
+                            key_skills = COALESCE(EXCLUDED.key_skills, vacancies.key_skills),
+                            content_hash = EXCLUDED.content_hash,
+                            raw = COALESCE(EXCLUDED.raw, vacancies.raw)
+                        WHERE vacancies.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                           OR (vacancies.raw IS NULL AND EXCLUDED.raw IS NOT NULL)
+                        RETURNING (xmax = 0) AS inserted
                     """, (
-                        vacancy_data.get('name'),
+                        vacancy_data.hh_id,
+                        vacancy_data.name,
                         company_id,
-                        salary_from,
-                        salary_to,
+                        vacancy_data.salary_from,
+                        vacancy_data.salary_to,
                         salary_avg,
-                        salary.get('currency'),
-                        vacancy_data.get('alternate_url'),
-                        vacancy_data.get('description', ''),
-                        vacancy_data.get('experience', {}).get('name'),
-                        vacancy_data.get('employment', {}).get('name')
-                    ))
-
+                        vacancy_data.currency,
+                        vacancy_data.alternate_url,
+                        vacancy_data.description,
+                        vacancy_data.experience,
+                        vacancy_data.employment,
+                        published_at,
+                        vacancy_data.key_skills,
+                        content_hash,
+                        json.dumps(vacancy_data.raw_payload(), ensure_ascii=False) if self.config.store_raw else None
+                    ), table="vacancies")
+
+                    row = cursor.fetchone() if cursor.rowcount > 0 else None
+                    changed = row is not None
+                    if changed:
+                        self._notify_changed(cursor)
                     conn.commit()
-                    return True
+                    if created:
+                        self._partitions.add(month)
+                    if changed:
+                        self.cache.invalidate()
+                    if replaced or (changed and row[0]):
+                        self._count_rows("vacancies", int(changed and row[0]) - replaced)
+                    # В скетч попадают только новые вакансии, чтобы обновления не учитывались дважды
+                    if changed and row[0] and not replaced and salary_avg:
+                        self._add_to_sketch(company_id, vacancy_data, salary_avg)
+                    return changed
 
         except Exception as e:
             print(f"Ошибка при добавлении вакансии: {e}")
             return False
 
+    def _add_to_sketch(self, company_id: int, vacancy: VacancyRecord, salary: int) -> None:
+        key = (company_id, vacancy.experience or "", vacancy.currency or "")
+        with self._sketches_lock:
+            sketch = self._pending_sketches.get(key)
+            if sketch is None:
+                sketch = self._pending_sketches[key] = KLLSketch()
+            sketch.update(salary)
+
+    def flush_salary_sketches(self) -> int:
+        """
+        Слияние накопленных скетчей с сохраненными в salary_sketches.
+        Строка блокируется на время слияния, поэтому воркеры могут сливать параллельно.
+        Если запись не удалась, скетчи возвращаются в очередь и сливаются при следующем вызове.
+        :return: число обновленных строк
+        """
+        with self._sketches_lock:
+            pending, self._pending_sketches = self._pending_sketches, {}
+        if not pending:
+            return 0
+
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    for (company_id, experience, currency), sketch in pending.items():
+                        key = (company_id, experience, currency)
+                        self._execute(cursor, "insert_salary_sketch", """
+                            INSERT INTO salary_sketches (company_id, experience, currency, sketch)
+                            VALUES (%s, %s, %s, %s)
+                            ON CONFLICT (company_id, experience, currency) DO NOTHING
+                        """, (*key, json.dumps(KLLSketch().to_dict())))
+                        self._execute(cursor, "select_salary_sketch", """
+                            SELECT sketch FROM salary_sketches
+                            WHERE company_id = %s AND experience = %s AND currency = %s
+                            FOR UPDATE
+                        """, key)
+                        merged = KLLSketch.from_dict(cursor.fetchone()[0]).merge(sketch)
+                        self._execute(cursor, "update_salary_sketch", """
+                            UPDATE salary_sketches SET sketch = %s, updated_at = CURRENT_TIMESTAMP
+                            WHERE company_id = %s AND experience = %s AND currency = %s
+                        """, (json.dumps(merged.to_dict()), *key))
+                    self._notify_changed(cursor)
+                    conn.commit()
+        except Exception as e:
+            with self._sketches_lock:
+                for key, sketch in pending.items():
+                    current = self._pending_sketches.get(key)
+                    self._pending_sketches[key] = sketch if current is None else sketch.merge(current)
+            print(f"⚠️ Скетчи зарплат не сохранены ({e}), повтор при следующей записи")
+            return 0
+        self.cache.invalidate()
+        return len(pending)
+
     def _calculate_avg_salary(self, salary_from: Optional[int], salary_to: Optional[int]) -> Optional[int]:
         """Расчет средней зарплаты"""
         if salary_from and salary_to:
@@ -205,10 +703,10 @@ class DBManager:
 
     def get_companies_and_vacancies_count(self) -> List[tuple]:
         """Получает список всех компаний и количество вакансий у каждой компании"""
-        try:
+        def query():
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
+                    self._execute(cursor, "companies_and_vacancies_count", """
                         SELECT c.name, COUNT(v.vacancy_id) as vacancy_count
                         FROM companies c
                         LEFT JOIN vacancies v ON c.company_id = v.company_id
@@ -216,51 +714,88 @@ class DBManager:
                         ORDER BY vacancy_count DESC
                     """)
                     return cursor.fetchall()
-        except Exception as e:
-            print(f"Ошибка при получении данных: {e}")
-            return []
 
-    def get_all_vacancies(self) -> List[tuple]:
-        """Получает список всех вакансий с указанием названия компании, названия вакансии и зарплаты и ссылки на вакансию"""
         try:
+            return self._cached(("companies_and_vacancies_count",), query)
+        except Exception as e:
+            return self._read_failed("Ошибка при получении данных", e, [])
+
+    def get_all_vacancies(self, since: Optional[date] = None) -> List[tuple]:
+        """
+        Получает список всех вакансий с указанием названия компании, названия вакансии и зарплаты и ссылки на вакансию
+        :param since: только опубликованные с этой даты (в секционированной БД читаются лишь нужные секции)
+        """
+        def query():
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
+                    self._execute(cursor, "all_vacancies", """
                         SELECT c.name, v.title, 
                                COALESCE(v.salary_avg, v.salary_from, v.salary_to, 0) as salary,
                                v.currency, v.url
                         FROM vacancies v
                         JOIN companies c ON v.company_id = c.company_id
+                        WHERE %(since)s::timestamp IS NULL OR v.published_at >= %(since)s::timestamp
                         ORDER BY salary DESC NULLS LAST
-                    """)
+                    """, {"since": since})
                     return cursor.fetchall()
+
+        try:
+            return self._cached(("all_vacancies", since), query)
         except Exception as e:
-            print(f"Ошибка при получении вакансий: {e}")
-            return []
+            return self._read_failed("Ошибка при получении вакансий", e, [])
+
+    def get_salary_quantiles(self, quantiles: tuple = (0.25, 0.5, 0.75, 0.9), company: Optional[str] = None,
+                             experience: Optional[str] = None, currency: Optional[str] = "RUR") -> Dict[float, float]:
+        """
+        Квантили зарплат по скетчам без сканирования вакансий (ошибка ранга около 1%).
+        Фильтры company (название), experience и currency необязательны.
+        """
+        def query():
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, "salary_quantiles", """
+                        SELECT s.sketch
+                        FROM salary_sketches s
+                        JOIN companies c ON c.company_id = s.company_id
+                        WHERE (%(company)s::text IS NULL OR c.name = %(company)s)
+                          AND (%(experience)s::text IS NULL OR s.experience = %(experience)s)
+                          AND (%(currency)s::text IS NULL OR s.currency = %(currency)s)
+                    """, {"company": company, "experience": experience, "currency": currency})
+                    sketch = KLLSketch()
+                    for (data,) in cursor.fetchall():
+                        sketch.merge(KLLSketch.from_dict(data))
+            return dict(zip(quantiles, sketch.quantiles(quantiles))) if sketch.n else {}
+
+        try:
+            return self._cached(("salary_quantiles", tuple(quantiles), company, experience, currency), query)
+        except Exception as e:
+            return self._read_failed("Ошибка при расчете квантилей зарплат", e, {})
 
     def get_avg_salary(self) -> float:
         """Получает среднюю зарплату по вакансиям"""
-        try:
+        def query():
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
+                    self._execute(cursor, "avg_salary", """
                         SELECT AVG(salary_avg) 
                         FROM vacancies 
                         WHERE salary_avg IS NOT NULL AND salary_avg > 0
                     """)
                     result = cursor.fetchone()
                     return round(result[0], 2) if result and result[0] else 0.0
+
+        try:
+            return self._cached(("avg_salary",), query)
         except Exception as e:
-            print(f"Ошибка при расчете средней зарплаты: {e}")
-            return 0.0
+            return self._read_failed("Ошибка при расчете средней зарплаты", e, 0.0)
 
     def get_vacancies_with_higher_salary(self) -> List[tuple]:
         """Получает список всех вакансий, у которых зарплата выше средней по всем вакансиям"""
-        try:
+        def query():
             avg_salary = self.get_avg_salary()
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
+                    self._execute(cursor, "vacancies_with_higher_salary", """
                         SELECT c.name, v.title, v.salary_avg, v.currency, v.url
                         FROM vacancies v
                         JOIN companies c ON v.company_id = c.company_id
@@ -268,26 +803,59 @@ class DBManager:
                         ORDER BY v.salary_avg DESC
                     """, (avg_salary,))
                     return cursor.fetchall()
+
+        try:
+            return self._cached(("vacancies_with_higher_salary",), query)
         except Exception as e:
-            print(f"Ошибка при получении вакансий: {e}")
-            return []
+            return self._read_failed("Ошибка при получении вакансий", e, [])
 
     def get_vacancies_with_keyword(self, keyword: str) -> List[tuple]:
         """Получает список всех вакансий, в названии которых содержатся переданные слова"""
-        try:
+        pattern = f'%{keyword.lower()}%'
+
+        def query():
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
+                    self._execute(cursor, "vacancies_with_keyword", """
                         SELECT c.name, v.title, v.salary_avg, v.currency, v.url
                         FROM vacancies v
                         JOIN companies c ON v.company_id = c.company_id
                         WHERE LOWER(v.title) LIKE %s
                         ORDER BY v.salary_avg DESC NULLS LAST
-                    """, (f'%{keyword.lower()}%',))
+                    """, (pattern,))
                     return cursor.fetchall()
+
+        try:
+            return self._cached(("vacancies_with_keyword", pattern), query)
         except Exception as e:
-            print(f"Ошибка при поиске вакансий: {e}")
-            return []
+            return self._read_failed("Ошибка при поиске вакансий", e, [])
+
+    def find_vacancies(self, criteria: Dict[str, Any], limit: int = 100) -> List[tuple]:
+        """
+        Вакансии по произвольным критериям из колонки raw (см. database.raw_filter).
+        Критерии превращаются в проверки вхождения raw @> …, которые обслуживает
+        GIN-индекс, поэтому новые срезы не требуют ни изменения схемы, ни повторной загрузки.
+        Пример: {"area": ["1", "2"], "schedule": "remote", "key_skills": ["Python", "SQL"]}
+        """
+        where, params = compile_raw_filter(criteria)
+
+        def query():
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, "find_vacancies", f"""
+                        SELECT c.name, v.title, v.salary_avg, v.currency, v.url
+                        FROM vacancies v
+                        JOIN companies c ON v.company_id = c.company_id
+                        WHERE {where}
+                        ORDER BY v.salary_avg DESC NULLS LAST
+                        LIMIT %s
+                    """, (*params, limit))
+                    return cursor.fetchall()
+
+        try:
+            return self._cached(("find_vacancies", where, tuple(params), limit), query)
+        except Exception as e:
+            return self._read_failed("Ошибка при поиске вакансий по критериям", e, [])
 
 
 # Утилитарные функции
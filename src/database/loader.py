@@ -0,0 +1,85 @@
+from typing import Any, Dict, Iterable, Tuple
+
+try:
+    from database.db_manager import DBManager
+    from models.vacancy_record import VacancyRecord
+    from monitoring.profiling import profile_stage
+except ImportError:
+    from src.database.db_manager import DBManager
+    from src.models.vacancy_record import VacancyRecord
+    from src.monitoring.profiling import profile_stage
+
+
+def load_companies(db_manager: DBManager, companies: Iterable[Dict[str, Any]],
+                   checkpoint=None) -> Tuple[int, int]:
+    """
+    Потоковая загрузка компаний и их вакансий в базу данных.
+    Компании обрабатываются по мере поступления, поэтому в памяти
+    одновременно находятся вакансии только одной компании.
+    Записываются только новые и изменившиеся вакансии: хэш содержимого
+    сравнивается с сохраненным в БД.
+    :param checkpoint: CrawlCheckpoint; компания отмечается в нем после записи
+        (при ошибке записи — как невыполненная), при полном проходе контрольная точка удаляется
+    :return: (число полученных компаний, число записанных вакансий)
+    """
+    total_vacancies = 0
+    companies_count = 0
+    company_ids = db_manager.get_company_ids()
+
+    companies = iter(companies)
+    while True:
+        with profile_stage("fetch"):
+            company_data = next(companies, None)
+        if company_data is None:
+            break
+
+        companies_count += 1
+        try:
+            with profile_stage("db_load"):
+                added, updated, unchanged = load_company(db_manager, company_data, company_ids)
+            total_vacancies += added + updated
+            print(f"✅ {company_data['name']}: добавлено {added}, обновлено {updated}, без изменений {unchanged}")
+            if checkpoint is not None:
+                checkpoint.mark_done(company_data["id"], vacancies=added + updated + unchanged)
+
+        except Exception as e:
+            print(f"❌ Ошибка при добавлении {company_data['name']}: {e}")
+            if checkpoint is not None:
+                # Компания остается невыполненной: контрольная точка сохранится для --resume
+                checkpoint.mark_failed(company_data["id"], str(e))
+
+    if companies_count:
+        db_manager.purge_old_partitions()
+        db_manager.record_load()
+    if checkpoint is not None:
+        checkpoint.finish()
+    return companies_count, total_vacancies
+
+
+def load_company(db_manager: DBManager, company_data: Dict[str, Any],
+                 company_ids: Dict[int, int]) -> Tuple[int, int, int]:
+    """
+    Запись дельты одной компании: (добавлено, обновлено, без изменений) вакансий.
+    Строка компании переписывается, только если изменился ее хэш содержимого.
+    """
+    hh_id = int(company_data["id"])
+    known = hh_id in company_ids
+    company_id = db_manager.insert_company(company_data)
+    if company_id is None:
+        raise RuntimeError("не удалось сохранить компанию")
+    company_ids[hh_id] = company_id
+    stored = db_manager.get_vacancy_hashes(company_id) if known else {}
+
+    added = updated = unchanged = 0
+    for vacancy in company_data.get("vacancies", []):
+        record = VacancyRecord.from_api(vacancy) if isinstance(vacancy, dict) else vacancy
+        content_hash = record.content_hash()
+        if stored.get(record.hh_id) == content_hash:
+            unchanged += 1
+        elif db_manager.insert_vacancy(record, company_id, content_hash):
+            if record.hh_id in stored:
+                updated += 1
+            else:
+                added += 1
+    db_manager.flush_salary_sketches()
+    return added, updated, unchanged
@@ -0,0 +1,76 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+try:
+    from models.vacancy_record import REF_FIELDS, REF_LIST_FIELDS
+except ImportError:
+    from src.models.vacancy_record import REF_FIELDS, REF_LIST_FIELDS
+
+# Условия по обычным колонкам, которые можно сочетать с фильтрами по raw
+COLUMN_FILTERS = {
+    "salary_min": "v.salary_avg >= %s",
+    "salary_max": "v.salary_avg <= %s",
+}
+
+
+def _as_list(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _containment(document: Dict[str, Any]) -> Tuple[str, str]:
+    return "v.raw @> %s::jsonb", json.dumps(document, ensure_ascii=False)
+
+
+def compile_raw_filter(criteria: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Перевод критериев в условие WHERE из проверок вхождения raw @> … (их обслуживает
+    GIN-индекс jsonb_path_ops). Значения передаются параметрами, не подставляются в SQL.
+
+    Критерии:
+      area, schedule, employment, experience, employer — id или список id (любой из них);
+      work_format, professional_roles — id или список id (любой из них);
+      key_skills — навык или список навыков (все сразу);
+      currency — валюта зарплаты; has_test, accept_temporary, archived — флаги;
+      raw — произвольный JSON-документ для проверки вхождения;
+      salary_min, salary_max — по колонке salary_avg.
+    Пустой список значений — ошибка (ValueError), а не условие без вариантов.
+    :return: (условие, параметры)
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+
+    def add_any(documents: List[Dict[str, Any]]) -> None:
+        # Каждое слагаемое OR использует индекс (BitmapOr)
+        parts = []
+        for document in documents:
+            clause, param = _containment(document)
+            parts.append(clause)
+            params.append(param)
+        clauses.append(parts[0] if len(parts) == 1 else f"({' OR '.join(parts)})")
+
+    for name, value in criteria.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)) and not value:
+            raise ValueError(f"Пустой список значений критерия: {name}")
+        if name in REF_FIELDS:
+            add_any([{name: {"id": str(item)}} for item in _as_list(value)])
+        elif name in REF_LIST_FIELDS:
+            add_any([{name: [{"id": str(item)}]} for item in _as_list(value)])
+        elif name == "key_skills":
+            add_any([{"key_skills": [str(item) for item in _as_list(value)]}])
+        elif name == "currency":
+            add_any([{"salary": {"currency": value}}])
+        elif name in ("has_test", "accept_temporary", "archived"):
+            add_any([{name: bool(value)}])
+        elif name == "raw":
+            if not isinstance(value, dict):
+                raise ValueError("raw должен быть JSON-объектом")
+            add_any([value])
+        elif name in COLUMN_FILTERS:
+            clauses.append(COLUMN_FILTERS[name])
+            params.append(int(value))
+        else:
+            raise ValueError(f"Неизвестный критерий: {name}")
+
+    return " AND ".join(clauses) or "TRUE", params
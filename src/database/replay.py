@@ -0,0 +1,79 @@
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from api.archive import PayloadArchive
+    from api.company_api import HHCompanyAPI
+    from api.details import VacancyDetailsFetcher
+    from database.db_manager import DBManager
+    from database.loader import load_company
+    from models.vacancy import Vacancy
+    from models.vacancy_record import VacancyRecord
+    from storage.json_saver import JSONSaver
+except ImportError:
+    from src.api.archive import PayloadArchive
+    from src.api.company_api import HHCompanyAPI
+    from src.api.details import VacancyDetailsFetcher
+    from src.database.db_manager import DBManager
+    from src.database.loader import load_company
+    from src.models.vacancy import Vacancy
+    from src.models.vacancy_record import VacancyRecord
+    from src.storage.json_saver import JSONSaver
+
+EMPLOYER_ENDPOINT = "/employers/{id}"
+VACANCIES_ENDPOINT = "/vacancies"
+DETAILS_ENDPOINT = "/vacancies/{id}"
+
+
+def replay_to_db(db_manager: DBManager, archive: PayloadArchive,
+                 since: Optional[date] = None) -> Tuple[int, int]:
+    """
+    Восстановление companies/vacancies из архива без обращений к API.
+    Для каждой вакансии берется последняя по времени версия; архивные карточки
+    /vacancies/{id} (HH_ENRICH_DETAILS) добавляют к ней описание и key_skills.
+    :return: (число компаний, число записанных вакансий)
+    """
+    companies: Dict[int, dict] = {}
+    vacancies: Dict[int, Dict[Any, VacancyRecord]] = {}
+    details: Dict[int, Dict[str, Any]] = {}
+
+    for record in archive.iter_records(since=since):
+        body = record["body"]
+        if record["endpoint"] == EMPLOYER_ENDPOINT:
+            info = HHCompanyAPI.company_info_from_api(body)
+            companies[int(info["id"])] = info
+        elif record["endpoint"] == VACANCIES_ENDPOINT and "employer_id" in record["params"]:
+            employer_vacancies = vacancies.setdefault(int(record["params"]["employer_id"]), {})
+            for item in body.get("items", []):
+                vacancy = VacancyRecord.from_api(item)
+                employer_vacancies[vacancy.hh_id or vacancy.alternate_url] = vacancy
+        elif record["endpoint"] == DETAILS_ENDPOINT and body.get("id"):
+            details[int(body["id"])] = VacancyDetailsFetcher.details_from_api(body)
+
+    company_ids = db_manager.get_company_ids()
+    total = 0
+    for hh_id, info in companies.items():
+        info["vacancies"] = list(vacancies.pop(hh_id, {}).values())
+        for vacancy in info["vacancies"]:
+            if vacancy.hh_id in details:
+                VacancyDetailsFetcher.apply_details(vacancy, details[vacancy.hh_id])
+        added, updated, _ = load_company(db_manager, info, company_ids)
+        total += added + updated
+    if companies:
+        db_manager.record_load()
+    return len(companies), total
+
+
+def replay_to_json(json_saver: JSONSaver, archive: PayloadArchive, since: Optional[date] = None) -> int:
+    """
+    Заполнение JSON-хранилища вакансиями из архивных страниц /vacancies.
+    Уникальные вакансии собираются в памяти, файл записывается один раз.
+    :return: число уникальных вакансий
+    """
+    latest: Dict[Any, Vacancy] = {}
+    for record in archive.iter_records(VACANCIES_ENDPOINT, since=since):
+        for vacancy in Vacancy.cast_to_object_list(record["body"].get("items", [])):
+            latest[vacancy.key] = vacancy
+
+    json_saver.add_vacancies(latest.values())
+    return len(latest)
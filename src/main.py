@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
@@ -5,60 +6,44 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from api.hh_api import HeadHunterAPI
-from api.company_api import fetch_companies_data
+from api.company_api import iter_companies_data
+from api.search_query import SearchQuery
 from models.vacancy import Vacancy
 from storage.json_saver import JSONSaver
-from database.db_manager import DBManager, DBConfig, setup_database
+from storage.seen_set import SeenSet
+from storage.checkpoint import FILL_CHECKPOINT, CrawlCheckpoint
+from database.db_manager import DBManager, DBConfig, SCHEMA_VERSION, setup_database
+from database.loader import load_companies
+from monitoring.metrics import metrics
+from monitoring.profiling import profile_stage, profiling
 
 load_dotenv()
+metrics.configure_from_env()
 
 
-def setup_and_fill_database():
-    """Настройка и заполнение базы данных"""
-    print("🔄 Настройка базы данных...")
-
-    # Настройка БД
+def setup_and_fill_database(setup: bool = True):
+    """Настройка (если setup) и заполнение базы данных"""
     config = DBConfig.from_env()
     db_manager = DBManager(config)
 
-    if not setup_database():
-        print("❌ Ошибка настройки базы данных")
-        return False
+    if setup:
+        print("🔄 Настройка базы данных...")
+        if not setup_database():
+            print("❌ Ошибка настройки базы данных")
+            return False
 
-    # Получение данных компаний
-    print("📡 Получение данных с HH API...")
-    companies_data = fetch_companies_data()
+    # Получение данных компаний и заполнение базы по мере поступления;
+    # прерванное заполнение продолжается с контрольной точки
+    print("📡 Получение данных с HH API и заполнение базы данных...")
+    checkpoint = CrawlCheckpoint(FILL_CHECKPOINT, "companies")
+    resumed = checkpoint.start(resume=True)
+    companies_count, total_vacancies = load_companies(db_manager, iter_companies_data(checkpoint), checkpoint)
 
-    if not companies_data:
+    if not companies_count and not resumed:
         print("❌ Не удалось получить данные компаний")
         return False
 
-    print(f"✅ Получено данных о {len(companies_data)} компаниях")
-
-    # Заполнение базы данных
-    print("💾 Заполнение базы данных...")
-    total_vacancies = 0
-
-    for company_data in companies_data:
-        try:
-            # Добавляем компанию
-            company_id = db_manager.insert_company(company_data)
-
-            if company_id:
-                # Добавляем вакансии компании
-                vacancies_added = 0
-                for vacancy in company_data.get("vacancies", []):
-                    if db_manager.insert_vacancy(vacancy, company_id):
-                        vacancies_added += 1
-
-                total_vacancies += vacancies_added
-                print(f"✅ {company_data['name']}: добавлено {vacancies_added} вакансий")
-            else:
-                print(f"⚠️  {company_data['name']}: компания уже существует")
-
-        except Exception as e:
-            print(f"❌ Ошибка при добавлении {company_data['name']}: {e}")
-
+    print(f"✅ Получено данных о {companies_count} компаниях")
     print(f"🎉 База данных заполнена! Всего вакансий: {total_vacancies}")
     return True
 
@@ -84,13 +69,17 @@ def db_manager_interface():
         choice = input("Выберите опцию (0-6): ").strip()
 
         if choice == "1":
-            show_companies_and_vacancies_count(db_manager)
+            with profile_stage("query"):
+                show_companies_and_vacancies_count(db_manager)
         elif choice == "2":
-            show_all_vacancies(db_manager)
+            with profile_stage("query"):
+                show_all_vacancies(db_manager)
         elif choice == "3":
-            show_avg_salary(db_manager)
+            with profile_stage("query"):
+                show_avg_salary(db_manager)
         elif choice == "4":
-            show_vacancies_with_higher_salary(db_manager)
+            with profile_stage("query"):
+                show_vacancies_with_higher_salary(db_manager)
         elif choice == "5":
             search_vacancies_by_keyword(db_manager)
         elif choice == "6":
@@ -182,7 +171,8 @@ def search_vacancies_by_keyword(db_manager: DBManager):
         print("❌ Необходимо ввести ключевое слово")
         return
 
-    data = db_manager.get_vacancies_with_keyword(keyword)
+    with profile_stage("query"):
+        data = db_manager.get_vacancies_with_keyword(keyword)
     if not data:
         print(f"❌ Вакансии с ключевым словом '{keyword}' не найдены")
         return
@@ -211,24 +201,27 @@ def user_interaction():
     config = DBConfig.from_env()
     db_manager = DBManager(config)
 
-    # Проверяем, есть ли данные в БД
+    # Решение принимается по строке schema_meta: одна выборка по ключу вместо COUNT(*)
     try:
-        with db_manager.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) FROM vacancies")
-                vacancy_count = cursor.fetchone()[0]
-
-                if vacancy_count == 0:
-                    print("🔄 База данных пустая, начинаем заполнение...")
-                    if not setup_and_fill_database():
-                        return
-                else:
-                    print(f"✅ База данных уже содержит {vacancy_count} вакансий")
-
+        state = db_manager.get_startup_state()
     except Exception as e:
-        print(f"❌ Ошибка проверки базы данных: {e}")
-        if not setup_and_fill_database():
+        print(f"❌ Ошибка при проверке базы данных: {e}")
+        state = None
+
+    if state is None or state["schema_version"] < SCHEMA_VERSION:
+        print("🔄 Схема базы данных отсутствует или устарела, создаем...")
+        if not setup_database():
+            print("❌ Не удалось создать базу данных")
             return
+        state = db_manager.get_startup_state() or {"vacancies_count": 0}
+
+    if state["vacancies_count"] == 0 or CrawlCheckpoint.pending(FILL_CHECKPOINT):
+        print("🔄 База данных пустая или заполнена не до конца, заполняем данными...")
+        if not setup_and_fill_database(setup=False):
+            print("❌ Не удалось заполнить базу данных")
+            return
+    else:
+        print(f"✅ База данных уже содержит {state['vacancies_count']} вакансий")
 
     while True:
         print("\n" + "=" * 50)
@@ -256,22 +249,12 @@ def search_vacancies_via_api():
     """Поиск вакансий через API (оригинальная функциональность)"""
     hh_api = HeadHunterAPI()
     json_saver = JSONSaver()
+    seen = SeenSet.for_storage(json_saver.file_path)
 
     try:
-        # Ввод поискового запроса
+        # Ввод поискового запроса и фильтров
         search_query = input("Введите поисковый запрос: ").strip()
-        print("\nИдет поиск вакансий...")
 
-        # Получение вакансий
-        vacancies_json = hh_api.get_vacancies(search_query)
-        vacancies = Vacancy.cast_to_object_list(vacancies_json)
-
-        # Сохранение
-        for vacancy in vacancies:
-            json_saver.add_vacancy(vacancy)
-        print(f"Найдено и сохранено {len(vacancies)} вакансий")
-
-        # Фильтрация
         print("\nПараметры поиска:")
         filter_words = (
             input("Введите ключевые слова для фильтрации (через пробел): ")
@@ -291,12 +274,29 @@ def search_vacancies_via_api():
 
         print(f"- Диапазон зарплат: {salary_min}-{salary_max}\n")
 
-        filtered_vacancies = json_saver.get_vacancies(
-            {
-                "description": " ".join(filter_words),
-                "salary": {"min": salary_min, "max": salary_max},
-            }
-        )
+        # Фильтры, которые умеет HH, передаются в запрос: лишние страницы не загружаются
+        query = SearchQuery(search_query, filter_words, salary_min, salary_max, only_with_salary=True)
+        api_params = query.to_api_params()
+        print("Идет поиск вакансий...")
+
+        # Получение вакансий
+        with profile_stage("fetch"):
+            vacancies_json = hh_api.get_vacancies(api_params.pop("text"), api_params)
+        # Уже сохраненные и не изменившиеся вакансии отбрасываются до разбора
+        new_json = seen.filter_new(vacancies_json)
+        with profile_stage("cast"):
+            vacancies = Vacancy.cast_to_object_list(new_json)
+
+        # Сохранение
+        with profile_stage("save"):
+            saved = json_saver.add_vacancies(vacancies, update=True)
+            seen.mark_saved(new_json, saved)
+            seen.save()
+        print(f"Найдено {len(vacancies_json)} вакансий, новых или изменившихся сохранено: {len(saved)}")
+
+        # Локально проверяются только критерии, которые API не гарантирует
+        with profile_stage("query"):
+            filtered_vacancies = json_saver.get_vacancies(query.residual_criteria())
 
         # Сортировка и вывод
         sorted_vacancies = sorted(filtered_vacancies, reverse=True)
@@ -320,5 +320,23 @@ def search_vacancies_via_api():
         print("\nПоиск завершен")
 
 
+def parse_args(argv=None):
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Программа для поиска вакансий на HeadHunter")
+    parser.add_argument("--profile", metavar="DIR", help="Профилировать этапы и сохранить отчет в DIR")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Дополнительно отслеживать память через tracemalloc")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    user_interaction()
+    args = parse_args()
+    try:
+        if args.profile:
+            with profiling(args.profile, memory=args.profile_memory):
+                user_interaction()
+            print(f"📊 Отчет профилирования сохранен в {args.profile}")
+        else:
+            user_interaction()
+    finally:
+        metrics.export_from_env()
@@ -1,17 +1,37 @@
+import re
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Optional
 
+try:
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.monitoring.metrics import metrics
 
-@dataclass
+_URL_ID = re.compile(r"/vacancy/(\d+)")
+
+
+def parse_hh_id(raw_id: Any, url: Optional[str] = None) -> Optional[int]:
+    """Числовой id вакансии HH: из поля id или, если его нет, из ссылки вида .../vacancy/<id>"""
+    if raw_id is not None and str(raw_id).isdigit():
+        return int(raw_id)
+    match = _URL_ID.search(url or "")
+    return int(match.group(1)) if match else None
+
+
+@dataclass(slots=True)
 class Vacancy:
     """Класс для представления вакансии"""
 
-    __slots__ = ("title", "url", "salary", "description")
-
     title: str  # Название вакансии
     url: str  # Ссылка на вакансию
     salary: Optional[int]  # Зарплата (может быть None)
     description: str  # Описание вакансии
+    hh_id: Optional[int] = None  # ID вакансии на HH — ключ дедупликации
+
+    @property
+    def key(self):
+        """Ключ идентичности: HH id, для вакансий без него — ссылка"""
+        return self.hh_id if self.hh_id is not None else self.url
 
     def __post_init__(self):
         """Валидация данных при создании вакансии"""
@@ -19,6 +39,8 @@ class Vacancy:
             raise ValueError("Название вакансии обязательно")
         if not isinstance(self.url, str) or not self.url.startswith("http"):
             raise ValueError("URL должен быть валидной ссылкой")
+        if self.hh_id is not None and (not isinstance(self.hh_id, int) or self.hh_id < 0):
+            raise ValueError("ID вакансии должен быть неотрицательным целым числом")
         self.__validate_salary()
 
     def __validate_salary(self):
@@ -52,6 +74,7 @@ class Vacancy:
         return self.salary > other.salary
 
     @classmethod
+    @metrics.timed("hh_parse_seconds", model="vacancy")
     def cast_to_object_list(cls, vacancies: list[dict]) -> list["Vacancy"]:
         """
         Преобразование списка словарей в список объектов Vacancy
@@ -69,8 +92,10 @@ class Vacancy:
                     description=cls.clean_html(
                         vacancy.get("snippet", {}).get("requirement", "")
                     ),
+                    hh_id=parse_hh_id(vacancy.get("id"), vacancy.get("alternate_url")),
                 )
             )
+        metrics.inc("hh_items_parsed_total", len(result), model="vacancy")
         return result
 
     @staticmethod
@@ -0,0 +1,102 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+try:
+    from models.vacancy import parse_hh_id
+except ImportError:
+    from src.models.vacancy import parse_hh_id
+
+# Справочные поля выдачи, по которым фильтруют чаще всего; хранятся только их id
+REF_FIELDS = ("area", "schedule", "employment", "experience", "employer")
+REF_LIST_FIELDS = ("work_format", "professional_roles")
+
+
+def project_raw(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Компактная проекция элемента выдачи HH: id справочников, навыки, валюта и флаги"""
+    raw: Dict[str, Any] = {}
+    for name in REF_FIELDS:
+        value = item.get(name)
+        if isinstance(value, dict) and value.get("id") is not None:
+            raw[name] = {"id": str(value["id"])}
+    for name in REF_LIST_FIELDS:
+        values = [{"id": str(value["id"])} for value in item.get(name) or []
+                  if isinstance(value, dict) and "id" in value]
+        if values:
+            raw[name] = values
+    if item.get("key_skills"):
+        raw["key_skills"] = [skill["name"] for skill in item["key_skills"]]
+    salary = item.get("salary") or {}
+    if salary.get("currency"):
+        raw["salary"] = {"currency": salary["currency"], "gross": salary.get("gross")}
+    for flag in ("has_test", "accept_temporary", "archived"):
+        if item.get(flag) is not None:
+            raw[flag] = item[flag]
+    return raw
+
+
+@dataclass
+class VacancyRecord:
+    """Компактная запись вакансии: только поля, которые использует схема БД"""
+
+    __slots__ = (
+        "hh_id",
+        "name",
+        "alternate_url",
+        "salary_from",
+        "salary_to",
+        "currency",
+        "description",
+        "experience",
+        "employment",
+        "published_at",
+        "key_skills",
+        "raw",
+    )
+
+    hh_id: Optional[int]  # ID вакансии на HH
+    name: str  # Название вакансии
+    alternate_url: str  # Ссылка на вакансию
+    salary_from: Optional[int]  # Зарплата от
+    salary_to: Optional[int]  # Зарплата до
+    currency: Optional[str]  # Валюта
+    description: str  # Описание вакансии
+    experience: Optional[str]  # Требуемый опыт
+    employment: Optional[str]  # Тип занятости
+    published_at: Optional[str]  # Дата публикации (ISO 8601)
+    key_skills: Optional[List[str]]  # Ключевые навыки (только из полной карточки)
+    raw: Dict[str, Any]  # Проекция элемента выдачи для произвольных фильтров (см. project_raw)
+
+    @classmethod
+    def from_api(cls, item: Dict[str, Any]) -> "VacancyRecord":
+        """Проекция элемента ответа API в компактную запись"""
+        salary = item.get("salary") or {}
+        return cls(
+            hh_id=parse_hh_id(item.get("id"), item.get("alternate_url")),
+            name=item.get("name"),
+            alternate_url=item.get("alternate_url"),
+            salary_from=salary.get("from"),
+            salary_to=salary.get("to"),
+            currency=salary.get("currency"),
+            description=item.get("description", ""),
+            experience=(item.get("experience") or {}).get("name"),
+            employment=(item.get("employment") or {}).get("name"),
+            published_at=item.get("published_at"),
+            key_skills=[skill["name"] for skill in item["key_skills"]] if item.get("key_skills") else None,
+            raw=project_raw(item),
+        )
+
+    def raw_payload(self) -> Dict[str, Any]:
+        """Значение колонки raw: проекция выдачи и навыки (в том числе из полной карточки)"""
+        if self.key_skills:
+            return {**self.raw, "key_skills": self.key_skills}
+        return self.raw
+
+    def content_hash(self) -> str:
+        """Хэш нормализованных изменяемых полей: по нему определяется, изменилась ли вакансия"""
+        fields = (self.name, self.salary_from, self.salary_to, self.currency,
+                  self.description, self.experience, self.employment)
+        if self.key_skills:
+            fields += (",".join(self.key_skills),)
+        normalized = "\x1f".join("" if value is None else str(value).strip() for value in fields)
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
@@ -0,0 +1,183 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Границы гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    """Гистограмма с фиксированными границами"""
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Реестр счетчиков и гистограмм задержек.
+
+    В выключенном состоянии все методы возвращаются сразу, поэтому вызовы
+    можно оставлять в горячих путях.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Увеличение счетчика"""
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Добавление наблюдения в гистограмму"""
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def set_buckets(self, name: str, buckets: Tuple[float, ...]) -> None:
+        """Собственные границы для гистограммы name"""
+        self._buckets[name] = tuple(sorted(buckets))
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any):
+        """Замер длительности блока в гистограмму name"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels: Any):
+        """Декоратор: замер длительности каждого вызова функции в гистограмму name"""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+
+            return wrapper
+
+        return decorator
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Снимок всех метрик в виде словаря"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": h.count,
+                        "sum": h.total,
+                        "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.counts)),
+                    }
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """Экспорт в текстовом формате Prometheus"""
+
+        def fmt(labels: Dict[str, str]) -> str:
+            if not labels:
+                return ""
+            escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+            return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{fmt(row['labels'])} {row['value']}" for row in series)
+        for name, series in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for row in series:
+                cumulative = 0
+                for bound, count in row["buckets"].items():
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt({**row['labels'], 'le': bound})} {cumulative}")
+                lines.append(f"{name}_sum{fmt(row['labels'])} {row['sum']}")
+                lines.append(f"{name}_count{fmt(row['labels'])} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Запись метрик в файл: .json — снимок, иначе формат Prometheus"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".json":
+            path.write_text(json.dumps(self.snapshot(), ensure_ascii=False, indent=2), encoding="utf-8")
+        else:
+            path.write_text(self.to_prometheus(), encoding="utf-8")
+
+    def configure_from_env(self) -> None:
+        """Включение реестра, если задана HH_METRICS или HH_METRICS_FILE"""
+        self.enabled = bool(os.getenv("HH_METRICS") or os.getenv("HH_METRICS_FILE"))
+
+    def export_from_env(self) -> Optional[str]:
+        """Запись метрик в файл из HH_METRICS_FILE, если он задан"""
+        path = os.getenv("HH_METRICS_FILE")
+        if self.enabled and path:
+            self.write(path)
+            print(f"📈 Метрики сохранены в {path}")
+        return path
+
+
+# Общий реестр процесса: включается переменной HH_METRICS=1 или HH_METRICS_FILE
+metrics = MetricsRegistry()
+metrics.configure_from_env()
@@ -0,0 +1,147 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+@dataclass
+class StageStats:
+    """Накопленная статистика одного этапа"""
+    name: str
+    calls: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_memory: int = 0
+    profile: Optional[pstats.Stats] = None
+    top_allocations: List[str] = field(default_factory=list)
+
+
+class StageProfiler:
+    """
+    Профилировщик именованных этапов (fetch, cast, save, db_load, query).
+
+    Для каждого этапа собираются cProfile, время wall/CPU и, при memory=True,
+    пик памяти и крупнейшие места выделения по tracemalloc. Повторные входы в
+    этап суммируются. Вложенные этапы учитывают только время: cProfile не
+    допускает одновременно двух активных профилировщиков.
+    """
+
+    def __init__(self, output_dir: str = "profile", memory: bool = False, top: int = 30):
+        self.output_dir = Path(output_dir)
+        self.memory = memory
+        self.top = top
+        self.stages: Dict[str, StageStats] = {}
+        self._active: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Профилирование блока кода как этапа name"""
+        stats = self.stages.setdefault(name, StageStats(name))
+        nested = self._active is not None
+        profile = None if nested else cProfile.Profile()
+        if not nested:
+            self._active = name
+            if self.memory and tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield stats
+        finally:
+            if profile:
+                profile.disable()
+            stats.calls += 1
+            stats.wall_time += time.perf_counter() - wall_start
+            stats.cpu_time += time.process_time() - cpu_start
+
+            if not nested:
+                self._active = None
+                if profile:
+                    if stats.profile is None:
+                        stats.profile = pstats.Stats(profile)
+                    else:
+                        stats.profile.add(profile)
+                if self.memory and tracemalloc.is_tracing():
+                    stats.peak_memory = max(stats.peak_memory, tracemalloc.get_traced_memory()[1])
+                    snapshot = tracemalloc.take_snapshot()
+                    stats.top_allocations = [str(line) for line in snapshot.statistics("lineno")[:10]]
+
+    def start(self) -> None:
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self) -> None:
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def summary(self) -> List[dict]:
+        return [
+            {
+                "stage": s.name,
+                "calls": s.calls,
+                "wall_time_s": round(s.wall_time, 6),
+                "cpu_time_s": round(s.cpu_time, 6),
+                "peak_memory_bytes": s.peak_memory if self.memory else None,
+            }
+            for s in self.stages.values()
+        ]
+
+    def write_report(self) -> Path:
+        """Запись отчетов по этапам в output_dir"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        lines = [f"{'Этап':<12} {'вызовов':>8} {'wall, с':>10} {'CPU, с':>10} {'пик, МБ':>10}"]
+
+        for stats in self.stages.values():
+            peak = f"{stats.peak_memory / 1024 / 1024:10.2f}" if self.memory else f"{'-':>10}"
+            lines.append(f"{stats.name:<12} {stats.calls:8d} {stats.wall_time:10.3f} {stats.cpu_time:10.3f} {peak}")
+
+            report = [f"Этап: {stats.name}", f"Wall: {stats.wall_time:.3f} с, CPU: {stats.cpu_time:.3f} с", ""]
+            if stats.profile is not None:
+                stats.profile.dump_stats(str(self.output_dir / f"{stats.name}.prof"))
+                buffer = io.StringIO()
+                stats.profile.stream = buffer
+                stats.profile.sort_stats("cumulative").print_stats(self.top)
+                report.append(buffer.getvalue())
+            if stats.top_allocations:
+                report.append("Крупнейшие выделения памяти:")
+                report.extend(stats.top_allocations)
+            (self.output_dir / f"{stats.name}.txt").write_text("\n".join(report), encoding="utf-8")
+
+        (self.output_dir / "summary.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        (self.output_dir / "summary.json").write_text(
+            json.dumps(self.summary(), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return self.output_dir
+
+
+_current: Optional[StageProfiler] = None
+
+
+@contextmanager
+def profiling(output_dir: str = "profile", memory: bool = False, top: int = 30):
+    """Включение профилирования этапов для блока кода с записью отчета в конце"""
+    global _current
+    profiler = StageProfiler(output_dir, memory, top)
+    previous, _current = _current, profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _current = previous
+        profiler.write_report()
+
+
+def profile_stage(name: str):
+    """Этап для активного профилировщика; без профилирования — пустой контекст"""
+    if _current is None:
+        return nullcontext()
+    return _current.stage(name)
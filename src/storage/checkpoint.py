@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+FILL_CHECKPOINT = "data/checkpoints/fill.json"
+
+
+class CrawlCheckpoint:
+    """
+    Контрольная точка долгого обхода: план и уже сохраненные единицы работы
+    (работодатели, ключевые слова).
+
+    Файл перезаписывается атомарно (tmp + os.replace) после каждой единицы,
+    результаты которой уже записаны в хранилище, поэтому после сбоя повторно
+    выполняется только незавершенная единица. Единицы, которые не удалось
+    выполнить из-за ошибки (mark_failed), остаются невыполненными: finish() в этом
+    случае сохраняет файл, и продолжение повторит их. Полностью законченный
+    обход удаляет файл.
+    """
+
+    def __init__(self, path: str, crawl: str, max_age: float = 24 * 3600):
+        self.path = Path(path)
+        self.crawl = crawl  # Идентификатор обхода: чужой файл не подхватывается
+        self.max_age = max_age
+        self.plan: Optional[List[Dict[str, Any]]] = None
+        self.done: Dict[str, Dict[str, Any]] = {}
+        self.failed: Dict[str, str] = {}  # Ошибки текущего запуска
+        self.started = time.time()
+
+    @staticmethod
+    def pending(path: str) -> bool:
+        """Есть ли незавершенный обход"""
+        return Path(path).exists()
+
+    def start(self, resume: bool = True) -> bool:
+        """
+        Начало обхода.
+        :param resume: Продолжить с контрольной точки, если она подходит
+        :return: True, если обход продолжен
+        """
+        state = self._read() if resume else None
+        if state and state.get("crawl") == self.crawl and time.time() - state.get("updated", 0) <= self.max_age:
+            self.plan = state.get("plan")
+            self.done = state.get("done", {})
+            self.started = state.get("started", self.started)
+            print(f"♻️ Продолжение обхода с контрольной точки: выполнено {len(self.done)}")
+            return True
+        self.plan, self.done, self.started = None, {}, time.time()
+        self.save()
+        return False
+
+    def set_plan(self, plan: List[Dict[str, Any]]) -> None:
+        self.plan = plan
+        self.save()
+
+    def is_done(self, key: Any) -> bool:
+        return str(key) in self.done
+
+    def mark_done(self, key: Any, **progress: Any) -> None:
+        """Отметка единицы работы, результаты которой уже сохранены"""
+        self.done[str(key)] = {"ts": time.time(), **progress}
+        self.save()
+
+    def mark_failed(self, key: Any, error: str) -> None:
+        """Отметка единицы, которую не удалось выполнить: при продолжении она повторится"""
+        self.failed[str(key)] = error
+        self.save()
+
+    def finish(self) -> bool:
+        """
+        Конец прохода: контрольная точка удаляется, если ошибок не было.
+        :return: True, если обход завершен полностью
+        """
+        if self.failed:
+            self.save()
+            print(f"⚠️ Не выполнено {len(self.failed)}, для повтора запустите обход с продолжением")
+            return False
+        self.path.unlink(missing_ok=True)
+        return True
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "crawl": self.crawl,
+                "started": self.started,
+                "updated": time.time(),
+                "plan": self.plan,
+                "done": self.done,
+                "failed": self.failed,
+            }, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
@@ -1,12 +1,14 @@
 import json
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 try:
-    from models.vacancy import Vacancy
+    from models.vacancy import Vacancy, parse_hh_id
+    from monitoring.metrics import metrics
 except ImportError:
-    from src.models.vacancy import Vacancy
+    from src.models.vacancy import Vacancy, parse_hh_id
+    from src.monitoring.metrics import metrics
 
 
 class Storage(ABC):
@@ -34,6 +36,14 @@ class JSONSaver(Storage):
     def __init__(self, file_name: str = "vacancies.json"):
         self.__file_path = Path("data") / file_name
         self.__file_path.parent.mkdir(exist_ok=True)
+        # Записи файла и индекс ключей между вызовами; сбрасываются при изменении файла извне
+        self.__records: Optional[List[Any]] = None
+        self.__keys: Dict[Any, int] = {}
+        self.__stamp: Optional[Tuple[int, int]] = None
+
+    @property
+    def file_path(self) -> Path:
+        return self.__file_path
 
     def __read_file(self) -> List[dict]:
         """Приватный метод для чтения файла"""
@@ -57,35 +67,108 @@ class JSONSaver(Storage):
                 json.dump(data, file, ensure_ascii=False, indent=2)
         except (IOError, PermissionError) as e:
             print(f"Ошибка записи в файл: {e}")
+            self.__records = None
             raise
+        self.__stamp = self.__file_stamp()
 
+    def __file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.__file_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def __load(self) -> List[Any]:
+        """Записи файла из памяти; файл читается заново, только если он изменился"""
+        stamp = self.__file_stamp()
+        if self.__records is None or stamp != self.__stamp:
+            records = self.__read_file()
+            self.__records = records if isinstance(records, list) else []
+            self.__keys = self.__index(self.__records)
+            self.__stamp = stamp
+        return self.__records
+
+    @staticmethod
+    def __record_key(data: Dict[str, Any]):
+        """Ключ записи файла: HH id (для старых записей — из ссылки), иначе ссылка"""
+        hh_id = parse_hh_id(data.get("id"), data.get("url"))
+        return hh_id if hh_id is not None else data.get("url")
+
+    def __index(self, vacancies: List[Any]) -> Dict[Any, int]:
+        """Индекс записей файла: ключ → позиция первой записи"""
+        index = {}
+        for i, v in enumerate(vacancies):
+            if isinstance(v, dict):
+                index.setdefault(self.__record_key(v), i)
+        return index
+
+    @staticmethod
+    def __vacancy_key(vacancy: Vacancy):
+        hh_id = vacancy.hh_id if vacancy.hh_id is not None else parse_hh_id(None, vacancy.url)
+        return hh_id if hh_id is not None else vacancy.url
+
+    @staticmethod
+    def __to_record(vacancy: Vacancy, key) -> Dict[str, Any]:
+        return {
+            "id": key if isinstance(key, int) else None,
+            "title": vacancy.title,
+            "url": vacancy.url,
+            "salary": vacancy.salary,
+            "description": vacancy.description,
+        }
+
+    @metrics.timed("hh_storage_operation_seconds", backend="json", op="add")
     def add_vacancy(self, vacancy: Vacancy) -> None:
         """Добавление вакансии в JSON-файл"""
         try:
-            vacancies = self.__read_file()
-            if not isinstance(vacancies, list):
-                vacancies = []
-
-            # Проверка на дубликаты
-            if not any(
-                isinstance(v, dict) and v.get("url") == vacancy.url for v in vacancies
-            ):
-                vacancies.append(
-                    {
-                        "title": vacancy.title,
-                        "url": vacancy.url,
-                        "salary": vacancy.salary,
-                        "description": vacancy.description,
-                    }
-                )
+            vacancies = self.__load()
+
+            # Проверка на дубликаты по числовому ключу
+            key = self.__vacancy_key(vacancy)
+            if key not in self.__keys:
+                self.__keys[key] = len(vacancies)
+                vacancies.append(self.__to_record(vacancy, key))
                 self.__write_file(vacancies)
+                metrics.inc("hh_storage_rows_written_total", backend="json", op="add")
         except Exception as e:
             print(f"Ошибка при добавлении вакансии: {e}")
             raise
 
+    @metrics.timed("hh_storage_operation_seconds", backend="json", op="add_many")
+    def add_vacancies(self, vacancies: Iterable[Vacancy], update: bool = False) -> List[Vacancy]:
+        """
+        Добавление нескольких вакансий с одним чтением и одной записью файла
+        :param update: Заменять сохраненные записи, содержимое которых изменилось
+        :return: записанные вакансии (добавленные и обновленные)
+        """
+        data = self.__load()
+        index = self.__keys
+        written = []
+        updated = 0
+        for vacancy in vacancies:
+            key = self.__vacancy_key(vacancy)
+            record = self.__to_record(vacancy, key)
+            position = index.get(key)
+            if position is None:
+                index[key] = len(data)
+                data.append(record)
+            elif update and data[position] != record:
+                data[position] = record
+                updated += 1
+            else:
+                continue
+            written.append(vacancy)
+        if written:
+            self.__write_file(data)
+            metrics.inc("hh_storage_rows_written_total", len(written) - updated, backend="json", op="add")
+            if updated:
+                metrics.inc("hh_storage_rows_written_total", updated, backend="json", op="update")
+        return written
+
+    @metrics.timed("hh_storage_operation_seconds", backend="json", op="get")
     def get_vacancies(self, criteria: dict) -> List[Vacancy]:
         """Получение вакансий по критериям"""
-        vacancies = self.__read_file()
+        vacancies = self.__load()
         result = []
 
         for vacancy_data in vacancies:
@@ -122,6 +205,7 @@ class JSONSaver(Storage):
                             url=str(vacancy_data.get("url", "")),
                             salary=salary,
                             description=str(vacancy_data.get("description", "")),
+                            hh_id=parse_hh_id(vacancy_data.get("id"), vacancy_data.get("url")),
                         )
                     )
 
@@ -131,8 +215,14 @@ class JSONSaver(Storage):
 
         return result
 
+    @metrics.timed("hh_storage_operation_seconds", backend="json", op="delete")
     def delete_vacancy(self, vacancy: Vacancy) -> None:
         """Удаление вакансии из JSON-файла"""
-        vacancies = self.__read_file()
-        vacancies = [v for v in vacancies if v["url"] != vacancy.url]
+        key = self.__vacancy_key(vacancy)
+        vacancies = self.__load()
+        if key not in self.__keys:
+            return
+        # Удаляются все записи с этим ключом, включая дубликаты старых файлов
+        vacancies[:] = [v for v in vacancies if not (isinstance(v, dict) and self.__record_key(v) == key)]
+        self.__keys = self.__index(vacancies)
         self.__write_file(vacancies)
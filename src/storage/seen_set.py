@@ -0,0 +1,170 @@
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from monitoring.metrics import metrics
+except ImportError:
+    from src.monitoring.metrics import metrics
+
+# Заголовок: сигнатура, число записей, размер и mtime_ns хранилища на момент save()
+_HEADER = struct.Struct("<4sQqq")
+_MAGIC = b"HHS2"
+
+
+class SeenSet:
+    """
+    Постоянное множество уже обработанных вакансий: HH id → отпечаток содержимого.
+
+    На диске и в памяти хранится как два отсортированных массива (id — 8 байт,
+    отпечаток — 4 байта), поиск — бинарный. Новые записи копятся в небольшом
+    словаре и вливаются в массивы при save(). Вакансия считается известной,
+    только если совпали и id, и отпечаток, поэтому изменившиеся проходят дальше.
+
+    Множество описывает содержимое одного хранилища (см. for_storage): при save()
+    запоминаются размер и время изменения его файла, и если при следующем запуске
+    файл удален, заменен или изменен кем-то еще, множество начинается заново.
+    """
+
+    def __init__(self, path: str = "data/seen_vacancies.bin", storage: Optional[str] = None):
+        self.path = Path(path)
+        self.storage = Path(storage) if storage is not None else None
+        self._ids = array("Q")
+        self._fingerprints = array("I")
+        self._delta: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def for_storage(cls, storage_path: str) -> "SeenSet":
+        """Множество, привязанное к файлу хранилища: <файл>.seen рядом с ним"""
+        return cls(f"{storage_path}.seen", storage=storage_path)
+
+    def _storage_stamp(self) -> tuple:
+        if self.storage is None:
+            return 0, 0
+        try:
+            stat = self.storage.stat()
+        except OSError:
+            return -1, -1  # Хранилища нет: ни одна вакансия не считается сохраненной
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def fingerprint(item: Dict[str, Any]) -> int:
+        """Отпечаток полей элемента выдачи, изменение которых требует повторной обработки"""
+        snippet = item.get("snippet") or {}
+        raw = "\x1f".join(str(value) for value in (
+            item.get("name"), item.get("salary"), item.get("published_at"),
+            snippet.get("requirement"), snippet.get("responsibility"),
+        ))
+        return zlib.crc32(raw.encode("utf-8"))
+
+    @staticmethod
+    def item_id(item: Dict[str, Any]) -> Optional[int]:
+        raw_id = item.get("id")
+        return int(raw_id) if raw_id is not None and str(raw_id).isdigit() else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids) + sum(1 for hh_id in self._delta if self._find(hh_id) is None)
+
+    def _find(self, hh_id: int) -> Optional[int]:
+        index = bisect_left(self._ids, hh_id)
+        if index < len(self._ids) and self._ids[index] == hh_id:
+            return index
+        return None
+
+    def get(self, hh_id: int) -> Optional[int]:
+        """Сохраненный отпечаток вакансии или None"""
+        with self._lock:
+            if hh_id in self._delta:
+                return self._delta[hh_id]
+            index = self._find(hh_id)
+            return self._fingerprints[index] if index is not None else None
+
+    def filter_new(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Элементы выдачи, которые еще не обрабатывались или изменились.
+        Повторы внутри самой выдачи тоже отбрасываются.
+        """
+        result = []
+        batch = set()
+        for item in items:
+            hh_id = self.item_id(item)
+            if hh_id is not None:
+                if hh_id in batch or self.get(hh_id) == self.fingerprint(item):
+                    metrics.inc("hh_cache_hits_total", cache="seen")
+                    continue
+                batch.add(hh_id)
+            metrics.inc("hh_cache_misses_total", cache="seen")
+            result.append(item)
+        return result
+
+    def mark(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Отметка элементов как обработанных (вызывается после успешного сохранения)"""
+        with self._lock:
+            for item in items:
+                hh_id = self.item_id(item)
+                if hh_id is not None:
+                    self._delta[hh_id] = self.fingerprint(item)
+
+    def mark_saved(self, items: Iterable[Dict[str, Any]], saved: Iterable[Any]) -> None:
+        """Отметка только тех элементов, вакансии которых (saved, с полем hh_id) записаны в хранилище"""
+        saved_ids = {vacancy.hh_id for vacancy in saved}
+        self.mark(item for item in items if self.item_id(item) in saved_ids)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = self.path.read_bytes()
+            magic, count, size, mtime_ns = _HEADER.unpack_from(data)
+            if magic != _MAGIC:
+                raise ValueError("неизвестный формат")
+            stamp = self._storage_stamp()
+            if stamp == (-1, -1) or (size, mtime_ns) != stamp:
+                print(f"ℹ️ Хранилище {self.storage} изменилось, множество просмотренных вакансий сброшено")
+                return
+            ids_end = _HEADER.size + count * self._ids.itemsize
+            self._ids.frombytes(data[_HEADER.size:ids_end])
+            self._fingerprints.frombytes(data[ids_end:ids_end + count * self._fingerprints.itemsize])
+            if len(self._fingerprints) != count:
+                raise ValueError("файл обрезан")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"⚠️ Множество просмотренных вакансий {self.path} не прочитано ({e}), начинаем заново")
+            self._ids, self._fingerprints = array("Q"), array("I")
+
+    def save(self) -> None:
+        """Слияние новых записей с массивами и атомарная запись на диск"""
+        with self._lock:
+            if not self._delta:
+                return
+            ids, fingerprints = array("Q"), array("I")
+            delta = sorted(self._delta.items())
+            i = j = 0
+            while i < len(self._ids) or j < len(delta):
+                if j == len(delta) or (i < len(self._ids) and self._ids[i] < delta[j][0]):
+                    ids.append(self._ids[i])
+                    fingerprints.append(self._fingerprints[i])
+                    i += 1
+                else:
+                    if i < len(self._ids) and self._ids[i] == delta[j][0]:
+                        i += 1  # Обновленный отпечаток заменяет старый
+                    ids.append(delta[j][0])
+                    fingerprints.append(delta[j][1])
+                    j += 1
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as file:
+                file.write(_HEADER.pack(_MAGIC, len(ids), *self._storage_stamp()))
+                file.write(ids.tobytes())
+                file.write(fingerprints.tobytes())
+            os.replace(tmp_path, self.path)
+            self._ids, self._fingerprints = ids, fingerprints
+            self._delta.clear()
@@ -25,7 +25,7 @@ def test_company_api():
 
     if vacancies:
         for i, vac in enumerate(vacancies[:3], 1):
-            print(f"   {i}. {vac.get('name')} - {vac.get('salary', {}).get('from')} руб.")
+            print(f"   {i}. {vac.name} - {vac.salary_from} руб.")
 
 
 if __name__ == "__main__":
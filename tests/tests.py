@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -293,3 +294,989 @@ def test_json_saver_read_only_file(tmp_path):
 
     saver = JSONSaver(test_file)
     assert saver.get_vacancies({}) == []
+
+
+def test_json_saver_keeps_index_and_deletes_duplicates(tmp_path):
+    import json
+
+    test_file = tmp_path / "dups.json"
+    record = {"id": 7, "title": "Dev", "url": "https://hh.ru/vacancy/7", "salary": None, "description": ""}
+    other = {**record, "id": 8, "url": "https://hh.ru/vacancy/8"}
+    test_file.write_text(json.dumps([record, {**record, "id": None}, other]))
+    saver = JSONSaver(test_file)
+    vacancy = Vacancy("Dev", "https://hh.ru/vacancy/7", None, "", hh_id=7)
+
+    saver.add_vacancy(Vacancy("New", "https://hh.ru/vacancy/9", None, "", hh_id=9))
+    with patch("builtins.open", side_effect=AssertionError("файл не должен читаться повторно")):
+        saver.add_vacancy(vacancy)  # Дубликат определяется по индексу в памяти
+
+    saver.delete_vacancy(vacancy)
+    assert [v.hh_id for v in saver.get_vacancies({})] == [8, 9]
+
+    test_file.write_text(json.dumps([record]))  # Изменение файла извне сбрасывает индекс
+    assert [v.hh_id for v in saver.get_vacancies({})] == [7]
+
+
+def test_vacancy_record_from_api():
+    from src.models.vacancy_record import VacancyRecord
+
+    record = VacancyRecord.from_api(
+        {
+            "id": "123",
+            "name": "Python Dev",
+            "alternate_url": "http://test.com",
+            "salary": None,
+            "experience": {"name": "Нет опыта"},
+            "snippet": {"requirement": "Exp"},
+        }
+    )
+    assert record.hh_id == 123
+    assert record.salary_from is None
+    assert record.experience == "Нет опыта"
+    assert not hasattr(record, "__dict__")
+
+
+def test_company_api_projects_pages():
+    from src.api.company_api import HHCompanyAPI
+
+    with patch("requests.get") as mock_get, patch("time.sleep"):
+        mock_get.return_value.json.side_effect = [
+            {"items": [{"id": "1", "name": "A", "salary": {"from": 100}}], "pages": 2},
+            {"items": [{"id": "2", "name": "B", "salary": {"to": 200}}], "pages": 2},
+        ]
+        records = HHCompanyAPI().get_company_vacancies(1740)
+
+    assert [r.hh_id for r in records] == [1, 2]
+    assert records[1].salary_to == 200
+
+
+def test_simulator_pagination_and_cap():
+    from src.api.simulator import HHSimulator, SimulatorConfig
+
+    with HHSimulator(SimulatorConfig(max_found=100000)) as simulator:
+        simulator.found_for = lambda query: 5000
+        first = requests.get(f"{simulator.url}/vacancies", params={"per_page": 100, "page": 0}).json()
+        too_deep = requests.get(f"{simulator.url}/vacancies", params={"per_page": 100, "page": 20})
+
+        assert first["found"] == 5000
+        assert first["pages"] == 20
+        assert len(first["items"]) == 100
+        assert too_deep.status_code == 400
+
+
+def test_simulator_rate_limit_and_base_url():
+    from src.api.simulator import HHSimulator, SimulatorConfig
+
+    config = SimulatorConfig(rate_limit_rps=0.001, rate_burst=2, retry_after=3)
+    with HHSimulator(config) as simulator:
+        api = HeadHunterAPI(base_url=simulator.url)
+        assert api.connect()
+        requests.get(f"{simulator.url}/employers/1740")
+        throttled = requests.get(f"{simulator.url}/employers/1740")
+
+        assert throttled.status_code == 429
+        assert throttled.headers["Retry-After"] == "3"
+
+
+def test_cassette_record_and_replay(tmp_path):
+    from src.api.simulator import HHSimulator
+    from src.api.transport import CassetteTransport
+
+    with HHSimulator() as simulator:
+        recorder = CassetteTransport("record", tmp_path / "cassettes")
+        recorded = HeadHunterAPI(base_url=simulator.url, transport=recorder).get_vacancies("python")
+        base_url = simulator.url
+
+    assert list((tmp_path / "cassettes").glob("*.json.gz"))
+
+    player = CassetteTransport("replay", tmp_path / "cassettes")
+    replayed = HeadHunterAPI(base_url=base_url, transport=player).get_vacancies("python")
+    assert replayed == recorded
+
+
+def test_cassette_replay_miss(tmp_path):
+    from src.api.transport import CassetteTransport
+
+    player = CassetteTransport("replay", tmp_path)
+    with pytest.raises(requests.ConnectionError):
+        player.get("http://127.0.0.1:1/vacancies", params={"text": "python"})
+
+
+def test_retrying_transport_recovers_all_pages():
+    from src.api.backoff import AIMDController, RetryingTransport, RetryPolicy
+    from src.api.simulator import HHSimulator, SimulatorConfig
+    from src.api.transport import HTTPTransport
+
+    policy = RetryPolicy(max_retries=10, base_delay=0.001, max_delay=0.01)
+    with HHSimulator(SimulatorConfig(error_rate=0.3, seed=7)) as simulator:
+        simulator.found_for = lambda query: 450
+        transport = RetryingTransport(HTTPTransport(), policy, AIMDController(initial=4))
+        vacancies = _fetch_all_pages(simulator.url, transport)
+
+    assert len(vacancies) == 450
+    assert len({v["id"] for v in vacancies}) == 450
+
+
+def test_http_transport_times_out_on_stalled_server(monkeypatch):
+    import socket
+
+    from src.api.transport import HTTPTransport, build_transport
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)  # Соединение принимается ядром, но ответа нет
+    url = f"http://127.0.0.1:{server.getsockname()[1]}/vacancies"
+    try:
+        with pytest.raises(requests.Timeout):
+            HTTPTransport(timeout=(1, 0.2)).get(url)
+    finally:
+        server.close()
+
+    monkeypatch.setenv("HH_READ_TIMEOUT", "7")
+    assert build_transport().inner.timeout == (5.0, 7.0)
+
+
+def _fetch_all_pages(base_url, transport):
+    with patch.object(HeadHunterAPI, "connect", return_value=True):
+        return HeadHunterAPI(base_url=base_url, transport=transport).get_vacancies("python")
+
+
+def test_aimd_controller_adjusts_limit():
+    from src.api.backoff import AIMDController
+
+    controller = AIMDController(initial=4, max_limit=8, cooldown=0)
+    for _ in range(20):
+        controller.on_success(0.01)
+    assert controller.limit > 4
+
+    raised = controller.limit
+    controller.on_congestion()
+    assert controller.limit == max(1, raised // 2)
+
+    controller.on_success(controller.latency_target + 1)
+    assert controller.limit < raised // 2 or controller.limit == 1
+
+
+def test_retry_policy_honours_retry_after():
+    from src.api.backoff import RetryPolicy, parse_retry_after
+
+    policy = RetryPolicy(base_delay=0.1)
+    assert 3 <= policy.delay(0, parse_retry_after("3")) <= 3.1
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+    assert 0 <= policy.delay(4) <= 1.6
+
+
+def test_metrics_registry_export(tmp_path):
+    from src.monitoring.metrics import MetricsRegistry
+
+    disabled = MetricsRegistry()
+    disabled.inc("hh_http_requests_total", endpoint="/vacancies")
+    assert disabled.snapshot()["counters"] == {}
+
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("hh_http_requests_total", endpoint="/vacancies", status=200)
+    registry.inc("hh_http_requests_total", endpoint="/vacancies", status=200)
+    with registry.timer("hh_db_statement_seconds", statement="insert_vacancy"):
+        pass
+    assert registry.timed("hh_storage_operation_seconds", op="add")(lambda x: x + 1)(1) == 2
+
+    text = registry.to_prometheus()
+    assert 'hh_http_requests_total{endpoint="/vacancies",status="200"} 2' in text
+    assert 'hh_db_statement_seconds_bucket{statement="insert_vacancy",le="+Inf"} 1' in text
+
+    registry.write(tmp_path / "metrics.json")
+    snapshot = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert snapshot["histograms"]["hh_db_statement_seconds"][0]["count"] == 1
+    assert snapshot["histograms"]["hh_storage_operation_seconds"][0]["count"] == 1
+
+
+def test_metrics_record_http_and_parsing():
+    from src.api import transport as transport_module
+    from src.api.simulator import HHSimulator
+
+    registry = transport_module.metrics
+    registry.reset()
+    registry.enabled = True
+    try:
+        with HHSimulator() as simulator:
+            simulator.found_for = lambda query: 150
+            items = HeadHunterAPI(base_url=simulator.url).get_vacancies("python")
+            Vacancy.cast_to_object_list(items)
+        counters = registry.snapshot()["counters"]
+    finally:
+        registry.enabled = False
+        registry.reset()
+
+    requests_total = {
+        (row["labels"]["endpoint"], row["labels"]["status"]): row["value"]
+        for row in counters["hh_http_requests_total"]
+    }
+    assert requests_total[("/vacancies", "200")] == 3
+    assert counters["hh_http_response_bytes_total"][0]["value"] > 0
+    assert counters["hh_items_parsed_total"][0]["value"] == 150
+
+
+def test_stage_profiler_writes_report(tmp_path):
+    from src.monitoring.profiling import profile_stage, profiling
+
+    with profile_stage("cast"):  # Без активного профилировщика ничего не делает
+        pass
+
+    items = [
+        {"name": f"Dev {i}", "alternate_url": f"http://test.com/{i}", "salary": {"from": i}}
+        for i in range(1, 200)
+    ]
+    with profiling(tmp_path / "profile", memory=True):
+        for _ in range(2):
+            with profile_stage("cast"):
+                Vacancy.cast_to_object_list(items)
+                with profile_stage("nested"):
+                    sorted(items, key=lambda item: item["name"])
+
+    summary = json.loads((tmp_path / "profile" / "summary.json").read_text(encoding="utf-8"))
+    stages = {row["stage"]: row for row in summary}
+    assert stages["cast"]["calls"] == 2
+    assert stages["cast"]["peak_memory_bytes"] > 0
+    assert stages["nested"]["calls"] == 2
+    assert (tmp_path / "profile" / "cast.prof").exists()
+    assert "cast_to_object_list" in (tmp_path / "profile" / "cast.txt").read_text(encoding="utf-8")
+
+
+def test_cli_imports_lazily():
+    import subprocess
+    import sys
+
+    code = "import sys, src.cli; print(','.join(m for m in ('psycopg2', 'requests') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == ""
+
+
+def test_cli_search_json(capsys):
+    from src.cli import main
+
+    items = [
+        {"name": "Python Dev", "alternate_url": "http://a.com", "salary": {"from": 150000},
+         "snippet": {"requirement": "Django"}},
+        {"name": "Java Dev", "alternate_url": "http://b.com", "salary": {"from": 90000},
+         "snippet": {"requirement": "Spring"}},
+    ]
+    with patch("src.api.hh_api.HeadHunterAPI.get_vacancies", return_value=items):
+        assert main(["search", "dev", "--salary-min", "100000", "--json"]) == 0
+
+    rows = json.loads(capsys.readouterr().out)
+    assert [row["title"] for row in rows] == ["Python Dev"]
+
+
+def test_cli_read_commands_fail_on_db_error(capsys):
+    import psycopg2
+
+    from src.cli import main
+    from src.database.db_manager import DBManager
+
+    with patch.object(DBManager, "_connect", side_effect=psycopg2.OperationalError("connection refused")):
+        assert main(["stats", "--json"]) == 1
+        assert main(["export"]) == 1
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "connection refused" in captured.err
+
+    from argparse import Namespace
+    from src.cli import cmd_find
+
+    assert cmd_find(Namespace(filter=[("area", [])], limit=10, json=False)) == 2
+    assert "area" in capsys.readouterr().err
+
+
+def test_startup_uses_schema_meta_state(monkeypatch, capsys):
+    import src.main as main_module
+
+    monkeypatch.setattr("builtins.input", lambda _: "0")
+    state = {"schema_version": main_module.SCHEMA_VERSION, "last_load_at": None,
+             "companies_count": 3, "vacancies_count": 120}
+    with patch.object(main_module.DBManager, "get_startup_state", return_value=state), \
+            patch.object(main_module, "setup_database") as setup, \
+            patch.object(main_module, "setup_and_fill_database") as fill:
+        main_module.user_interaction()
+
+    assert not setup.called
+    assert not fill.called
+    assert "120 вакансий" in capsys.readouterr().out
+
+
+def test_startup_sets_up_schema_once(monkeypatch):
+    import src.main as main_module
+
+    monkeypatch.setattr("builtins.input", lambda _: "0")
+    with patch.object(main_module.DBManager, "get_startup_state", side_effect=[None, None]), \
+            patch.object(main_module, "setup_database", return_value=True) as setup, \
+            patch.object(main_module, "setup_and_fill_database", return_value=True) as fill:
+        main_module.user_interaction()
+
+    assert setup.call_count == 1
+    fill.assert_called_once_with(setup=False)
+
+
+def test_query_cache_lru_ttl_and_generation():
+    from src.database.cache import QueryCache
+
+    cache = QueryCache(maxsize=2, ttl=60)
+    loader = MagicMock(side_effect=lambda: "value")
+    cache.get_or_load("a", loader)
+    cache.get_or_load("a", loader)
+    assert loader.call_count == 1
+
+    cache.get_or_load("b", loader)
+    cache.get_or_load("c", loader)  # вытесняет "a"
+    cache.get_or_load("a", loader)
+    assert loader.call_count == 4
+
+    cache.invalidate()
+    cache.get_or_load("a", loader)
+    assert loader.call_count == 5
+
+    cache.ttl = 0
+    cache.get_or_load("a", loader)
+    assert loader.call_count == 6
+
+
+def test_db_reads_cached_until_write():
+    from src.database.cache import QueryCache
+    from src.database.db_manager import DBManager
+
+    manager = DBManager(cache=QueryCache())
+    cursor = MagicMock(rowcount=1)
+    cursor.fetchall.return_value = [("Яндекс", 3)]
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+
+    with patch.object(DBManager, "get_connection") as get_connection:
+        get_connection.return_value.__enter__.return_value = conn
+        assert manager.get_companies_and_vacancies_count() == [("Яндекс", 3)]
+        assert manager.get_companies_and_vacancies_count() == [("Яндекс", 3)]
+        assert get_connection.call_count == 1
+
+        assert manager.insert_vacancy({"id": "1", "name": "Dev", "alternate_url": "http://a.com"}, 1)
+        cursor.execute.assert_any_call("NOTIFY hh_data_changed")
+        manager.get_companies_and_vacancies_count()
+        assert get_connection.call_count == 3
+
+
+def _mock_connection(manager_cls):
+    cursor = MagicMock(rowcount=1)
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    patcher = patch.object(manager_cls, "get_connection")
+    get_connection = patcher.start()
+    get_connection.return_value.__enter__.return_value = conn
+    return patcher, cursor
+
+
+def test_upserts_report_only_written_rows():
+    from src.database.cache import QueryCache
+    from src.database.db_manager import DBManager
+
+    manager = DBManager(cache=QueryCache())
+    patcher, cursor = _mock_connection(DBManager)
+    try:
+        # Хэш не изменился: WHERE в ON CONFLICT подавил обновление, RETURNING пуст
+        cursor.rowcount = 0
+        assert not manager.insert_vacancy({"id": "1", "name": "Dev", "alternate_url": "http://a.com"}, 1)
+        cursor.fetchone.return_value = (5,)
+        assert manager.insert_company({"id": "1740", "name": "Яндекс"}) == 5
+    finally:
+        patcher.stop()
+
+    upsert, lookup = [call.args for call in cursor.execute.call_args_list[-2:]]
+    assert "companies.content_hash IS DISTINCT FROM" in upsert[0]
+    assert lookup[1] == ("1740",)
+
+
+def test_partitioned_insert_creates_month_partition_once():
+    from src.database.cache import QueryCache
+    from src.database.db_manager import DBConfig, DBManager
+
+    manager = DBManager(DBConfig(partitioned=True), cache=QueryCache())
+    patcher, cursor = _mock_connection(DBManager)
+    try:
+        for vacancy_id in ("1", "2"):
+            assert manager.insert_vacancy({"id": vacancy_id, "name": "Dev", "alternate_url": f"http://{vacancy_id}",
+                                           "published_at": "2026-03-05T10:00:00+0300"}, 1)
+    finally:
+        patcher.stop()
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    ddl = [s for s in statements if "PARTITION OF" in s]
+    assert len(ddl) == 1 and "vacancies_p202603" in ddl[0]
+    assert any("ON CONFLICT (hh_id, published_at)" in s for s in statements)
+
+
+def test_partitioned_insert_moves_republished_and_skips_expired():
+    from src.database.cache import QueryCache
+    from src.database.db_manager import DBConfig, DBManager
+
+    manager = DBManager(DBConfig(partitioned=True, retention_months=3), cache=QueryCache())
+    patcher, cursor = _mock_connection(DBManager)
+    try:
+        assert not manager.insert_vacancy({"id": "1", "name": "Dev", "alternate_url": "http://1",
+                                           "published_at": "2001-01-05T10:00:00+0300"}, 1)
+        assert not cursor.execute.called
+        assert manager.insert_vacancy({"id": "1", "name": "Dev", "alternate_url": "http://1"}, 1)
+    finally:
+        patcher.stop()
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert any("DELETE FROM vacancies" in s and "published_at <>" in s for s in statements)
+
+
+def test_purge_drops_only_expired_partitions():
+    from datetime import date
+
+    from src.database.cache import QueryCache
+    from src.database.db_manager import DBConfig, DBManager, add_months, month_start, partition_name
+
+    current = month_start(date.today())
+    names = [partition_name(add_months(current, -shift)) for shift in (0, 3, 4, 12)]
+    manager = DBManager(DBConfig(partitioned=True, retention_months=3), cache=QueryCache())
+    patcher, cursor = _mock_connection(DBManager)
+    cursor.fetchall.return_value = [(name, 100.0) for name in names]
+    try:
+        dropped = manager.purge_old_partitions()
+        manager.record_load()
+    finally:
+        patcher.stop()
+
+    assert sorted(dropped) == sorted(names[2:]) and len(dropped) == 2
+    # Счетчик вакансий уменьшается по оценке строк удаленных секций, без COUNT(*)
+    query, params = cursor.execute.call_args_list[-1].args
+    assert "COUNT" not in query and params == {"companies": 0, "vacancies": -200}
+    assert DBManager(DBConfig()).purge_old_partitions(3) == []
+
+
+def test_loader_writes_only_changed_vacancies():
+    from src.database.loader import load_companies
+    from src.models.vacancy_record import VacancyRecord
+
+    same = {"id": "1", "name": "Dev", "alternate_url": "http://a", "salary": {"from": 100}}
+    changed = {"id": "2", "name": "QA", "alternate_url": "http://b", "salary": {"from": 200}}
+    new = {"id": "3", "name": "Ops", "alternate_url": "http://c"}
+    stale = VacancyRecord.from_api({**changed, "salary": {"from": 150}})
+
+    db_manager = MagicMock()
+    db_manager.get_company_ids.return_value = {1740: 7}
+    db_manager.get_vacancy_hashes.return_value = {
+        1: VacancyRecord.from_api(same).content_hash(),
+        2: stale.content_hash(),
+    }
+    db_manager.insert_company.return_value = 7
+    db_manager.insert_vacancy.return_value = True
+
+    companies = [{"id": "1740", "name": "Яндекс", "vacancies": [same, changed, new]}]
+    assert load_companies(db_manager, companies) == (1, 2)
+
+    # Строку известной компании обновляет upsert с проверкой хэша
+    assert db_manager.insert_company.call_args.args[0]["name"] == "Яндекс"
+    written = [call.args[0].alternate_url for call in db_manager.insert_vacancy.call_args_list]
+    assert written == ["http://b", "http://c"]
+
+
+def test_crawl_queue_claims_with_skip_locked():
+    from src.database.cache import QueryCache
+    from src.database.crawl_queue import CrawlJob, CrawlQueue
+    from src.database.db_manager import DBManager
+
+    patcher, cursor = _mock_connection(DBManager)
+    cursor.fetchall.return_value = [(11, 1740, 1)]
+    try:
+        jobs = CrawlQueue(DBManager(cache=QueryCache()), lease_seconds=30).claim("w1")
+    finally:
+        patcher.stop()
+
+    assert jobs == [CrawlJob(11, 1740, 1)]
+    query, params = cursor.execute.call_args.args
+    assert "FOR UPDATE SKIP LOCKED" in query
+    assert params["worker_id"] == "w1" and params["lease"] == 30
+
+
+def test_crawl_worker_completes_and_fails_jobs():
+    from src.database.crawl_queue import CrawlJob
+    from src.database.crawl_worker import CrawlWorker
+
+    ok, broken = CrawlJob(1, 1740, 1), CrawlJob(2, 404, 1)
+    queue = MagicMock(lease_seconds=30)
+    queue.claim.side_effect = [[ok], [broken], []]
+    queue.complete.return_value = True
+    api = MagicMock()
+    api.fetch_company_info.side_effect = lambda hh_id: {"id": hh_id, "name": f"Компания {hh_id}"}
+
+    def fetch_vacancies(hh_id):
+        if hh_id == 404:
+            raise requests.ConnectionError("connection reset")  # Сбой сети — не пустой список вакансий
+        return []
+
+    api.fetch_company_vacancies.side_effect = fetch_vacancies
+    db_manager = MagicMock()
+    db_manager.get_company_ids.return_value = {1740: 5}
+
+    assert CrawlWorker(db_manager, queue, api, worker_id="w1").run() == 1
+    queue.complete.assert_called_once_with("w1", ok)
+    assert queue.fail.call_args.args[:2] == ("w1", broken)
+    assert "connection reset" in queue.fail.call_args.args[2]
+    # Истекшие аренды возвращаются в очередь перед каждой арендой, а не только в режиме --forever
+    assert queue.requeue_expired.call_count == 3
+    db_manager.record_load.assert_called_once()
+
+
+def test_archive_transport_and_replay(tmp_path):
+    from src.api.archive import ArchivingTransport, PayloadArchive
+    from src.api.transport import HTTPTransport
+    from src.database.replay import replay_to_db, replay_to_json
+
+    employer = {"id": "1740", "name": "Яндекс", "alternate_url": "http://hh/1740", "description": "<p>IT</p>"}
+    page = {"items": [{"id": "1", "name": "Dev", "alternate_url": "http://hh/v/1", "salary": {"from": 100}}],
+            "pages": 1}
+    card = {"id": "1", "description": "<p>Full</p>", "key_skills": [{"name": "Python"}]}
+
+    def fake_get(url, **kwargs):
+        response = MagicMock(status_code=200)
+        response.text = json.dumps(employer if "/employers/" in url else card if url.endswith("/1") else page)
+        return response
+
+    archive = PayloadArchive(str(tmp_path))
+    transport = ArchivingTransport(HTTPTransport(), archive)
+    with patch("src.api.transport.requests.get", side_effect=fake_get):
+        transport.get("https://api.hh.ru/employers/1740")
+        transport.get("https://api.hh.ru/vacancies", params={"employer_id": 1740, "page": 0})
+        transport.get("https://api.hh.ru/vacancies/1")
+
+    assert [r["endpoint"] for r in archive.iter_records()] == ["/employers/{id}", "/vacancies", "/vacancies/{id}"]
+
+    db_manager = MagicMock()
+    db_manager.get_company_ids.return_value = {}
+    db_manager.insert_company.return_value = 3
+    db_manager.insert_vacancy.return_value = True
+    assert replay_to_db(db_manager, archive) == (1, 1)
+    assert db_manager.insert_company.call_args.args[0]["description"] == "IT"
+    record = db_manager.insert_vacancy.call_args.args[0]
+    assert record.description == "Full" and record.key_skills == ["Python"]
+
+    saver = JSONSaver(tmp_path / "replay.json")
+    assert replay_to_json(saver, archive) == 1
+    assert [v.hh_id for v in saver.get_vacancies({})] == [1]
+
+
+def test_seen_set_skips_known_unchanged_items(tmp_path):
+    from src.storage.seen_set import SeenSet
+
+    path = tmp_path / "seen.bin"
+    items = [{"id": str(i), "name": f"Dev {i}", "salary": {"from": i}} for i in (5, 1, 3)]
+    seen = SeenSet(str(path))
+    assert seen.filter_new(items + items[:1]) == items
+    seen.mark(items)
+    seen.save()
+
+    reloaded = SeenSet(str(path))
+    assert len(reloaded) == 3
+    changed = {"id": "3", "name": "Dev 3", "salary": {"from": 300}}
+    fresh = {"id": "2", "name": "Dev 2"}
+    assert reloaded.filter_new(items + [changed, fresh]) == [changed, fresh]
+
+    reloaded.mark([changed, fresh])
+    reloaded.save()
+    assert len(SeenSet(str(path))) == 4
+    assert SeenSet(str(path)).get(3) == SeenSet.fingerprint(changed)
+
+
+def test_seen_set_is_bound_to_its_storage(tmp_path):
+    from src.storage.seen_set import SeenSet
+
+    items = [{"id": "5", "name": "Dev", "alternate_url": "https://hh.ru/vacancy/5"}]
+
+    def save_to(name):
+        saver = JSONSaver(tmp_path / name)
+        seen = SeenSet.for_storage(saver.file_path)
+        new_items = seen.filter_new(items)
+        saved = saver.add_vacancies(Vacancy.cast_to_object_list(new_items), update=True)
+        seen.mark_saved(new_items, saved)
+        seen.save()
+        return len(saved)
+
+    assert save_to("a.json") == 1
+    assert save_to("a.json") == 0
+    assert save_to("b.json") == 1  # Другое хранилище — свое множество
+    (tmp_path / "a.json").unlink()
+    assert save_to("a.json") == 1  # Удаленное хранилище заполняется заново
+
+    # Изменившаяся вакансия перезаписывается, а не только отмечается как просмотренная
+    items[0]["name"] = "Senior Dev"
+    assert save_to("a.json") == 1
+    assert [v.title for v in JSONSaver(tmp_path / "a.json").get_vacancies({})] == ["Senior Dev"]
+
+    # Незаписанный элемент не отмечается: следующий проход обработает его снова
+    seen = SeenSet.for_storage(JSONSaver(tmp_path / "c.json").file_path)
+    seen.mark_saved(items, [])
+    assert seen.filter_new(items) == items
+
+
+def test_details_enrichment_is_cached_by_version(tmp_path):
+    from src.api.details import VacancyDetailsCache, VacancyDetailsFetcher
+    from src.api.simulator import HHSimulator
+    from src.api.transport import HTTPTransport
+    from src.models.vacancy_record import VacancyRecord
+
+    items = [{"id": str(20_000_000 + i), "name": "Dev", "alternate_url": f"http://hh/{i}",
+              "published_at": "2025-08-01T12:00:00+0300"} for i in range(6)]
+    with HHSimulator() as simulator:
+        transport = HTTPTransport()
+        transport.concurrency = 4
+        fetcher = VacancyDetailsFetcher(simulator.url, transport, VacancyDetailsCache(str(tmp_path)))
+
+        records = [VacancyRecord.from_api(item) for item in items]
+        assert fetcher.enrich(records) == 6
+        assert records[0].description.startswith("Полное описание") and len(records[0].key_skills) == 3
+
+        again = [VacancyRecord.from_api(item) for item in items]
+        again[0].published_at = "2025-09-01T12:00:00+0300"
+        assert fetcher.enrich(again) == 1
+        assert again[5].key_skills == records[5].key_skills
+        assert simulator.stats.by_path["/vacancies/{id}"] == 7
+
+    # Вместе с записью хранится updated_at карточки; известная правка сбрасывает запись
+    cache = VacancyDetailsCache(str(tmp_path))
+    entry = cache.get(records[1].hh_id, records[1].published_at)
+    assert entry["updated_at"]
+    assert cache.get(records[1].hh_id, records[1].published_at, entry["updated_at"]) == entry
+    assert cache.get(records[1].hh_id, records[1].published_at, "2030-01-01T00:00:00+0300") is None
+
+
+def test_crawl_planner_probes_before_downloading_pages():
+    from src.api.backoff import AIMDController, RetryingTransport
+    from src.api.company_api import HHCompanyAPI
+    from src.api.simulator import HHSimulator
+    from src.api.transport import HTTPTransport
+
+    sizes = {"1": 3, "2": 250, "3": 40, "4": 0}
+    with HHSimulator() as simulator:
+        simulator.found_for = lambda query: sizes[query["employer_id"]]
+        api = HHCompanyAPI(base_url=simulator.url, transport=HTTPTransport())
+        api.companies = [{"id": int(hh_id), "name": f"E{hh_id}"} for hh_id in sizes]
+
+        plans = api.plan_crawl(min_vacancies=5)
+        assert [(plan.employer_id, plan.pages) for plan in plans] == [(2, 3), (3, 1)]
+        assert [plan.pages for plan in api.plan_crawl(min_vacancies=5, page_budget=2)] == [1, 1]
+
+        simulator.stats.by_path.clear()
+        companies = api.get_companies_with_vacancies(min_vacancies=5)
+        assert [(c["id"], len(c["vacancies"])) for c in companies] == [("2", 250), ("3", 40)]
+        assert simulator.stats.by_path["/vacancies"] == 4 + 3 + 1
+        assert simulator.stats.by_path["/employers"] == 2
+
+        # Компании обходятся параллельно в пределах конкурентности транспорта
+        api.transport = RetryingTransport(HTTPTransport(), controller=AIMDController(initial=2, max_limit=2))
+        companies = api.get_companies_with_vacancies(min_vacancies=5)
+        assert sorted((c["id"], len(c["vacancies"])) for c in companies) == [("2", 250), ("3", 40)]
+
+
+def test_kll_sketch_quantiles_merge_and_roundtrip():
+    import bisect
+    import random
+
+    from src.analytics.quantiles import KLLSketch
+
+    rng = random.Random(7)
+    values = [rng.randrange(30_000, 500_000) for _ in range(50_000)]
+    left, right = KLLSketch(seed=1), KLLSketch(seed=2)
+    left.extend(values[:20_000])
+    right.extend(values[20_000:])
+    merged = KLLSketch.from_dict(json.loads(json.dumps(left.to_dict()))).merge(right)
+
+    assert merged.n == len(values)
+    assert sum(len(level) for level in merged.levels) < 1000
+    ordered = sorted(values)
+    for q in (0.1, 0.5, 0.9):
+        rank = bisect.bisect_right(ordered, merged.quantile(q)) / len(ordered)
+        assert abs(rank - q) < 0.03
+
+
+def test_db_salary_sketch_updated_for_new_vacancies_only():
+    from src.database.cache import QueryCache
+    from src.database.db_manager import DBManager
+
+    manager = DBManager(cache=QueryCache())
+    patcher, cursor = _mock_connection(DBManager)
+    try:
+        cursor.fetchone.return_value = (True,)
+        manager.insert_vacancy({"id": "1", "name": "Dev", "alternate_url": "http://a",
+                                "salary": {"from": 100000, "to": 200000, "currency": "RUR"}}, 5)
+        cursor.fetchone.return_value = (False,)  # обновление существующей строки
+        manager.insert_vacancy({"id": "1", "name": "Dev", "alternate_url": "http://a",
+                                "salary": {"from": 120000, "currency": "RUR"}}, 5)
+        assert list(manager._pending_sketches) == [(5, "", "RUR")]
+        assert manager._pending_sketches[(5, "", "RUR")].n == 1
+
+        cursor.execute.side_effect = RuntimeError("connection lost")
+        assert manager.flush_salary_sketches() == 0  # Неудачная запись не теряет скетчи
+        assert manager._pending_sketches[(5, "", "RUR")].n == 1
+        cursor.execute.side_effect = None
+
+        cursor.fetchone.return_value = ({"k": 200, "n": 0, "levels": [[]]},)
+        assert manager.flush_salary_sketches() == 1
+    finally:
+        patcher.stop()
+
+    saved = json.loads(cursor.execute.call_args_list[-2].args[1][0])
+    assert saved["n"] == 1 and saved["levels"][0] == [150000]
+    assert manager._pending_sketches == {}
+
+
+def test_search_many_dedups_across_keywords():
+    from src.api.hh_api import HeadHunterAPI
+
+    catalog = {"python": [1, 2, 3], "django": [2, 3, 4], "go": [5], "broken": None}
+
+    class FakeTransport:
+        concurrency = 4
+
+        def get(self, url, params=None, retry=True):
+            response = MagicMock(status_code=200)
+            ids = catalog.get((params or {}).get("text", "python"))
+            if ids is None:
+                response.raise_for_status.side_effect = requests.HTTPError("500")
+            response.json.return_value = {"items": [{"id": str(i)} for i in ids or []], "pages": 1}
+            return response
+
+    result = HeadHunterAPI(transport=FakeTransport()).search_many(["python", "django", "go", "python", "broken"])
+
+    assert sorted(int(item["id"]) for item in result.items) == [1, 2, 3, 4, 5]
+    assert result.found == {"python": 3, "django": 3, "go": 1}
+    assert sum(result.new.values()) == 5
+    assert list(result.errors) == ["broken"]
+
+
+def test_search_query_pushdown_and_residual():
+    from src.api.search_query import SearchQuery
+
+    query = SearchQuery("python", ["django"], salary_min=150000, period=7)
+    params = query.to_api_params()
+    # Слова фильтра проверяются локально как подстроки и в text не попадают
+    assert params == {"text": "python", "only_with_salary": "true", "currency": "RUR", "period": 7}
+    assert SearchQuery("python", ["django"], push_words=True).to_api_params()["text"] == "python django"
+    assert query.residual_criteria() == {"description": "django", "salary": {"min": 150000, "max": 999999999}}
+    assert SearchQuery("python", push_salary=True, salary_min=1).to_api_params()["salary"] == 1
+    assert SearchQuery("python", ["django"], search_field="name").to_api_params() == {
+        "text": "python", "search_field": "name"}
+    assert SearchQuery("python").residual_criteria() == {}
+
+    with patch("requests.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"items": [], "pages": 1}
+        HeadHunterAPI().get_vacancies(params.pop("text"), params)
+        sent = mock_get.call_args.kwargs["params"]
+    assert sent["text"] == "python" and sent["only_with_salary"] == "true" and sent["page"] == 0
+
+
+def test_federated_search_hedges_and_returns_partial_results():
+    import threading
+    import time
+
+    from src.api.federated import FederatedSearch
+    from src.api.hh_api import JobAPI
+
+    release = threading.Event()
+
+    class PagedBoard(JobAPI):
+        paged = True
+
+        def __init__(self):
+            self.calls = {}
+
+        def connect(self):
+            return True
+
+        def get_vacancies(self, keyword):
+            raise AssertionError("постраничный источник опрашивается через fetch_page")
+
+        def fetch_page(self, keyword, page, params=None):
+            self.calls[page] = self.calls.get(page, 0) + 1
+            if page == 2 and self.calls[page] == 1:
+                release.wait(5)  # Первая попытка страницы 2 зависает, повтор отвечает сразу
+            urls = [f"https://a/{page}/{i}" for i in range(2)] + ["https://shared/1"]
+            return {"items": [{"alternate_url": url} for url in urls], "pages": 3}
+
+    class FastBoard(JobAPI):
+        def connect(self):
+            return True
+
+        def get_vacancies(self, keyword):
+            return [{"alternate_url": "https://shared/1"}, {"alternate_url": "https://b/1"}]
+
+    class StuckBoard(FastBoard):
+        def get_vacancies(self, keyword):
+            release.wait(5)
+            return [{"alternate_url": "https://c/1"}]
+
+    paged = PagedBoard()
+    search = FederatedSearch({"a": paged, "b": FastBoard(), "c": StuckBoard()}, deadline=0.6, hedge_after=0.1)
+    started = time.monotonic()
+    try:
+        result = search.search("python")
+    finally:
+        release.set()
+
+    assert time.monotonic() - started < 1.5
+    assert result.partial
+    assert result.backends["a"].complete and result.backends["a"].hedged >= 1 and paged.calls[2] == 2
+    assert result.backends["b"].complete and not result.backends["c"].complete
+    urls = [item["alternate_url"] for item in result.items]
+    assert len(urls) == len(set(urls)) == 3 * 2 + 2
+    # Источник без постраничного доступа отдает всю выдачу страницей 0
+    assert FastBoard().fetch_page("python", 0)["items"][1] == {"alternate_url": "https://b/1"}
+    assert FastBoard().fetch_page("python", 1) == {"items": [], "pages": 1}
+
+
+def test_host_rate_limiter_shares_budget_and_prefers_interactive(tmp_path):
+    import threading
+    import time
+
+    from src.api.rate_limit import HostRateLimiter
+
+    path = str(tmp_path / "limit.json")
+    # Отдельные экземпляры на один файл ведут себя как разные процессы
+    limiters = [HostRateLimiter(rate=40, burst=1, path=path) for _ in range(3)]
+    grants = []
+    stop = threading.Event()
+
+    def crawl(limiter):
+        while not stop.is_set():
+            limiter.acquire("crawl")
+            grants.append(("crawl", time.monotonic()))
+
+    threads = [threading.Thread(target=crawl, args=(limiter,)) for limiter in limiters[:2]]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    started = time.monotonic()
+    for _ in range(6):
+        limiters[2].acquire("interactive")
+        grants.append(("interactive", time.monotonic()))
+    finished = time.monotonic()
+    time.sleep(0.2)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    times = sorted(moment for _, moment in grants)
+    window = times[-1] - times[0]
+    assert len(times) <= 40 * window + 2  # Общий темп не выше квоты
+    assert len(times) >= 30 * window  # и почти на ее уровне
+    crawl_during = [moment for kind, moment in grants if kind == "crawl" and started < moment < finished]
+    assert len(crawl_during) <= 1
+    assert finished - started < 6 / 40 + 0.15
+
+
+def test_crawl_checkpoint_resumes_after_failure(tmp_path):
+    from src.api.company_api import HHCompanyAPI
+    from src.database.loader import load_companies
+    from src.storage.checkpoint import CrawlCheckpoint
+
+    plan = [{"employer_id": hh_id, "name": f"E{hh_id}", "found": 10, "pages": 1} for hh_id in (1, 2, 3)]
+    api = HHCompanyAPI(transport=MagicMock(concurrency=1))
+    api.fetch_company_info = lambda hh_id: {"id": str(hh_id), "name": f"E{hh_id}"}
+    fetched = []
+
+    def vacancies(hh_id, pages=None):
+        fetched.append(hh_id)
+        if hh_id == 2 and fetched.count(2) == 1:
+            raise requests.ConnectionError("обрыв сети")
+        return [MagicMock()] * 5
+
+    api.fetch_company_vacancies = vacancies
+    db_manager = MagicMock()
+    db_manager.get_company_ids.return_value = {}
+    path = str(tmp_path / "fill.json")
+
+    with patch("src.database.loader.load_company", return_value=(5, 0, 0)):
+        checkpoint = CrawlCheckpoint(path, "companies")
+        checkpoint.start()
+        checkpoint.set_plan(plan)
+        count, _ = load_companies(db_manager, api.iter_companies_with_vacancies(3, checkpoint), checkpoint)
+        # Сбой сети не отмечает компанию выполненной, контрольная точка остается
+        assert count == 2 and CrawlCheckpoint.pending(path)
+
+        checkpoint = CrawlCheckpoint(path, "companies")
+        assert checkpoint.start(resume=True) and checkpoint.is_done(3) and not checkpoint.is_done(2)
+        count, _ = load_companies(db_manager, api.iter_companies_with_vacancies(3, checkpoint), checkpoint)
+
+    assert count == 1 and fetched == [1, 2, 3, 2]
+    assert not CrawlCheckpoint.pending(path)
+    assert not CrawlCheckpoint.pending(path)
+    assert not CrawlCheckpoint(path, "companies").start(resume=True)
+
+    # Ошибка записи в БД тоже оставляет компанию для продолжения
+    checkpoint = CrawlCheckpoint(path, "companies")
+    checkpoint.start()
+    checkpoint.set_plan(plan[:1])
+    with patch("src.database.loader.load_company", side_effect=RuntimeError("нет связи с БД")):
+        load_companies(db_manager, api.iter_companies_with_vacancies(3, checkpoint), checkpoint)
+    assert CrawlCheckpoint.pending(path) and not checkpoint.is_done(1)
+
+
+def test_hh_id_is_identity_in_vacancy_and_json_storage(json_saver):
+    items = [
+        {"id": "101", "name": "Dev", "alternate_url": "https://hh.ru/vacancy/101"},
+        {"name": "QA", "alternate_url": "https://hh.ru/vacancy/202?from=search"},
+    ]
+    first, second = Vacancy.cast_to_object_list(items)
+    assert (first.hh_id, second.hh_id) == (101, 202)
+    assert not hasattr(first, "__dict__")
+
+    json_saver.add_vacancy(first)
+    json_saver.add_vacancy(Vacancy("Dev", "https://hh.ru/vacancy/101?utm=1", None, "", hh_id=101))
+    json_saver.add_vacancy(second)
+    stored = json_saver.get_vacancies({})
+    assert sorted(v.hh_id for v in stored) == [101, 202]
+
+    json_saver.delete_vacancy(Vacancy("X", "https://other.example/101", None, "", hh_id=101))
+    assert [v.hh_id for v in json_saver.get_vacancies({})] == [202]
+    with pytest.raises(ValueError):
+        Vacancy("Dev", "http://a.com", None, "", hh_id="101")
+
+
+def test_raw_payload_and_containment_filter():
+    from src.database.cache import QueryCache
+    from src.database.db_manager import DBConfig, DBManager
+    from src.database.raw_filter import compile_raw_filter
+    from src.models.vacancy_record import VacancyRecord
+
+    item = {"id": "7", "name": "Dev", "alternate_url": "http://hh/7", "area": {"id": "1", "name": "Москва"},
+            "schedule": {"id": "remote"}, "work_format": [{"id": "REMOTE"}], "salary": {"currency": "RUR"}}
+    record = VacancyRecord.from_api(item)
+    record.key_skills = ["Python"]
+    assert record.raw_payload() == {"area": {"id": "1"}, "schedule": {"id": "remote"},
+                                    "work_format": [{"id": "REMOTE"}], "key_skills": ["Python"],
+                                    "salary": {"currency": "RUR", "gross": None}}
+
+    where, params = compile_raw_filter({"area": ["1", "2"], "key_skills": ["Python", "SQL"], "salary_min": 100})
+    assert where == "(v.raw @> %s::jsonb OR v.raw @> %s::jsonb) AND v.raw @> %s::jsonb AND v.salary_avg >= %s"
+    assert [json.loads(p) for p in params[:3]] == [{"area": {"id": "1"}}, {"area": {"id": "2"}},
+                                                   {"key_skills": ["Python", "SQL"]}]
+    with pytest.raises(ValueError):
+        compile_raw_filter({"'; DROP TABLE vacancies; --": 1})
+    for empty in ({"area": []}, {"work_format": ()}, {"key_skills": []}):
+        with pytest.raises(ValueError):
+            compile_raw_filter(empty)
+
+    manager = DBManager(DBConfig(store_raw=True), cache=QueryCache())
+    patcher, cursor = _mock_connection(DBManager)
+    try:
+        cursor.fetchone.return_value = (True,)
+        assert manager.insert_vacancy(record, 1)
+        cursor.fetchall.return_value = [("Яндекс", "Dev", None, "RUR", "http://hh/7")]
+        assert manager.find_vacancies({"schedule": "remote"}) == cursor.fetchall.return_value
+    finally:
+        patcher.stop()
+
+    insert = next(call.args for call in cursor.execute.call_args_list if "INSERT INTO vacancies" in call.args[0])
+    assert json.loads(insert[1][-1])["key_skills"] == ["Python"]
+    find = cursor.execute.call_args_list[-1].args
+    assert "v.raw @> %s::jsonb" in find[0] and json.loads(find[1][0]) == {"schedule": {"id": "remote"}}